@@ -0,0 +1,54 @@
+"""
+Script para acreditar las estrellas de nivelacion de los inscritos tarde.
+
+Hace lo mismo que la tarea periodica de la API despues de los rankings:
+congela la referencia de cada semana terminada (promedio de estrellas de
+quienes jugaron la semana completa) y recorre una sola vez a los
+participantes con `isCatchUp`. A cada uno le acredita el `catchUpPercentage`
+de las referencias de las semanas que se perdio, sumando la diferencia a
+`totalStars`. Ejecutarlo dos veces no acredita nada dos veces.
+
+Las referencias salen de `weeklyStars`, asi que ejecuta antes
+compute_rankings.py si la API no lo hace sola.
+
+Uso:
+    python apply_catch_up.py                  (torneos activos)
+    python apply_catch_up.py <tournament_id>  (un torneo)
+"""
+
+import sys
+import os
+import time
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.database import get_firestore_client
+from src.scores.catch_up import apply_active_catch_up, apply_catch_up
+
+
+def catch_up(tournament_id: str | None = None):
+    """Acredita la nivelacion de uno o de todos los torneos activos."""
+    db = get_firestore_client()
+    started = time.perf_counter()
+
+    if tournament_id:
+        result = apply_catch_up(db, tournament_id)
+        if result is None:
+            print(f"Error: No existe el torneo {tournament_id}")
+            sys.exit(1)
+        results = [result]
+    else:
+        results = apply_active_catch_up(db)
+
+    print(f"\nNivelacion de {len(results)} torneo(s):")
+    for result in results:
+        weeks = ', '.join(str(week) for week in result.new_reference_weeks) or 'ninguna'
+        print(f"  {result.tournament_id}: {result.late_joiners} inscritos tarde, {result.credited} acreditados, "
+              f"{result.skipped} para la proxima ejecucion (semanas nuevas: {weeks})")
+
+    print(f"\n¡Listo! ({time.perf_counter() - started:.1f} s)")
+
+
+if __name__ == '__main__':
+    catch_up(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,71 @@
+"""
+Script para calcular totalAnswers y correctAnswers de los participantes.
+
+Recorre la coleccion `answers` una sola vez por torneo y escribe los totales
+en cada participante, marcandolo con `statsBackfilled`. Hasta entonces, la
+API cuenta las respuestas de los participantes sin la marca en cada consulta
+de estadisticas. Ejecutalo una vez despues de desplegar los contadores,
+idealmente fuera del horario de juego.
+
+Uso:
+    python backfill_answer_stats.py                  (todos los torneos)
+    python backfill_answer_stats.py <tournament_id>  (un torneo)
+"""
+
+import sys
+import os
+from collections import Counter
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.database import get_firestore_client, ChunkedBatch
+
+
+def backfill_tournament(db, tournament_id: str):
+    """Recalcula los contadores de respuestas de un torneo."""
+    participants_ref = db.collection('tournaments').document(tournament_id).collection('participants')
+    participant_ids = {doc.id for doc in participants_ref.select(['__name__']).stream()}
+
+    total_answers = Counter()
+    correct_answers = Counter()
+
+    answers = db.collection('answers').where('tournamentId', '==', tournament_id).select(['oderId', 'isCorrect'])
+    for answer in answers.stream():
+        data = answer.to_dict()
+        user_id = data.get('oderId')
+        if user_id in participant_ids:
+            total_answers[user_id] += 1
+            if data.get('isCorrect'):
+                correct_answers[user_id] += 1
+
+    batch = ChunkedBatch(db)
+    for user_id in participant_ids:
+        batch.update(participants_ref.document(user_id), {
+            'totalAnswers': total_answers[user_id],
+            'correctAnswers': correct_answers[user_id],
+            'statsBackfilled': True
+        })
+    batch.flush()
+
+    print(f"  {tournament_id}: {len(participant_ids)} participantes, {sum(total_answers.values())} respuestas")
+
+
+def backfill(tournament_id: str | None = None):
+    """Recalcula los contadores de uno o todos los torneos."""
+    db = get_firestore_client()
+
+    if tournament_id:
+        tournament_ids = [tournament_id]
+    else:
+        tournament_ids = [doc.id for doc in db.collection('tournaments').select(['__name__']).stream()]
+
+    print(f"\nRecalculando estadisticas de {len(tournament_ids)} torneo(s):")
+    for current_id in tournament_ids:
+        backfill_tournament(db, current_id)
+
+    print("\n¡Listo!")
+
+
+if __name__ == '__main__':
+    backfill(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,67 @@
+"""
+Script para calcular pendingCount de los desafios.
+
+Recorre las entregas pendientes una sola vez y escribe en cada desafio
+cuantas tiene. La API mantiene el contador al crear y revisar entregas, pero
+las que ya estaban pendientes antes de desplegarlo no estan contadas; hasta
+que se ejecute este script, GET /challenges/pending/summary no las muestra.
+Ejecutalo una vez despues de desplegar, idealmente fuera del horario de
+juego; volver a ejecutarlo corrige cualquier diferencia.
+
+Los desafios del dia que solo existian como subcoleccion se crean con el
+torneo y la semana de su `dailyContent`.
+
+Uso:
+    python backfill_pending_counts.py
+"""
+
+import sys
+import os
+from collections import Counter
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.database import get_firestore_client, ChunkedBatch
+
+
+def backfill():
+    """Cuenta las entregas pendientes de cada desafio y guarda el total en pendingCount."""
+    db = get_firestore_client()
+
+    pending = Counter()
+    submissions = db.collection_group('submissions').where('status', '==', 'pending').select(['__name__'])
+    for doc in submissions.stream():
+        pending[doc.reference.parent.parent.id] += 1
+
+    challenges = {
+        doc.id: doc.to_dict().get('pendingCount')
+        for doc in db.collection('challenges').select(['pendingCount']).stream()
+    }
+
+    batch = ChunkedBatch(db)
+    created = 0
+    for challenge_id, count in challenges.items():
+        if count != pending[challenge_id]:
+            batch.update(db.collection('challenges').document(challenge_id), {'pendingCount': pending[challenge_id]})
+
+    # Desafios del dia sin documento propio
+    for challenge_id in pending.keys() - challenges.keys():
+        daily_content = db.collection('dailyContent').document(challenge_id).get()
+        data = daily_content.to_dict() if daily_content.exists else {}
+        batch.set(db.collection('challenges').document(challenge_id), {
+            'tournamentId': data.get('tournamentId'),
+            'weekNumber': data.get('weekNumber'),
+            'dayNumber': data.get('dayNumber'),
+            'pendingCount': pending[challenge_id]
+        }, merge=True)
+        created += 1
+    batch.flush()
+
+    print(f"\n{sum(pending.values())} entregas pendientes en {len(pending)} desafios")
+    print(f"  {batch.committed} desafios actualizados ({created} creados)")
+    print("\n¡Listo!")
+
+
+if __name__ == '__main__':
+    backfill()
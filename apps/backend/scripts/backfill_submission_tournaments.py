@@ -0,0 +1,52 @@
+"""
+Script para guardar tournamentId en las entregas aprobadas.
+
+El calculo de rankings y la reconciliacion de estrellas leen las entregas
+aprobadas de un torneo por su `tournamentId`, que se guarda al revisarlas.
+Las revisadas antes de ese cambio no lo tienen: este script lo copia del
+reto de cada una. Ejecutalo una vez despues de desplegar; volver a
+ejecutarlo no cambia nada.
+
+Uso:
+    python backfill_submission_tournaments.py
+"""
+
+import sys
+import os
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.database import get_firestore_client, ChunkedBatch
+
+
+def backfill():
+    """Copia el tournamentId del reto a las entregas aprobadas que no lo tienen."""
+    db = get_firestore_client()
+
+    challenge_tournaments = {
+        doc.id: doc.to_dict().get('tournamentId')
+        for doc in db.collection('challenges').select(['tournamentId']).stream()
+    }
+
+    batch = ChunkedBatch(db)
+    approved = 0
+    orphaned = 0
+    submissions = db.collection_group('submissions').where('status', '==', 'approved').select(['tournamentId'])
+    for doc in submissions.stream():
+        approved += 1
+        if doc.to_dict().get('tournamentId'):
+            continue
+        tournament_id = challenge_tournaments.get(doc.reference.parent.parent.id)
+        if tournament_id:
+            batch.update(doc.reference, {'tournamentId': tournament_id})
+        else:
+            orphaned += 1
+    batch.flush()
+
+    print(f"\n{approved} entregas aprobadas, {batch.committed} actualizadas, {orphaned} sin torneo en su reto")
+    print("\n¡Listo!")
+
+
+if __name__ == '__main__':
+    backfill()
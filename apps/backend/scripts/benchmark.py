@@ -0,0 +1,249 @@
+"""
+Benchmark de los endpoints mas usados contra el backend en memoria.
+
+No necesita un proyecto de Firebase: la API corre en el mismo proceso con
+FIREBASE_BACKEND=memory, sobre un torneo sintetico, y cada llamada a
+Firestore simulada espera la latencia indicada. Para cada escenario reporta
+solicitudes por segundo, latencias p50/p99 y operaciones de Firestore por
+solicitud (leidas de la cabecera Server-Timing).
+
+Con --executor inline las llamadas a Firestore corren en el event loop, como
+antes de run_sync; --compare-executor corre los escenarios de las dos formas,
+cada una en un proceso nuevo, y muestra cuanto mejora el pool de hilos.
+
+Uso:
+    python benchmark.py
+    python benchmark.py --requests 5000 --concurrency 100 --latency-ms 8
+    python benchmark.py --scenarios daily leaderboard --json
+    python benchmark.py --compare-executor
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import Executor, Future
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+SCENARIOS = ['daily', 'answer', 'leaderboard', 'pending']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark de la API contra el backend en memoria')
+    parser.add_argument('--requests', type=int, default=2000, help='solicitudes por escenario')
+    parser.add_argument('--concurrency', type=int, default=50, help='solicitudes simultaneas')
+    parser.add_argument('--warmup', type=int, default=20, help='solicitudes de calentamiento por escenario')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='latencia simulada por llamada a Firestore')
+    parser.add_argument('--jitter-ms', type=float, default=2.0, help='variacion aleatoria de la latencia')
+    parser.add_argument('--players', type=int, default=2000, help='participantes del torneo sintetico')
+    parser.add_argument('--seed', type=int, default=42, help='semilla de los datos y la latencia')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--json', action='store_true', help='imprimir los resultados como JSON')
+    parser.add_argument('--executor', choices=['pool', 'inline'], default='pool',
+                        help='pool: run_sync usa el pool de hilos; inline: las llamadas bloquean el event loop')
+    parser.add_argument('--compare-executor', action='store_true', help='comparar --executor inline y pool')
+    return parser.parse_args()
+
+
+class InlineExecutor(Executor):
+    """Corre cada llamada al enviarla, bloqueando el event loop como antes de run_sync."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def configure_environment(args):
+    """Selecciona el backend en memoria antes de importar la aplicacion."""
+    os.environ['FIREBASE_BACKEND'] = 'memory'
+    os.environ['MEMORY_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['MEMORY_LATENCY_JITTER_MS'] = str(args.jitter_ms)
+    os.environ['METRICS_ENABLED'] = 'true'
+    os.environ['REQUEST_LOG_ENABLED'] = 'false'
+    os.environ['PROFILING_ENABLED'] = 'false'
+    os.environ.setdefault('ENVIRONMENT', 'benchmark')
+
+
+def server_timing_ops(header: str) -> dict:
+    """Extrae las operaciones de Firestore de la cabecera Server-Timing."""
+    ops = {'reads': 0, 'writes': 0, 'round_trips': 0}
+    for name, key in (('fs-reads', 'reads'), ('fs-writes', 'writes')):
+        match = re.search(rf'{name};desc="(\d+)"', header)
+        if match:
+            ops[key] = int(match.group(1))
+    match = re.search(r'desc="(\d+) round trips"', header)
+    if match:
+        ops['round_trips'] = int(match.group(1))
+    return ops
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def build_requests(name: str, seeded, auth, count: int) -> list[tuple]:
+    """Genera (metodo, ruta, token, cuerpo) para un escenario."""
+    from src.config import settings
+
+    prefix = settings.API_PREFIX
+    tournament_id = seeded.tournament_id
+    player_tokens = {uid: auth.issue_id_token(uid) for uid in seeded.player_ids}
+
+    if name == 'daily':
+        return [
+            ('GET', f'{prefix}/questions/daily/{tournament_id}', player_tokens[seeded.player_ids[i % len(seeded.player_ids)]], None)
+            for i in range(count)
+        ]
+
+    if name == 'leaderboard':
+        return [
+            ('GET', f'{prefix}/scores/leaderboard/{tournament_id}', player_tokens[seeded.player_ids[i % len(seeded.player_ids)]], None)
+            for i in range(count)
+        ]
+
+    if name == 'pending':
+        token = auth.issue_id_token(seeded.moderator_id)
+        return [('GET', f'{prefix}/challenges/pending', token, None) for _ in range(count)]
+
+    # Cada (jugador, pregunta) solo se puede responder una vez
+    pairs = [
+        (uid, question_id)
+        for question_id in seeded.today_question_ids
+        for uid in seeded.player_ids
+    ]
+    return [
+        ('POST', f'{prefix}/questions/answer', player_tokens[uid], {'question_id': question_id, 'selected_answer': 'A'})
+        for uid, question_id in pairs[:count]
+    ]
+
+
+async def run_requests(client, requests: list[tuple], concurrency: int) -> list[tuple]:
+    """Ejecuta las solicitudes con `concurrency` trabajadores; devuelve (segundos, estado, ops)."""
+    results = []
+    pending = iter(requests)
+
+    async def worker():
+        for method, path, token, body in pending:
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body, headers={'Authorization': f'Bearer {token}'})
+            elapsed = time.perf_counter() - started
+            results.append((elapsed, response.status_code, server_timing_ops(response.headers.get('server-timing', ''))))
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return results
+
+
+def summarize(name: str, results: list[tuple], wall_seconds: float) -> dict:
+    latencies = sorted(elapsed for elapsed, _, _ in results)
+    total = len(results) or 1
+    return {
+        'scenario': name,
+        'requests': len(results),
+        'errors': sum(1 for _, status_code, _ in results if status_code >= 400),
+        'throughput_rps': round(len(results) / wall_seconds, 1) if wall_seconds else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'reads_per_request': round(sum(ops['reads'] for _, _, ops in results) / total, 2),
+        'writes_per_request': round(sum(ops['writes'] for _, _, ops in results) / total, 2),
+        'round_trips_per_request': round(sum(ops['round_trips'] for _, _, ops in results) / total, 2)
+    }
+
+
+async def benchmark(args) -> list[dict]:
+    import httpx
+
+    import src.database
+    from src.database import get_auth, get_firestore_client
+    from src.inmemory.seed import seed_tournament
+    from src.main import app
+
+    if args.executor == 'inline':
+        src.database._executor = InlineExecutor()
+
+    db = get_firestore_client()
+    auth = get_auth()
+
+    # Sin latencia mientras se cargan los datos
+    latency_ms, db.latency_ms = db.latency_ms, 0
+    jitter_ms, db.jitter_ms = db.jitter_ms, 0
+    seeded = seed_tournament(db, auth, players=args.players, rng=random.Random(args.seed))
+    db.latency_ms, db.jitter_ms = latency_ms, jitter_ms
+
+    summaries = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+        for name in args.scenarios:
+            requests = build_requests(name, seeded, auth, args.warmup + args.requests)
+            await run_requests(client, requests[:args.warmup], args.concurrency)
+
+            started = time.perf_counter()
+            results = await run_requests(client, requests[args.warmup:], args.concurrency)
+            summaries.append(summarize(name, results, time.perf_counter() - started))
+
+    return summaries
+
+
+def print_table(summaries: list[dict], args, executor: str | None = None):
+    print(f"\nBackend en memoria: latencia {args.latency_ms} ms (+{args.jitter_ms} ms), "
+          f"concurrencia {args.concurrency}, {args.players} jugadores, executor {executor or args.executor}\n")
+    header = f"{'escenario':12} {'solic.':>7} {'errores':>7} {'solic/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'lect.':>6} {'escr.':>6} {'viajes':>7}"
+    print(header)
+    print('-' * len(header))
+    for s in summaries:
+        print(f"{s['scenario']:12} {s['requests']:>7} {s['errors']:>7} {s['throughput_rps']:>9} "
+              f"{s['p50_ms']:>8} {s['p99_ms']:>8} {s['reads_per_request']:>6} "
+              f"{s['writes_per_request']:>6} {s['round_trips_per_request']:>7}")
+    print()
+
+
+def compare_executors(args):
+    """Corre el benchmark con cada executor en un proceso nuevo, para no compartir datos ni caches."""
+    argv = [arg for arg in sys.argv[1:] if arg not in ('--compare-executor', '--json')]
+    runs = {}
+    for executor in ('inline', 'pool'):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *argv, '--executor', executor, '--json'],
+            check=True, capture_output=True, text=True
+        ).stdout
+        runs[executor] = json.loads(output)
+
+    if args.json:
+        print(json.dumps(runs, indent=2))
+        return
+
+    for executor, summaries in runs.items():
+        print_table(summaries, args, executor)
+    print(f"{'escenario':12} {'inline solic/s':>15} {'pool solic/s':>13} {'mejora':>8}")
+    for before, after in zip(runs['inline'], runs['pool']):
+        speedup = after['throughput_rps'] / before['throughput_rps'] if before['throughput_rps'] else 0.0
+        print(f"{before['scenario']:12} {before['throughput_rps']:>15} {after['throughput_rps']:>13} {speedup:>7.1f}x")
+    print()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.compare_executor:
+        compare_executors(args)
+        sys.exit(0)
+
+    configure_environment(args)
+    random.seed(args.seed)
+
+    summaries = asyncio.run(benchmark(args))
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+    else:
+        print_table(summaries, args)
@@ -0,0 +1,247 @@
+"""
+Micro-benchmark de la serializacion de los endpoints de listas.
+
+Compara, para cada endpoint, el camino anterior (un modelo pydantic por
+documento, validado otra vez y serializado por FastAPI a traves de
+`response_model`) con el camino rapido (dicts planos codificados con
+orjson). Verifica que ambos produzcan exactamente los mismos bytes y
+reporta microsegundos por respuesta y la mejora.
+
+Uso:
+    python benchmark_serialization.py
+    python benchmark_serialization.py --players 1000 --limit 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+os.environ.setdefault('FIREBASE_BACKEND', 'memory')
+os.environ.setdefault('ENVIRONMENT', 'benchmark')
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from src.inmemory import MemoryFirestore
+from src.scores.leaderboard import Leaderboard
+from src.scores.router import router as scores_router, LeaderboardResponse, RankEntry, _leaderboard_payload
+from src.questions.router import router as questions_router, QuestionOption, QuestionResponse, _question_payload
+from src.tournaments.router import router as tournaments_router, TournamentResponse, _tournament_payload
+from src.challenges.router import router as challenges_router, SubmissionResponse, _submission_payload
+from src.serialization import dumps
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Micro-benchmark de serializacion de respuestas')
+    parser.add_argument('--players', type=int, default=1000, help='participantes del ranking')
+    parser.add_argument('--limit', type=int, default=500, help='filas por pagina del ranking')
+    parser.add_argument('--tournaments', type=int, default=100, help='torneos por pagina')
+    parser.add_argument('--submissions', type=int, default=200, help='entregas por pagina')
+    parser.add_argument('--repeat', type=int, default=200, help='repeticiones por medicion')
+    return parser.parse_args()
+
+
+def response_field(router, path: str):
+    for route in router.routes:
+        if isinstance(route, APIRoute) and route.path == path and 'GET' in route.methods:
+            return route.response_field
+    raise ValueError(f'Ruta no encontrada: {path}')
+
+
+def fastapi_render(field, content) -> bytes:
+    """Lo que hace FastAPI con el valor devuelto por un endpoint con response_model."""
+    # Sin endpoints sincronos no hay nada que esperar: se avanza la corrutina a mano
+    # para no medir el costo de crear un event loop
+    coroutine = serialize_response(field=field, response_content=content)
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return JSONResponse(done.value).body
+    coroutine.close()
+    raise RuntimeError('serialize_response no termino de forma sincrona')
+
+
+def measure(func, repeat: int) -> float:
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1_000_000
+
+
+def leaderboard_case(args):
+    rng = random.Random(1)
+    board = Leaderboard('torneo', synced_from=datetime.now(timezone.utc))
+    for index in range(args.players):
+        board.set_participant(f'jugador-{index:06d}', f'Jugador {index} ñandú', rng.randint(0, 500))
+    page = board.page(args.limit)
+    user_id = 'jugador-000500'
+    field = response_field(scores_router, '/leaderboard/{tournament_id}')
+
+    def old():
+        rankings = []
+        user_rank = None
+        user_stars = None
+        for rank, entry_user_id, display_name, total_stars in page:
+            rankings.append(RankEntry(rank=rank, user_id=entry_user_id, display_name=display_name, total_stars=total_stars))
+            if entry_user_id == user_id:
+                user_rank, user_stars = rank, total_stars
+        if user_rank is None:
+            user_position = board.rank_of(user_id)
+            if user_position is not None:
+                user_rank, user_stars = user_position
+        return fastapi_render(field, LeaderboardResponse(
+            tournament_id='torneo', rankings=rankings, user_rank=user_rank,
+            user_stars=user_stars, total_participants=len(board)
+        ))
+
+    def new():
+        return dumps(_leaderboard_payload('torneo', board, page, user_id))
+
+    return f'leaderboard ({args.limit} filas)', old, new
+
+
+def tournaments_case(args):
+    from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+
+    start = DatetimeWithNanoseconds(2026, 1, 5, tzinfo=timezone.utc)
+    docs = [
+        (f'torneo-{index}', {
+            'name': f'Torneo {index}',
+            'description': 'Quince semanas de preguntas bíblicas',
+            'startDate': start,
+            'endDate': start + timedelta(weeks=15),
+            'totalWeeks': 15,
+            'status': 'active',
+            'lateRegistrationAllowed': True,
+            'catchUpPercentage': 70
+        }, index * 10)
+        for index in range(args.tournaments)
+    ]
+    field = response_field(tournaments_router, '/')
+
+    def old():
+        return fastapi_render(field, [
+            TournamentResponse(
+                id=tournament_id,
+                name=data.get('name', ''),
+                description=data.get('description', ''),
+                start_date=data.get('startDate') or datetime.now(),
+                end_date=data.get('endDate') or datetime.now(),
+                total_weeks=data.get('totalWeeks', 15),
+                status=data.get('status', 'upcoming'),
+                participant_count=count,
+                late_registration_allowed=data.get('lateRegistrationAllowed', True),
+                catch_up_percentage=data.get('catchUpPercentage', 70)
+            )
+            for tournament_id, data, count in docs
+        ])
+
+    def new():
+        return dumps([_tournament_payload(tournament_id, data, count) for tournament_id, data, count in docs])
+
+    return f'torneos ({args.tournaments} filas)', old, new
+
+
+def daily_case(args):
+    questions = [
+        (f'q{number}', {
+            'tournamentId': 'torneo',
+            'weekNumber': 3,
+            'dayNumber': 2,
+            'questionNumber': number,
+            'questionText': '¿Quién construyó el arca?',
+            'bibleReference': 'Génesis 6:14',
+            'bibleVerseText': 'Hazte un arca de madera de gofer; harás aposentos en el arca. ' * 4,
+            'options': [{'id': option, 'text': f'Opción {option}'} for option in 'ABCD'],
+            'correctAnswer': 'A',
+            'stars': 1,
+            'isExtraQuestion': number == 5,
+            'youtubeShortId': None
+        })
+        for number in range(1, 6)
+    ]
+    field = response_field(questions_router, '/daily/{tournament_id}')
+
+    def old():
+        return fastapi_render(field, [
+            QuestionResponse(
+                id=question_id,
+                tournament_id=data.get('tournamentId', ''),
+                week_number=data.get('weekNumber', 1),
+                day_number=data.get('dayNumber', 1),
+                question_number=data.get('questionNumber', 1),
+                question_text=data.get('questionText', ''),
+                bible_reference=data.get('bibleReference', ''),
+                bible_verse_text=data.get('bibleVerseText', ''),
+                options=[QuestionOption(**opt) for opt in data.get('options', [])],
+                stars=data.get('stars', 1),
+                is_extra_question=data.get('isExtraQuestion', False),
+                youtube_short_id=data.get('youtubeShortId')
+            )
+            for question_id, data in questions
+        ])
+
+    def new():
+        return dumps([_question_payload(question_id, data) for question_id, data in questions])
+
+    return 'preguntas del dia (5 filas)', old, new
+
+
+def submissions_case(args):
+    db = MemoryFirestore()
+    submitted_at = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+    for index in range(args.submissions):
+        db.collection('challenges').document(f'reto{index % 5}').collection('submissions').document(f's{index:05d}').set({
+            'oderId': f'jugador-{index}',
+            'oderName': f'Jugador {index}',
+            'videoURL': f'https://example.com/videos/{index}.mp4',
+            'status': 'pending',
+            'starsAwarded': None,
+            'submittedAt': submitted_at + timedelta(seconds=index, microseconds=index)
+        })
+    docs = db.collection_group('submissions').order_by('submittedAt').get()
+    field = response_field(challenges_router, '/pending')
+
+    def old():
+        responses = []
+        for doc in docs:
+            data = doc.to_dict()
+            responses.append(SubmissionResponse(
+                id=doc.id,
+                challenge_id=doc.reference.parent.parent.id,
+                user_id=data.get('oderId', ''),
+                user_name=data.get('oderName', 'Usuario'),
+                video_url=data.get('videoURL', ''),
+                status=data.get('status', 'pending'),
+                stars_awarded=data.get('starsAwarded'),
+                submitted_at=data.get('submittedAt') or datetime.now()
+            ))
+        return fastapi_render(field, responses)
+
+    def new():
+        return dumps([_submission_payload(doc) for doc in docs])
+
+    return f'entregas pendientes ({args.submissions} filas)', old, new
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    print(f"\n{'endpoint':32} {'antes us':>10} {'ahora us':>10} {'mejora':>8}  bytes iguales")
+    print('-' * 78)
+    for case in (leaderboard_case, tournaments_case, daily_case, submissions_case):
+        name, old, new = case(args)
+        identical = old() == new()
+        old_us = measure(old, args.repeat)
+        new_us = measure(new, args.repeat)
+        print(f"{name:32} {old_us:>10.1f} {new_us:>10.1f} {old_us / new_us:>7.1f}x  {'si' if identical else 'NO'}")
+        if not identical:
+            sys.exit(f"\nError: {name} no produce los mismos bytes")
+    print()
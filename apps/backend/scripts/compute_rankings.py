@@ -0,0 +1,62 @@
+"""
+Script para calcular `rank` y `weeklyStars` de los participantes.
+
+Hace lo mismo que la tarea periodica de la API (RANKING_INTERVAL_SECONDS):
+recorre los participantes de cada torneo una vez, calcula rangos densos por
+`totalStars` y suma las estrellas por semana de las respuestas y de los retos
+aprobados desde la ultima ejecucion. Escribe solo los participantes que
+cambiaron, en lotes de 500.
+
+Con --full recalcula las estrellas semanales desde cero (lee todas las
+respuestas del torneo); usalo la primera vez o si los totales se desviaron.
+
+Uso:
+    python compute_rankings.py                  (torneos activos)
+    python compute_rankings.py <tournament_id>  (un torneo)
+    python compute_rankings.py <tournament_id> --full
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.database import get_firestore_client
+from src.scores.ranking import compute_active_rankings, compute_tournament_rankings
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Calcula rank y weeklyStars de los participantes')
+    parser.add_argument('tournament_id', nargs='?', help='torneo a calcular (por defecto, los activos)')
+    parser.add_argument('--full', action='store_true', help='recalcular las estrellas semanales desde cero')
+    return parser.parse_args()
+
+
+def compute(tournament_id: str | None = None, full: bool = False):
+    """Calcula los rankings de uno o de todos los torneos activos."""
+    db = get_firestore_client()
+    started = time.perf_counter()
+
+    if tournament_id:
+        result = compute_tournament_rankings(db, tournament_id, full)
+        if result is None:
+            print(f"Error: No existe el torneo {tournament_id}")
+            sys.exit(1)
+        results = [result]
+    else:
+        results = compute_active_rankings(db, full)
+
+    print(f"\nRankings {'completos' if full else 'incrementales'} de {len(results)} torneo(s):")
+    for result in results:
+        print(f"  {result.tournament_id}: {result.participants} participantes, {result.answers} respuestas, "
+              f"{result.submissions} retos aprobados, {result.writes} escrituras")
+
+    print(f"\n¡Listo! ({time.perf_counter() - started:.1f} s)")
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    compute(args.tournament_id, args.full)
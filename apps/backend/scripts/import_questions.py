@@ -0,0 +1,100 @@
+"""
+Script para importar las preguntas de un torneo desde CSV o JSON.
+
+Acepta las columnas de la plantilla de Excel del panel de administracion
+(Semana, Dia, Numero, Pregunta, Referencia, Versiculo, OpcionA-D, Correcta,
+YouTubeShort, Extra) o los nombres de campo de Firestore (weekNumber,
+questionText, correctAnswer, releaseDate, stars, ...). Valida todas las
+filas antes de escribir; si alguna tiene errores no se importa nada.
+
+Las preguntas se escriben en lotes de 500 enviados en paralelo. Las que ya
+existen en el torneo (misma semana, dia y numero) se saltan, asi que si la
+importacion se corta basta con volver a ejecutarla. Con --replace se
+sobrescriben.
+
+Al terminar se avisa a la API (cacheVersions/questions), que descarta las
+preguntas que tenia en cache en pocos segundos
+(QUESTION_CACHE_VERSION_POLL_SECONDS).
+
+Uso:
+    python import_questions.py <tournament_id> preguntas.csv
+    python import_questions.py <tournament_id> preguntas.json --dry-run
+    python import_questions.py <tournament_id> preguntas.csv --replace --workers 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.database import get_firestore_client
+from src.questions.importer import import_questions, read_question_rows, validate_question_rows
+from src.questions.invalidation import bump_questions_version
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Importa las preguntas de un torneo desde CSV o JSON')
+    parser.add_argument('tournament_id')
+    parser.add_argument('file', help='archivo .csv o .json')
+    parser.add_argument('--replace', action='store_true', help='sobrescribir las preguntas que ya existen')
+    parser.add_argument('--dry-run', action='store_true', help='solo validar el archivo')
+    parser.add_argument('--workers', type=int, default=4, help='lotes enviados en paralelo')
+    return parser.parse_args()
+
+
+def import_file(args):
+    db = get_firestore_client()
+    started = time.perf_counter()
+
+    tournament_doc = db.collection('tournaments').document(args.tournament_id).get()
+    if not tournament_doc.exists:
+        print(f"Error: No existe el torneo {args.tournament_id}")
+        sys.exit(1)
+    tournament_data = tournament_doc.to_dict()
+
+    is_csv = args.file.lower().endswith('.csv')
+    with open(args.file, encoding='utf-8-sig', newline='') as f:
+        try:
+            questions, errors = validate_question_rows(
+                read_question_rows(f, 'csv' if is_csv else 'json'),
+                int(tournament_data.get('totalWeeks', 15)),
+                2 if is_csv else 1
+            )
+        except ValueError as e:
+            print(f"Error: No se pudo leer {args.file}: {e}")
+            sys.exit(1)
+
+    if errors:
+        print(f"\n{len(errors)} fila(s) con errores, no se importo nada:")
+        for error in errors:
+            print(f"  {error}")
+        sys.exit(1)
+
+    print(f"{len(questions)} preguntas validas")
+    if args.dry_run:
+        return
+
+    written = 0
+
+    def progress(count: int):
+        nonlocal written
+        written += count
+        print(f"  {written} escritas")
+
+    result = import_questions(db, args.tournament_id, tournament_data, questions, args.replace, args.workers, progress)
+    if result.question_ids:
+        bump_questions_version(db)
+
+    print(f"\n{result.created} creadas, {result.replaced} reemplazadas, {result.skipped} ya existian")
+    if result.failed:
+        print(f"{result.failed} no se pudieron escribir; vuelve a ejecutar el script para completarlas")
+        sys.exit(1)
+
+    print(f"\n¡Listo! ({time.perf_counter() - started:.1f} s)")
+
+
+if __name__ == '__main__':
+    import_file(parse_args())
@@ -1,99 +1,189 @@
 """
-Script para hacer admin a un usuario en Biblia Question.
+Script para dar o quitar roles (admin, moderador) a usuarios de Biblia Question.
+
+Acepta emails o UIDs, en la linea de comandos o en un archivo (uno por linea,
+las lineas con # se ignoran). Los usuarios se buscan en Firebase Auth de a
+100 por llamada, los custom claims (`admin`, `moderator`, que son los que
+revisa la API) se asignan en paralelo y el campo `role` de `users` se
+actualiza en lotes de 500. Los usuarios que ya tienen el rol no se tocan, asi
+que se puede volver a ejecutar con la misma lista.
 
 Uso:
     python make_admin.py correo@ejemplo.com
+    python make_admin.py --role moderator --file moderadores.txt
+    python make_admin.py --role player correo@ejemplo.com uid123   (quitar permisos)
+    python make_admin.py --list [--page-size 500]
 """
 
-import sys
+import argparse
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Agregar el directorio padre al path para importar módulos
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin.auth import EmailIdentifier, UidIdentifier
+
+from src.config import settings
+from src.database import ChunkedBatch, get_auth, get_firestore_client
+
+ROLES = ('admin', 'moderator', 'player')
+# Maximo de identificadores por llamada a auth.get_users
+LOOKUP_LIMIT = 100
 
-def init_firebase():
-    """Inicializa Firebase Admin SDK."""
-    if firebase_admin._apps:
-        return firestore.client()
 
-    # Buscar el archivo de credenciales
-    cred_path = os.path.join(os.path.dirname(__file__), '..', 'firebase-credentials.json')
+def parse_args():
+    parser = argparse.ArgumentParser(description='Da o quita roles a usuarios de Biblia Question')
+    parser.add_argument('users', nargs='*', help='emails o UIDs')
+    parser.add_argument('--file', help='archivo con un email o UID por linea')
+    parser.add_argument('--role', choices=ROLES, default='admin', help='rol a asignar (player quita los permisos)')
+    parser.add_argument('--workers', type=int, default=8, help='llamadas a Firebase Auth en paralelo')
+    parser.add_argument('--list', action='store_true', help='listar los usuarios registrados')
+    parser.add_argument('--page-size', type=int, default=500, help='usuarios por pagina al listar')
+    return parser.parse_args()
 
-    if not os.path.exists(cred_path):
+
+def check_credentials():
+    """Sale con un mensaje claro si FIREBASE_CREDENTIALS_PATH apunta a un archivo que no existe."""
+    cred_path = settings.firebase_credentials_path
+    if cred_path and not settings.FIREBASE_CREDENTIALS_BASE64 and not os.path.exists(cred_path):
         print(f"Error: No se encontró el archivo de credenciales en: {cred_path}")
-        print("Asegúrate de tener firebase-credentials.json en apps/backend/")
+        print("Revisa FIREBASE_CREDENTIALS_PATH en apps/backend/.env (las rutas relativas son desde apps/backend/)")
         sys.exit(1)
 
-    cred = credentials.Certificate(cred_path)
-    firebase_admin.initialize_app(cred)
 
-    return firestore.client()
+def read_identifiers(args) -> list[str]:
+    """Emails y UIDs de la linea de comandos y del archivo, sin repetidos."""
+    identifiers = list(args.users)
+    if args.file:
+        with open(args.file, encoding='utf-8-sig') as f:
+            identifiers.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    return list(dict.fromkeys(identifiers))
 
-def make_admin(email: str):
-    """Hace admin a un usuario por su email."""
-    db = init_firebase()
 
-    # Buscar usuario por email
-    users_ref = db.collection('users')
-    query = users_ref.where('email', '==', email).limit(1)
-    results = list(query.stream())
-
-    if not results:
-        print(f"Error: No se encontró usuario con email: {email}")
-        print("\nUsuarios disponibles:")
-        all_users = users_ref.stream()
-        for user in all_users:
-            data = user.to_dict()
-            print(f"  - {data.get('email', 'N/A')} ({data.get('displayName', 'Sin nombre')}) - Role: {data.get('role', 'N/A')}")
-        return False
+def resolve_users(auth, identifiers: list[str], pool) -> tuple[list, list[str]]:
+    """Busca los usuarios en Firebase Auth de a LOOKUP_LIMIT; devuelve (encontrados, no encontrados)."""
+    lookups = [EmailIdentifier(value) if '@' in value else UidIdentifier(value) for value in identifiers]
+    chunks = [lookups[start:start + LOOKUP_LIMIT] for start in range(0, len(lookups), LOOKUP_LIMIT)]
 
-    user_doc = results[0]
-    user_data = user_doc.to_dict()
+    users = {}
+    not_found = []
+    for result in pool.map(auth.get_users, chunks):
+        users.update((user.uid, user) for user in result.users)
+        not_found.extend(
+            identifier.email if isinstance(identifier, EmailIdentifier) else identifier.uid
+            for identifier in result.not_found
+        )
+    return list(users.values()), not_found
 
-    print(f"\nUsuario encontrado:")
-    print(f"  ID: {user_doc.id}")
-    print(f"  Email: {user_data.get('email')}")
-    print(f"  Nombre: {user_data.get('displayName')}")
-    print(f"  Rol actual: {user_data.get('role')}")
 
-    if user_data.get('role') == 'admin':
-        print(f"\n¡{email} ya es admin!")
-        return True
+def role_claims(claims: dict | None, role: str) -> dict:
+    """Los custom claims del usuario con los del rol; conserva los demas claims."""
+    claims = {key: value for key, value in (claims or {}).items() if key not in ('admin', 'moderator')}
+    if role != 'player':
+        claims[role] = True
+    return claims
 
-    # Actualizar rol a admin
-    user_doc.reference.update({'role': 'admin'})
 
-    print(f"\n¡Éxito! {email} ahora es ADMIN")
-    print("\nEl usuario debe cerrar sesión y volver a entrar para ver los cambios.")
+def update_roles(db, user_ids: list[str], role: str) -> tuple[int, int]:
+    """Actualiza `role` en los documentos de `users`; devuelve (actualizados, sin documento)."""
+    users_ref = db.collection('users')
+    batch = ChunkedBatch(db)
+    missing = 0
+
+    for start in range(0, len(user_ids), LOOKUP_LIMIT):
+        refs = [users_ref.document(uid) for uid in user_ids[start:start + LOOKUP_LIMIT]]
+        for doc in db.get_all(refs, field_paths=['role']):
+            if not doc.exists:
+                missing += 1
+            elif doc.to_dict().get('role') != role:
+                batch.update(doc.reference, {'role': role})
+    batch.flush()
+
+    return batch.committed, missing
+
+
+def assign_role(args):
+    """Asigna el rol a todos los usuarios de la lista."""
+    identifiers = read_identifiers(args)
+    if not identifiers:
+        print("Error: Indica al menos un email o UID (o --file)")
+        sys.exit(1)
+
+    auth = get_auth()
+    db = get_firestore_client()
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        users, not_found = resolve_users(auth, identifiers, pool)
+
+        pending = []
+        for user in users:
+            claims = role_claims(user.custom_claims, args.role)
+            if claims != (user.custom_claims or {}):
+                pending.append((user.uid, claims))
+        futures = [(pool.submit(auth.set_custom_user_claims, uid, claims), uid) for uid, claims in pending]
+
+        failed = []
+        for future, uid in futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"  Error al asignar claims a {uid}: {e}")
+                failed.append(uid)
+
+    updated, missing = update_roles(db, [user.uid for user in users if user.uid not in failed], args.role)
+
+    print(f"\nRol '{args.role}': {len(users)} usuarios encontrados, {len(pending) - len(failed)} claims actualizados, "
+          f"{len(users) - len(pending)} ya lo tenian")
+    print(f"  {updated} documentos de users actualizados, {missing} sin documento (se crea al iniciar sesion)")
+    if not_found:
+        print(f"  {len(not_found)} no encontrados en Firebase Auth:")
+        for identifier in not_found:
+            print(f"    - {identifier}")
+    if failed:
+        print(f"  {len(failed)} fallaron; vuelve a ejecutar el script para completarlos")
+
+    print("\nLos usuarios deben cerrar sesión y volver a entrar para ver los cambios.")
+    print(f"\n¡Listo! ({time.perf_counter() - started:.1f} s)")
+
+    if failed:
+        sys.exit(1)
 
-    return True
 
-def list_users():
-    """Lista todos los usuarios."""
-    db = init_firebase()
-    users_ref = db.collection('users')
+def list_users(page_size: int):
+    """Lista todos los usuarios, de a una pagina por consulta."""
+    db = get_firestore_client()
+    query = db.collection('users').order_by('__name__').select(['email', 'displayName', 'role']).limit(page_size)
 
     print("\nUsuarios registrados:")
     print("-" * 60)
 
-    for user in users_ref.stream():
-        data = user.to_dict()
-        role_marker = "[ADMIN]" if data.get('role') == 'admin' else "[user]"
-        print(f"{role_marker:8} {data.get('email', 'N/A'):35} | {data.get('displayName', 'Sin nombre'):20} | {data.get('role', 'player')}")
+    total = 0
+    last = None
+    while True:
+        page = list((query.start_after(last) if last else query).stream())
+        for user in page:
+            data = user.to_dict()
+            role = data.get('role') or 'player'
+            role_marker = f"[{role.upper()}]" if role != 'player' else "[user]"
+            print(f"{role_marker:11} {data.get('email') or 'N/A':35} | {data.get('displayName') or 'Sin nombre':20} | {role}")
+        total += len(page)
+        if len(page) < page_size:
+            break
+        last = page[-1]
+        sys.stdout.flush()
 
     print("-" * 60)
+    print(f"{total} usuarios")
 
-if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Uso: python make_admin.py <email>")
-        print("      python make_admin.py --list  (para ver todos los usuarios)")
-        sys.exit(1)
 
-    if sys.argv[1] == '--list':
-        list_users()
+if __name__ == '__main__':
+    args = parse_args()
+    check_credentials()
+    if args.list:
+        list_users(args.page_size)
     else:
-        email = sys.argv[1]
-        make_admin(email)
+        assign_role(args)
@@ -0,0 +1,309 @@
+"""
+Prueba de carga que reproduce el pico de la publicacion de preguntas a medianoche.
+
+Levanta la API con uvicorn, en otro proceso y en un puerto local, sobre el
+backend en memoria (FIREBASE_BACKEND=memory) con un torneo sintetico de
+`--players` jugadores.
+Cada jugador llega en los primeros `--ramp-seconds` segundos, como a
+medianoche, y hace lo mismo que la app: /auth/me, /questions/daily/{id},
+cinco /questions/answer (con una pausa entre cada una) y
+/scores/leaderboard/{id}.
+
+Con `--viewers`, ademas hay clientes conectados al ranking en vivo
+(/scores/leaderboard/{id}/stream) durante todo el pico.
+
+Al final reporta, por endpoint, latencias p50/p90/p99, tasa de errores y
+lecturas/escrituras de Firestore por solicitud, y los eventos que recibio el
+ranking en vivo. No necesita red ni Firebase.
+
+Uso:
+    python midnight_spike.py
+    python midnight_spike.py --players 5000 --concurrency 500 --ramp-seconds 5
+    python midnight_spike.py --latency-ms 10 --jitter-ms 5 --json
+    python midnight_spike.py --viewers 1000
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import time
+from collections import defaultdict
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmark import configure_environment, percentile, server_timing_ops
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Reproduce el pico de medianoche contra el backend en memoria')
+    parser.add_argument('--players', type=int, default=2000, help='jugadores que llegan en el pico')
+    parser.add_argument('--concurrency', type=int, default=200, help='jugadores activos a la vez (conexiones)')
+    parser.add_argument('--ramp-seconds', type=float, default=10.0, help='ventana en la que llegan los jugadores')
+    parser.add_argument('--think-ms', type=float, default=500.0, help='pausa maxima entre respuestas')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='latencia simulada por llamada a Firestore')
+    parser.add_argument('--jitter-ms', type=float, default=2.0, help='variacion aleatoria de la latencia')
+    parser.add_argument('--questions-per-day', type=int, default=5)
+    parser.add_argument('--viewers', type=int, default=0, help='clientes conectados al ranking en vivo')
+    parser.add_argument('--seed', type=int, default=42, help='semilla de los datos y del trafico')
+    parser.add_argument('--json', action='store_true', help='imprimir los resultados como JSON')
+    return parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve(args, port: int, ready):
+    """Proceso del servidor: carga el torneo sintetico y sirve la API con uvicorn."""
+    import uvicorn
+
+    configure_environment(args)
+    random.seed(args.seed)
+
+    from src.database import get_auth, get_firestore_client
+    from src.inmemory.seed import seed_tournament
+    from src.main import app
+
+    db = get_firestore_client()
+
+    # Sin latencia mientras se cargan los datos
+    latency_ms, db.latency_ms = db.latency_ms, 0
+    jitter_ms, db.jitter_ms = db.jitter_ms, 0
+    seeded = seed_tournament(
+        db, get_auth(),
+        players=args.players,
+        questions_per_day=args.questions_per_day,
+        rng=random.Random(args.seed)
+    )
+    db.latency_ms, db.jitter_ms = latency_ms, jitter_ms
+
+    ready.put(seeded)
+    uvicorn.run(app, host='127.0.0.1', port=port, log_level='warning', access_log=False)
+
+
+def start_server(args, port: int):
+    """
+    Arranca el servidor en otro proceso, para que el generador de carga no
+    compita con el por el GIL, y espera a que responda.
+    """
+    import httpx
+
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(args, port, ready), daemon=True)
+    process.start()
+    seeded = ready.get()
+
+    while True:
+        if not process.is_alive():
+            raise RuntimeError('No se pudo iniciar el servidor')
+        try:
+            httpx.get(f'http://127.0.0.1:{port}/health')
+            return process, seeded
+        except httpx.TransportError:
+            time.sleep(0.1)
+
+
+class Recorder:
+    """Resultados por endpoint: (segundos, estado, ops de Firestore)."""
+
+    def __init__(self):
+        self.results = defaultdict(list)
+
+    async def call(self, client, endpoint: str, method: str, path: str, token: str, body: dict | None = None):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body, headers={'Authorization': f'Bearer {token}'})
+        except Exception:
+            self.results[endpoint].append((time.perf_counter() - started, 0, {'reads': 0, 'writes': 0, 'round_trips': 0}))
+            return None
+
+        ops = server_timing_ops(response.headers.get('server-timing', ''))
+        self.results[endpoint].append((time.perf_counter() - started, response.status_code, ops))
+        return response
+
+    def summary(self) -> list[dict]:
+        rows = []
+        for endpoint, results in self.results.items():
+            latencies = sorted(elapsed for elapsed, _, _ in results)
+            errors = sum(1 for _, status_code, _ in results if status_code == 0 or status_code >= 400)
+            rows.append({
+                'endpoint': endpoint,
+                'requests': len(results),
+                'errors': errors,
+                'error_rate': round(errors / len(results), 4),
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+                'p90_ms': round(percentile(latencies, 0.90) * 1000, 1),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+                'max_ms': round(latencies[-1] * 1000, 1),
+                'reads_per_request': round(sum(ops['reads'] for _, _, ops in results) / len(results), 2),
+                'writes_per_request': round(sum(ops['writes'] for _, _, ops in results) / len(results), 2),
+                'round_trips_per_request': round(sum(ops['round_trips'] for _, _, ops in results) / len(results), 2)
+            })
+        return rows
+
+
+async def player_session(client, recorder: Recorder, prefix: str, tournament_id: str, token: str, rng: random.Random, think_ms: float):
+    """Lo que hace la app de un jugador al publicarse las preguntas del dia."""
+    await recorder.call(client, 'GET /auth/me', 'GET', f'{prefix}/auth/me', token)
+
+    response = await recorder.call(
+        client, 'GET /questions/daily/{id}', 'GET', f'{prefix}/questions/daily/{tournament_id}', token
+    )
+    questions = response.json() if response is not None and response.status_code == 200 else []
+
+    for question in questions:
+        await asyncio.sleep(rng.uniform(0, think_ms) / 1000)
+        await recorder.call(client, 'POST /questions/answer', 'POST', f'{prefix}/questions/answer', token, {
+            'question_id': question['id'],
+            'selected_answer': rng.choice('ABCD')
+        })
+
+    await recorder.call(client, 'GET /scores/leaderboard/{id}', 'GET', f'{prefix}/scores/leaderboard/{tournament_id}', token)
+
+
+class LiveViewers:
+    """Eventos recibidos por los clientes del ranking en vivo."""
+
+    def __init__(self):
+        self.connected = 0
+        self.errors = 0
+        self.events = defaultdict(int)
+        self.bytes = 0
+
+    async def watch(self, client, prefix: str, tournament_id: str, token: str):
+        try:
+            async with client.stream(
+                'GET', f'{prefix}/scores/leaderboard/{tournament_id}/stream',
+                headers={'Authorization': f'Bearer {token}'}
+            ) as response:
+                if response.status_code != 200:
+                    self.errors += 1
+                    return
+                self.connected += 1
+                async for line in response.aiter_lines():
+                    self.bytes += len(line) + 1
+                    if line.startswith('event: '):
+                        self.events[line[len('event: '):]] += 1
+                    elif line.startswith(':'):
+                        self.events['heartbeat'] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.errors += 1
+
+    def summary(self, viewers: int) -> dict:
+        return {
+            'viewers': viewers,
+            'connected': self.connected,
+            'errors': self.errors,
+            'events': dict(self.events),
+            'kb_per_viewer': round(self.bytes / max(self.connected, 1) / 1024, 1)
+        }
+
+
+async def replay_spike(args, base_url: str, seeded, auth) -> tuple[Recorder, LiveViewers, float]:
+    import httpx
+
+    from src.config import settings
+
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    slots = asyncio.Semaphore(args.concurrency)
+
+    # Llegadas concentradas en los primeros segundos tras la publicacion
+    arrivals = sorted(min(rng.expovariate(4 / args.ramp_seconds), args.ramp_seconds) for _ in seeded.player_ids)
+    tokens = [auth.issue_id_token(uid) for uid in seeded.player_ids]
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    viewers = LiveViewers()
+    viewer_limits = httpx.Limits(max_connections=max(args.viewers, 1))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client, \
+            httpx.AsyncClient(base_url=base_url, limits=viewer_limits, timeout=None) as viewer_client:
+        viewer_tasks = [
+            asyncio.create_task(viewers.watch(viewer_client, settings.API_PREFIX, seeded.tournament_id, tokens[index % len(tokens)]))
+            for index in range(args.viewers)
+        ]
+        started = time.perf_counter()
+
+        async def arrive(arrival: float, token: str, player_seed: float):
+            await asyncio.sleep(max(arrival - (time.perf_counter() - started), 0))
+            async with slots:
+                await player_session(
+                    client, recorder, settings.API_PREFIX, seeded.tournament_id, token,
+                    random.Random(player_seed), args.think_ms
+                )
+
+        await asyncio.gather(*[
+            arrive(arrival, token, rng.random())
+            for arrival, token in zip(arrivals, tokens)
+        ])
+        wall_seconds = time.perf_counter() - started
+
+        # Dejar llegar la ultima actualizacion antes de desconectar
+        if viewer_tasks:
+            await asyncio.sleep(settings.LEADERBOARD_STREAM_INTERVAL_SECONDS * 2)
+        for task in viewer_tasks:
+            task.cancel()
+        await asyncio.gather(*viewer_tasks, return_exceptions=True)
+
+        return recorder, viewers, wall_seconds
+
+
+def print_report(rows: list[dict], live: dict, args, wall_seconds: float):
+    total = sum(row['requests'] for row in rows)
+    errors = sum(row['errors'] for row in rows)
+    print(f"\nPico de medianoche: {args.players} jugadores en {args.ramp_seconds} s, "
+          f"concurrencia {args.concurrency}, latencia {args.latency_ms} ms (+{args.jitter_ms} ms)")
+    print(f"{total} solicitudes en {wall_seconds:.1f} s ({total / wall_seconds:.0f} solic/s), {errors} errores\n")
+
+    header = (f"{'endpoint':30} {'solic.':>7} {'error %':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+              f"{'max ms':>8} {'lect.':>6} {'escr.':>6} {'viajes':>7}")
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        print(f"{row['endpoint']:30} {row['requests']:>7} {row['error_rate'] * 100:>8.2f} {row['p50_ms']:>8} "
+              f"{row['p90_ms']:>8} {row['p99_ms']:>8} {row['max_ms']:>8} {row['reads_per_request']:>6} "
+              f"{row['writes_per_request']:>6} {row['round_trips_per_request']:>7}")
+
+    if args.viewers:
+        events = ', '.join(f"{count} {event}" for event, count in sorted(live['events'].items()))
+        print(f"\nRanking en vivo: {live['connected']}/{live['viewers']} clientes conectados, "
+              f"{live['errors']} errores, {live['kb_per_viewer']} KB por cliente")
+        print(f"Eventos recibidos: {events or 'ninguno'}")
+    print()
+
+
+def main():
+    args = parse_args()
+    configure_environment(args)
+
+    port = free_port()
+    process, seeded = start_server(args, port)
+    try:
+        from src.database import get_auth
+
+        recorder, viewers, wall_seconds = asyncio.run(
+            replay_spike(args, f'http://127.0.0.1:{port}', seeded, get_auth())
+        )
+    finally:
+        process.terminate()
+        process.join()
+
+    rows = recorder.summary()
+    live = viewers.summary(args.viewers)
+    if args.json:
+        print(json.dumps({'wall_seconds': round(wall_seconds, 2), 'endpoints': rows, 'live_leaderboard': live}, indent=2))
+    else:
+        print_report(rows, live, args, wall_seconds)
+
+
+if __name__ == '__main__':
+    main()
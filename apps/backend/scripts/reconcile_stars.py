@@ -0,0 +1,73 @@
+"""
+Script para auditar y corregir `totalStars` de los participantes.
+
+Recalcula el total real de cada participante de un torneo: estrellas de sus
+respuestas, mas las de sus retos aprobados, mas su nivelacion
+(`catchUpStars`). Las respuestas se suman en paralelo por rangos de
+`answeredAt`, sin cargarlas todas en memoria. Escribe un CSV con cada
+diferencia y, con --apply, corrige los totales en lotes de 500; los
+participantes que jugaron mientras tanto se saltan y quedan para la proxima
+ejecucion.
+
+Uso:
+    python reconcile_stars.py <tournament_id>
+    python reconcile_stars.py <tournament_id> --workers 16 --report diferencias.csv
+    python reconcile_stars.py <tournament_id> --apply
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.database import get_firestore_client
+from src.scores.reconciliation import reconcile_tournament
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Audita y corrige totalStars de los participantes de un torneo')
+    parser.add_argument('tournament_id')
+    parser.add_argument('--workers', type=int, default=8, help='hilos que leen respuestas en paralelo')
+    parser.add_argument('--partitions', type=int, default=None, help='rangos de answeredAt (por defecto 4 por hilo)')
+    parser.add_argument('--report', default=None, help='ruta del CSV de diferencias')
+    parser.add_argument('--apply', action='store_true', help='corregir los totales en Firestore')
+    return parser.parse_args()
+
+
+def write_report(path: str, diffs):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['user_id', 'recorded', 'expected', 'difference', 'answer_stars', 'challenge_stars', 'catch_up_stars'])
+        for diff in diffs:
+            writer.writerow([diff.user_id, diff.recorded, diff.expected, diff.difference,
+                             diff.answer_stars, diff.challenge_stars, diff.catch_up_stars])
+
+
+def reconcile(args):
+    db = get_firestore_client()
+    started = time.perf_counter()
+
+    result = reconcile_tournament(db, args.tournament_id, args.workers, args.partitions, args.apply)
+    if result is None:
+        print(f"Error: No existe el torneo {args.tournament_id}")
+        sys.exit(1)
+
+    report = args.report or f"conciliacion-{args.tournament_id}-{time.strftime('%Y%m%d-%H%M%S')}.csv"
+    write_report(report, result.diffs)
+
+    print(f"\n{result.tournament_id}: {result.participants} participantes, {result.answers} respuestas, "
+          f"{result.submissions} retos aprobados")
+    print(f"  {len(result.diffs)} participantes con diferencias "
+          f"({sum(diff.difference for diff in result.diffs):+d} estrellas en total), reporte en {report}")
+    if args.apply:
+        print(f"  {result.corrected} corregidos, {result.skipped} cambiaron durante la revision (vuelve a ejecutar)")
+
+    print(f"\n¡Listo! ({time.perf_counter() - started:.1f} s)")
+
+
+if __name__ == '__main__':
+    reconcile(parse_args())
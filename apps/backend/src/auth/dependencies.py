@@ -1,10 +1,11 @@
 from typing import Annotated
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from firebase_admin import auth
 from firebase_admin.auth import InvalidIdTokenError, ExpiredIdTokenError
 
 from src.auth.schemas import FirebaseUser
+from src.auth.token_cache import token_cache
+from src.database import get_auth, run_sync
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
@@ -15,6 +16,9 @@ async def get_firebase_user(
     """
     Verify Firebase ID token and return user information.
 
+    Verified tokens are cached until they expire, so repeated calls with the
+    same token skip the signature check.
+
     Raises:
         HTTPException: If token is missing, expired, or invalid.
     """
@@ -25,10 +29,14 @@ async def get_firebase_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    cached_user = token_cache.get(token.credentials)
+    if cached_user is not None:
+        return cached_user
+
     try:
-        decoded_token = auth.verify_id_token(token.credentials)
+        decoded_token = await run_sync(get_auth().verify_id_token, token.credentials)
 
-        return FirebaseUser(
+        user = FirebaseUser(
             uid=decoded_token["uid"],
             email=decoded_token.get("email"),
             email_verified=decoded_token.get("email_verified", False),
@@ -36,6 +44,8 @@ async def get_firebase_user(
             is_admin=decoded_token.get("admin", False),
             is_moderator=decoded_token.get("moderator", False)
         )
+        token_cache.put(token.credentials, user, decoded_token.get("exp"))
+        return user
 
     except ExpiredIdTokenError:
         raise HTTPException(
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, HTTPException, status
-from firebase_admin import auth
 
 from src.auth.dependencies import CurrentUser, AdminUser
 from src.auth.schemas import UserProfile, SetAdminRequest
-from src.database import get_firestore_client
+from src.auth.token_cache import token_cache
+from src.database import get_auth, get_firestore_client, get_document, run_sync
+from src.idempotency import IdempotentRoute
 
-router = APIRouter()
+router = APIRouter(route_class=IdempotentRoute)
 
 
 @router.get("/me", response_model=UserProfile)
@@ -13,7 +14,7 @@ async def get_current_user_profile(current_user: CurrentUser):
     """Get the current user's profile."""
     db = get_firestore_client()
     user_ref = db.collection("users").document(current_user.uid)
-    user_doc = user_ref.get()
+    user_doc = await get_document(user_ref)
 
     if not user_doc.exists:
         raise HTTPException(
@@ -42,14 +43,14 @@ async def set_user_admin_status(
     """Set admin status for a user. Only admins can do this."""
     try:
         # Set custom claims
-        auth.set_custom_user_claims(request.user_id, {
+        await run_sync(get_auth().set_custom_user_claims, request.user_id, {
             "admin": request.is_admin
         })
 
         # Update user document
         db = get_firestore_client()
         user_ref = db.collection("users").document(request.user_id)
-        user_ref.update({
+        await run_sync(user_ref.update, {
             "role": "admin" if request.is_admin else "player"
         })
 
@@ -74,3 +75,9 @@ async def verify_token(current_user: CurrentUser):
         "email": current_user.email,
         "is_admin": current_user.is_admin
     }
+
+
+@router.get("/token-cache/stats")
+async def get_token_cache_stats(admin_user: AdminUser):
+    """Get verified-token cache counters. Admin only."""
+    return token_cache.stats()
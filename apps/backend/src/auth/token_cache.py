@@ -0,0 +1,64 @@
+import asyncio
+import hashlib
+import time
+
+from firebase_admin import auth
+
+from src.auth.schemas import FirebaseUser
+from src.cache import LRUCache
+from src.config import settings
+from src.database import initialize_firebase, run_sync, use_memory_backend
+
+
+class TokenCache(LRUCache):
+    """
+    LRU cache of verified ID tokens.
+
+    Entries are keyed by the SHA-256 of the token and expire at the token's
+    own `exp` claim or after `ttl_seconds`, whichever comes first.
+    """
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> FirebaseUser | None:
+        """Return the cached user for a token, or None if missing or expired."""
+        return super().get(self._key(token))
+
+    def put(self, token: str, user: FirebaseUser, exp: float | None = None):
+        """Cache a verified user until the token expires."""
+        ttl_seconds = self.ttl_seconds
+        if exp is not None:
+            ttl_seconds = min(ttl_seconds, exp - time.time())
+        super().put(self._key(token), user, ttl_seconds)
+
+
+token_cache = TokenCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+    ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
+
+def _refresh_public_keys():
+    """Fetch Google's token signing certificates into the SDK's HTTP cache."""
+    from firebase_admin import _token_gen
+
+    client = auth._get_client(initialize_firebase())
+    client._token_verifier.request(_token_gen.ID_TOKEN_CERT_URI)
+
+
+async def refresh_public_keys_forever():
+    """Keep the signing certificates warm so requests never wait on a download."""
+    if use_memory_backend():
+        return
+
+    while True:
+        try:
+            await run_sync(_refresh_public_keys)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error refreshing token certificates: {e}")
+
+        await asyncio.sleep(settings.TOKEN_CERTS_REFRESH_SECONDS)
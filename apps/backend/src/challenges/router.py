@@ -1,12 +1,17 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Response, status
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
+import asyncio
 
 from src.auth.dependencies import CurrentUser, ModeratorUser
-from src.database import get_firestore_client
+from src.database import get_firestore_client, get_document, get_documents, stream_query, run_sync
+from src.pagination import decode_cursor, set_next_cursor
+from src.scores.leaderboard import record_stars
+from src.serialization import json_datetime, json_response
+from src.idempotency import IdempotentRoute
 
-router = APIRouter()
+router = APIRouter(route_class=IdempotentRoute)
 
 
 class SubmissionResponse(BaseModel):
@@ -20,6 +25,15 @@ class SubmissionResponse(BaseModel):
     submitted_at: datetime
 
 
+class SubmissionRequest(BaseModel):
+    video_url: str
+
+
+class PendingSummaryEntry(BaseModel):
+    challenge_id: str
+    pending_count: int
+
+
 class ReviewRequest(BaseModel):
     submission_id: str
     challenge_id: str
@@ -27,45 +41,163 @@ class ReviewRequest(BaseModel):
     comment: Optional[str] = None
 
 
+def _submission_payload(doc) -> dict:
+    """A SubmissionResponse as plain JSON data, from a collection-group submission snapshot."""
+    data = doc.to_dict()
+    stars_awarded = data.get("starsAwarded")
+    return {
+        "id": doc.id,
+        "challenge_id": doc.reference.parent.parent.id,
+        "user_id": data.get("oderId", ""),
+        "user_name": data.get("oderName", "Usuario"),
+        "video_url": data.get("videoURL", ""),
+        "status": data.get("status", "pending"),
+        "stars_awarded": int(stars_awarded) if stars_awarded is not None else None,
+        "submitted_at": json_datetime(data.get("submittedAt") or datetime.now())
+    }
+
+
+async def _list_submissions(db, query, limit: int, start_after: str | None) -> Response:
+    """
+    Run a page of a `submissions` collection-group query.
+
+    The query must be ordered by submittedAt and then by document path.
+    """
+    if start_after:
+        try:
+            submitted_at, path = decode_cursor(start_after)
+            query = query.start_after({
+                "submittedAt": datetime.fromisoformat(submitted_at),
+                "__name__": db.document(path)
+            })
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor invalido"
+            )
+
+    docs = await stream_query(query.limit(limit))
+    response = json_response([_submission_payload(doc) for doc in docs])
+
+    if len(docs) == limit:
+        last = docs[-1]
+        set_next_cursor(response, [last.get("submittedAt").isoformat(), last.reference.path])
+
+    return response
+
+
 @router.get("/pending", response_model=List[SubmissionResponse])
-async def get_pending_submissions(moderator: ModeratorUser):
-    """Get all pending video submissions. Moderator only."""
+async def get_pending_submissions(
+    moderator: ModeratorUser,
+    limit: int = Query(50, ge=1, le=200),
+    start_after: str | None = None
+):
+    """
+    Get pending video submissions, oldest first. Moderator only.
+
+    Pages are chained through the `X-Next-Cursor` response header, passed
+    back as `start_after`.
+    """
+    db = get_firestore_client()
+
+    query = db.collection_group("submissions").where("status", "==", "pending").order_by(
+        "submittedAt"
+    ).order_by("__name__")
+
+    return await _list_submissions(db, query, limit, start_after)
+
+
+@router.get("/pending/summary", response_model=List[PendingSummaryEntry])
+async def get_pending_summary(moderator: ModeratorUser):
+    """Get the number of pending submissions per challenge. Moderator only."""
     db = get_firestore_client()
 
-    # Query all submissions with status 'pending'
-    # Note: This requires a collection group query
-    submissions = []
+    docs = await stream_query(
+        db.collection("challenges").where("pendingCount", ">", 0).select(["pendingCount"])
+    )
+
+    return [
+        PendingSummaryEntry(challenge_id=doc.id, pending_count=doc.get("pendingCount"))
+        for doc in docs
+    ]
 
-    challenges_ref = db.collection("challenges")
-    for challenge_doc in challenges_ref.stream():
-        submissions_ref = challenge_doc.reference.collection("submissions")
-        pending_docs = submissions_ref.where("status", "==", "pending").stream()
 
-        for doc in pending_docs:
-            data = doc.to_dict()
-            submissions.append(SubmissionResponse(
-                id=doc.id,
-                challenge_id=challenge_doc.id,
-                user_id=data.get("oderId", ""),
-                user_name=data.get("oderName", "Usuario"),
-                video_url=data.get("videoURL", ""),
-                status=data.get("status", "pending"),
-                stars_awarded=data.get("starsAwarded"),
-                submitted_at=data.get("submittedAt").datetime if data.get("submittedAt") else datetime.now()
-            ))
+@router.post("/{challenge_id}/submissions")
+async def create_submission(challenge_id: str, request: SubmissionRequest, current_user: CurrentUser):
+    """
+    Submit a video for a challenge.
 
-    return submissions
+    A day's challenge has the id of its `dailyContent` document; its
+    challenge document is created with the first submission. A user can
+    only have one pending submission per challenge.
+    """
+    from google.cloud.firestore import SERVER_TIMESTAMP, Increment
+
+    db = get_firestore_client()
+
+    challenge_ref = db.collection("challenges").document(challenge_id)
+    daily_content_ref = db.collection("dailyContent").document(challenge_id)
+    pending_query = challenge_ref.collection("submissions").where("oderId", "==", current_user.uid).where(
+        "status", "==", "pending"
+    ).limit(1).select(["__name__"])
+
+    docs, pending = await asyncio.gather(
+        get_documents([challenge_ref, daily_content_ref]),
+        stream_query(pending_query)
+    )
+    # get_all doesn't keep the order of the references
+    docs = {doc.reference.path: doc for doc in docs}
+    challenge_doc, daily_content_doc = docs[challenge_ref.path], docs[daily_content_ref.path]
+
+    if not challenge_doc.exists and not daily_content_doc.exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Desafio no encontrado"
+        )
+    if pending:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ya tienes un video pendiente de revision para este desafio"
+        )
+
+    challenge_update = {"pendingCount": Increment(1)}
+    if not challenge_doc.exists:
+        daily_content = daily_content_doc.to_dict()
+        challenge_update.update({
+            "tournamentId": daily_content.get("tournamentId"),
+            "weekNumber": daily_content.get("weekNumber"),
+            "dayNumber": daily_content.get("dayNumber")
+        })
+
+    submission_ref = challenge_ref.collection("submissions").document()
+
+    batch = db.batch()
+    batch.set(submission_ref, {
+        "oderId": current_user.uid,
+        "oderName": current_user.display_name or (current_user.email or "").split("@")[0] or "Usuario",
+        "videoURL": request.video_url,
+        "status": "pending",
+        "submittedAt": SERVER_TIMESTAMP
+    })
+    batch.set(challenge_ref, challenge_update, merge=True)
+    await run_sync(batch.commit)
+
+    return {"success": True, "submission_id": submission_ref.id}
 
 
 @router.post("/review")
 async def review_submission(request: ReviewRequest, moderator: ModeratorUser):
     """Review a video submission. Moderator only."""
-    from google.cloud.firestore import SERVER_TIMESTAMP
+    from google.api_core.exceptions import FailedPrecondition, NotFound
+    from google.cloud.firestore import SERVER_TIMESTAMP, Increment
 
     db = get_firestore_client()
 
-    submission_ref = db.collection("challenges").document(request.challenge_id).collection("submissions").document(request.submission_id)
-    submission_doc = submission_ref.get()
+    challenge_ref = db.collection("challenges").document(request.challenge_id)
+    submission_ref = challenge_ref.collection("submissions").document(request.submission_id)
+    # get_all doesn't keep the order of the references
+    docs = {doc.reference.path: doc for doc in await get_documents([submission_ref, challenge_ref])}
+    submission_doc, challenge_doc = docs[submission_ref.path], docs[challenge_ref.path]
 
     if not submission_doc.exists:
         raise HTTPException(
@@ -75,32 +207,54 @@ async def review_submission(request: ReviewRequest, moderator: ModeratorUser):
 
     submission_data = submission_doc.to_dict()
     user_id = submission_data.get("oderId")
+    was_pending = submission_data.get("status", "pending") == "pending"
 
     stars_awarded = 5 if request.approved else 0
     new_status = "approved" if request.approved else "rejected"
 
-    # Update submission
-    submission_ref.update({
+    # Stars are only credited when a pending submission is approved, so
+    # reviewing it again never credits them twice
+    participant_ref = None
+    tournament_id = challenge_doc.to_dict().get("tournamentId") if challenge_doc.exists else None
+    if request.approved and was_pending and user_id and tournament_id:
+        participant_ref = db.collection("tournaments").document(tournament_id).collection("participants").document(user_id)
+        if not (await get_document(participant_ref)).exists:
+            participant_ref = None
+
+    # Update the submission, the challenge's pending count and the
+    # participant's stars together. The commit is conditioned on the
+    # snapshot we read, so of two concurrent reviews only one applies.
+    review = {
         "status": new_status,
         "starsAwarded": stars_awarded,
         "reviewedBy": moderator.uid,
         "reviewedAt": SERVER_TIMESTAMP,
         "reviewComment": request.comment
-    })
+    }
+    # Lets ranking and reconciliation query one tournament's reviewed submissions
+    if tournament_id:
+        review["tournamentId"] = tournament_id
 
-    # If approved, update user's stars
-    if request.approved and user_id:
-        # Find the tournament from the challenge
-        challenge_doc = db.collection("challenges").document(request.challenge_id).get()
-        if challenge_doc.exists:
-            tournament_id = challenge_doc.to_dict().get("tournamentId")
-            if tournament_id:
-                participant_ref = db.collection("tournaments").document(tournament_id).collection("participants").document(user_id)
-                participant_doc = participant_ref.get()
+    batch = db.batch()
+    batch.update(submission_ref, review, option=db.write_option(last_update_time=submission_doc.update_time))
+    # Submissions pending since before pendingCount was kept aren't in it until
+    # scripts/backfill_pending_counts.py runs; never take the count below zero
+    pending_count = challenge_doc.to_dict().get("pendingCount", 0) if challenge_doc.exists else 0
+    if was_pending and pending_count > 0:
+        batch.update(challenge_ref, {"pendingCount": Increment(-1)})
+    if participant_ref is not None:
+        batch.update(participant_ref, {"totalStars": Increment(stars_awarded), "updatedAt": SERVER_TIMESTAMP})
 
-                if participant_doc.exists:
-                    current_stars = participant_doc.to_dict().get("totalStars", 0)
-                    participant_ref.update({"totalStars": current_stars + stars_awarded})
+    try:
+        await run_sync(batch.commit)
+    except (FailedPrecondition, NotFound):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La entrega fue modificada por otro moderador. Intenta de nuevo."
+        )
+
+    if participant_ref is not None:
+        record_stars(tournament_id, user_id, stars_awarded)
 
     return {
         "success": True,
@@ -110,8 +264,18 @@ async def review_submission(request: ReviewRequest, moderator: ModeratorUser):
 
 
 @router.get("/user/{user_id}", response_model=List[SubmissionResponse])
-async def get_user_submissions(user_id: str, current_user: CurrentUser):
-    """Get all submissions for a user."""
+async def get_user_submissions(
+    user_id: str,
+    current_user: CurrentUser,
+    limit: int = Query(50, ge=1, le=200),
+    start_after: str | None = None
+):
+    """
+    Get a user's submissions, newest first.
+
+    Pages are chained through the `X-Next-Cursor` response header, passed
+    back as `start_after`.
+    """
     # Only allow users to see their own submissions or moderators to see any
     if current_user.uid != user_id and not (current_user.is_admin or current_user.is_moderator):
         raise HTTPException(
@@ -120,24 +284,9 @@ async def get_user_submissions(user_id: str, current_user: CurrentUser):
         )
 
     db = get_firestore_client()
-    submissions = []
-
-    challenges_ref = db.collection("challenges")
-    for challenge_doc in challenges_ref.stream():
-        submissions_ref = challenge_doc.reference.collection("submissions")
-        user_docs = submissions_ref.where("oderId", "==", user_id).stream()
-
-        for doc in user_docs:
-            data = doc.to_dict()
-            submissions.append(SubmissionResponse(
-                id=doc.id,
-                challenge_id=challenge_doc.id,
-                user_id=data.get("oderId", ""),
-                user_name=data.get("oderName", "Usuario"),
-                video_url=data.get("videoURL", ""),
-                status=data.get("status", "pending"),
-                stars_awarded=data.get("starsAwarded"),
-                submitted_at=data.get("submittedAt").datetime if data.get("submittedAt") else datetime.now()
-            ))
-
-    return submissions
+
+    query = db.collection_group("submissions").where("oderId", "==", user_id).order_by(
+        "submittedAt", direction="DESCENDING"
+    ).order_by("__name__", direction="DESCENDING")
+
+    return await _list_submissions(db, query, limit, start_after)
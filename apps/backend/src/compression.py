@@ -0,0 +1,176 @@
+import zlib
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+
+
+# Media types worth compressing. Event streams are left alone so every event
+# reaches the client as soon as it is sent.
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+UNCOMPRESSIBLE_TYPES = ("text/event-stream",)
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """Pick "br" or "gzip" from an Accept-Encoding header, or None for identity."""
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    default = qualities.get("*", 0.0)
+    br = qualities.get("br", default)
+    gzip = qualities.get("gzip", default)
+    if br > 0 and br >= gzip:
+        return "br"
+    if gzip > 0:
+        return "gzip"
+    return None
+
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        # Sync flush so a streamed chunk can be decoded as soon as it arrives
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON and text responses with brotli or gzip.
+
+    Bodies are compressed only from `minimum_size` bytes, since small ones
+    gain nothing from it; long bodies are compressed chunk by chunk as they
+    stream. A strong ETag becomes weak once the body is compressed, as it no
+    longer names the exact bytes sent; If-None-Match uses weak comparison,
+    so conditional requests keep working.
+    """
+
+    def __init__(self, app, minimum_size: int = 1000, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await _CompressedResponse(self, encoding, send).run(scope, receive)
+
+
+class _CompressedResponse:
+    """
+    Holds back the response start until the body shows whether to compress.
+
+    Bodies arrive in several chunks when they pass through a function
+    middleware, so chunks are buffered until either `minimum_size` bytes or
+    the end of the body has been seen.
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.headers = None
+        self.pending = []
+        self.pending_size = 0
+        self.compressor = None
+        self.passthrough = False
+
+    async def run(self, scope, receive):
+        await self.middleware.app(scope, receive, self.send_compressed)
+
+    def _new_compressor(self):
+        if self.encoding == "br":
+            return _BrotliCompressor(self.middleware.brotli_quality)
+        return _GzipCompressor(self.middleware.gzip_level)
+
+    def _is_compressible(self) -> bool:
+        if "content-encoding" in self.headers:
+            return False
+        content_type = self.headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(UNCOMPRESSIBLE_TYPES)
+
+    def _start_compressing(self):
+        self.compressor = self._new_compressor()
+        self.headers["Content-Encoding"] = self.encoding
+        self.headers.add_vary_header("Accept-Encoding")
+        etag = self.headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            self.headers["ETag"] = f"W/{etag}"
+
+    async def send_compressed(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            self.headers = MutableHeaders(raw=message["headers"])
+            if not self._is_compressible():
+                self.passthrough = True
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is not None:
+            chunk = self.compressor.compress(body)
+            if not more_body:
+                chunk += self.compressor.finish()
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        self.pending.append(body)
+        self.pending_size += len(body)
+        if more_body and self.pending_size < self.middleware.minimum_size:
+            return
+
+        body = b"".join(self.pending)
+        self.pending = []
+
+        if not more_body:
+            # The whole body is known: compress it in one go, or send it as it is
+            if len(body) >= self.middleware.minimum_size:
+                self._start_compressing()
+                body = self.compressor.compress(body) + self.compressor.finish()
+                self.headers["Content-Length"] = str(len(body))
+            await self.send(self.start_message)
+            await self.send({"type": "http.response.body", "body": body})
+            return
+
+        self._start_compressing()
+        del self.headers["Content-Length"]
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": self.compressor.compress(body), "more_body": True})
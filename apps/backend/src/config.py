@@ -1,8 +1,13 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from pathlib import Path
 import json
 import base64
 
+# apps/backend: .env and relative credential paths are looked up here, so
+# scripts work wherever they are run from
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
@@ -17,6 +22,84 @@ class Settings(BaseSettings):
     FIREBASE_CREDENTIALS_PATH: str | None = None
     FIREBASE_CREDENTIALS_BASE64: str | None = None
 
+    # "firebase", or "memory" for the offline in-memory stand-in (never in production)
+    FIREBASE_BACKEND: str = "firebase"
+    MEMORY_LATENCY_MS: float = 0.0
+    MEMORY_LATENCY_JITTER_MS: float = 0.0
+    MEMORY_AUTH_SECRET: str = "memory-backend-test-key"
+
+    # Firestore
+    FIRESTORE_MAX_WORKERS: int = 16
+    COUNTER_SHARDS: int = 10
+    COUNTER_CACHE_TTL_SECONDS: int = 5
+
+    # Caches
+    QUESTION_CACHE_MAX_SIZE: int = 2000
+    QUESTION_CACHE_TTL_SECONDS: int = 3600
+    # How soon other workers drop their cached questions after an edit or import
+    QUESTION_CACHE_VERSION_POLL_SECONDS: float = 5.0
+    DAILY_QUESTIONS_CACHE_MAX_SIZE: int = 500
+    DAILY_QUESTIONS_EMPTY_TTL_SECONDS: int = 60
+    DAILY_QUESTIONS_WARMUP_SECONDS: int = 120
+    TOURNAMENT_CACHE_MAX_SIZE: int = 500
+    TOURNAMENT_CACHE_TTL_SECONDS: int = 30
+
+    # HTTP caching of read endpoints. Only make it public if the CDN
+    # in front of the API still requires a valid token.
+    HTTP_CACHE_MAX_AGE_SECONDS: int = 30
+    HTTP_CACHE_PUBLIC: bool = False
+    QUESTION_BUNDLE_MAX_AGE_SECONDS: int = 300
+
+    # Response compression (gzip, or brotli when the client accepts it)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1000
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 5
+
+    # Leaderboard
+    LEADERBOARD_REFRESH_SECONDS: int = 60
+    LEADERBOARD_SYNC_OVERLAP_SECONDS: int = 10
+
+    # Ranking job: materializes rank and weeklyStars (0 disables the periodic run)
+    RANKING_INTERVAL_SECONDS: int = 3600
+    RANKING_SETTLE_SECONDS: int = 60
+
+    # Live leaderboard stream (Server-Sent Events)
+    LEADERBOARD_STREAM_INTERVAL_SECONDS: float = 1.0
+    LEADERBOARD_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    LEADERBOARD_STREAM_MAX_PENDING: int = 500
+    LEADERBOARD_STREAM_MAX_CLIENTS: int = 5000
+
+    # Bulk question import (15 weeks x 7 days x 5 questions is 525)
+    QUESTION_IMPORT_MAX_ROWS: int = 5000
+
+    # Auth
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 600
+    TOKEN_CERTS_REFRESH_SECONDS: int = 300
+
+    # Idempotency
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 24 * 60 * 60
+    IDEMPOTENCY_CACHE_MAX_SIZE: int = 10000
+    IDEMPOTENCY_PURGE_SECONDS: int = 60 * 60
+    # A request holding a key: how long before another may take it over,
+    # and how long a retry waits for its response before answering 409
+    IDEMPOTENCY_PENDING_TTL_SECONDS: int = 60
+    IDEMPOTENCY_PENDING_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_PENDING_POLL_SECONDS: float = 0.1
+
+    # Observability
+    METRICS_ENABLED: bool = True
+    # Bearer token GET /metrics requires; without one it is only served in development
+    METRICS_TOKEN: str | None = None
+    REQUEST_LOG_ENABLED: bool = True
+
+    # Profiling (requires pyinstrument)
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_SECONDS: float = 0.001
+    PROFILING_DIR: str = "profiles"
+
     # CORS
     CORS_ORIGINS: str = "http://localhost:4200"
 
@@ -24,7 +107,8 @@ class Settings(BaseSettings):
     API_PREFIX: str = "/api/v1"
 
     class Config:
-        env_file = ".env"
+        # A .env in the working directory overrides the backend's
+        env_file = (BACKEND_DIR / ".env", ".env")
         env_file_encoding = "utf-8"
 
     @property
@@ -32,6 +116,13 @@ class Settings(BaseSettings):
         """Parse CORS origins from comma-separated string."""
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
 
+    @property
+    def firebase_credentials_path(self) -> str | None:
+        """FIREBASE_CREDENTIALS_PATH, relative to the backend directory unless absolute."""
+        if not self.FIREBASE_CREDENTIALS_PATH:
+            return None
+        return str(BACKEND_DIR / self.FIREBASE_CREDENTIALS_PATH)
+
     def get_firebase_credentials(self) -> dict | None:
         """Get Firebase credentials from base64 or file path."""
         if self.FIREBASE_CREDENTIALS_BASE64:
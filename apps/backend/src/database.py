@@ -1,16 +1,42 @@
+import asyncio
+import contextvars
+import os
+import random
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import partial
+
 import firebase_admin
 from firebase_admin import credentials, firestore, auth, storage
+from src.cache import LRUCache
 from src.config import settings
+from src.metrics import record_firestore_call
 
 
 _firebase_app = None
 _firestore_client = None
+_memory_auth = None
+_executor = None
+
+
+def use_memory_backend() -> bool:
+    """Whether the offline in-memory stand-ins replace Firebase."""
+    if settings.FIREBASE_BACKEND != "memory":
+        return False
+    if settings.ENVIRONMENT == "production":
+        raise RuntimeError("FIREBASE_BACKEND=memory is not allowed in production")
+    return True
 
 
 def initialize_firebase():
     """Initialize Firebase Admin SDK."""
     global _firebase_app
 
+    if use_memory_backend():
+        return None
+
     if _firebase_app is not None:
         return _firebase_app
 
@@ -24,8 +50,8 @@ def initialize_firebase():
     cred_dict = settings.get_firebase_credentials()
     if cred_dict:
         cred = credentials.Certificate(cred_dict)
-    elif settings.FIREBASE_CREDENTIALS_PATH:
-        cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
+    elif settings.firebase_credentials_path:
+        cred = credentials.Certificate(settings.firebase_credentials_path)
     else:
         # Use application default credentials (for Google Cloud environments)
         cred = credentials.ApplicationDefault()
@@ -38,19 +64,108 @@ def initialize_firebase():
     return _firebase_app
 
 
+class InstrumentedFirestoreAPI:
+    """
+    Proxy over the SDK's low-level Firestore API that records the reads,
+    writes, aggregations and latency of every RPC in `src.metrics`.
+    """
+
+    def __init__(self, api):
+        self._api = api
+
+    def __getattr__(self, name):
+        return getattr(self._api, name)
+
+    def commit(self, *args, **kwargs):
+        request = kwargs.get("request") or {}
+        started = time.perf_counter()
+        try:
+            return self._api.commit(*args, **kwargs)
+        finally:
+            record_firestore_call(
+                writes=len(request.get("writes", [])),
+                seconds=time.perf_counter() - started
+            )
+
+    def begin_transaction(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._api.begin_transaction(*args, **kwargs)
+        finally:
+            record_firestore_call(seconds=time.perf_counter() - started)
+
+    def batch_get_documents(self, *args, **kwargs):
+        request = kwargs.get("request") or {}
+        started = time.perf_counter()
+        try:
+            yield from self._api.batch_get_documents(*args, **kwargs)
+        finally:
+            # Every requested document is billed, found or not
+            record_firestore_call(
+                reads=len(request.get("documents", [])),
+                seconds=time.perf_counter() - started
+            )
+
+    def run_query(self, *args, **kwargs):
+        started = time.perf_counter()
+        documents = 0
+        try:
+            for response in self._api.run_query(*args, **kwargs):
+                if response.document:
+                    documents += 1
+                yield response
+        finally:
+            # Queries are billed at least one read, even when empty
+            record_firestore_call(
+                reads=max(documents, 1),
+                seconds=time.perf_counter() - started
+            )
+
+    def run_aggregation_query(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            yield from self._api.run_aggregation_query(*args, **kwargs)
+        finally:
+            record_firestore_call(
+                reads=1,
+                aggregations=1,
+                seconds=time.perf_counter() - started
+            )
+
+
 def get_firestore_client():
     """Get Firestore client instance."""
     global _firestore_client
 
+    if _firestore_client is None and use_memory_backend():
+        from src.inmemory import MemoryFirestore
+
+        _firestore_client = MemoryFirestore(
+            latency_ms=settings.MEMORY_LATENCY_MS,
+            jitter_ms=settings.MEMORY_LATENCY_JITTER_MS
+        )
+
     if _firestore_client is None:
         initialize_firebase()
         _firestore_client = firestore.client()
+        _firestore_client._firestore_api_internal = InstrumentedFirestoreAPI(
+            _firestore_client._firestore_api
+        )
 
     return _firestore_client
 
 
 def get_auth():
     """Get Firebase Auth instance."""
+    global _memory_auth
+
+    if use_memory_backend():
+        if _memory_auth is None:
+            from src.inmemory import MemoryAuth
+
+            _memory_auth = MemoryAuth(settings.MEMORY_AUTH_SECRET)
+        return _memory_auth
+
     initialize_firebase()
     return auth
 
@@ -61,6 +176,248 @@ def get_storage():
     return storage.bucket()
 
 
+def get_executor() -> ThreadPoolExecutor:
+    """Get the bounded thread pool used for blocking Firebase calls."""
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.FIRESTORE_MAX_WORKERS,
+            thread_name_prefix="firestore"
+        )
+
+    return _executor
+
+
+def shutdown_executor():
+    """Shut down the Firebase thread pool."""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+async def run_sync(func, *args, **kwargs):
+    """Run a blocking Firebase SDK call without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    # Carry the request context over so Firestore costs are attributed to it
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), partial(context.run, func, *args, **kwargs))
+
+
+async def get_document(ref):
+    """Fetch a document snapshot."""
+    return await run_sync(ref.get)
+
+
+async def get_documents(refs: list) -> list:
+    """Fetch several document snapshots in a single round trip."""
+    if not refs:
+        return []
+    return await run_sync(lambda: list(get_firestore_client().get_all(refs)))
+
+
+async def stream_query(query) -> list:
+    """Run a query and return all matching document snapshots."""
+    return await run_sync(lambda: list(query.stream()))
+
+
+async def count_query(query) -> int:
+    """Run a count aggregation and return its value."""
+    result = await run_sync(query.count().get)
+    return result[0][0].value if result else 0
+
+
+# Maximum number of writes Firestore accepts in one batch
+BATCH_LIMIT = 500
+
+
+class ChunkedBatch:
+    """
+    Write batch that commits itself every `limit` writes.
+
+    Meant for scripts and background jobs that write more documents than fit
+    in one batch. Call `flush()` to commit the remainder.
+    """
+
+    def __init__(self, db, limit: int = BATCH_LIMIT):
+        self.db = db
+        self.limit = limit
+        self.committed = 0
+        self._batch = db.batch()
+        self._pending = 0
+
+    def set(self, ref, data: dict, merge: bool = False):
+        self._batch.set(ref, data, merge=merge)
+        self._added()
+
+    def update(self, ref, data: dict):
+        self._batch.update(ref, data)
+        self._added()
+
+    def delete(self, ref):
+        self._batch.delete(ref)
+        self._added()
+
+    def _added(self):
+        self._pending += 1
+        if self._pending >= self.limit:
+            self.flush()
+
+    def flush(self):
+        """Commit pending writes, if any."""
+        if self._pending:
+            self._batch.commit()
+            self.committed += self._pending
+            self._batch = self.db.batch()
+            self._pending = 0
+
+
+def commit_if_unchanged(db, updates: list[tuple]) -> tuple[int, int]:
+    """
+    Commit (reference, update_time, field updates) in one batch, each only if
+    its document still has the update time it was read with.
+
+    If the batch fails because a document changed meanwhile, every update is
+    committed on its own and the changed documents are skipped, for a later
+    run to pick up. Returns (committed, skipped).
+    """
+    from google.api_core.exceptions import FailedPrecondition
+
+    def add(batch, ref, update_time, field_updates):
+        batch.update(ref, field_updates, option=db.write_option(last_update_time=update_time))
+
+    batch = db.batch()
+    for update in updates:
+        add(batch, *update)
+    try:
+        batch.commit()
+        return len(updates), 0
+    except FailedPrecondition:
+        pass
+
+    committed = 0
+    for update in updates:
+        batch = db.batch()
+        add(batch, *update)
+        try:
+            batch.commit()
+            committed += 1
+        except FailedPrecondition:
+            pass
+    return committed, len(updates) - committed
+
+
+# (parent path, field) -> summed shard value
+_counter_cache = LRUCache(max_size=1000, ttl_seconds=settings.COUNTER_CACHE_TTL_SECONDS)
+
+
+class ShardedCounter:
+    """
+    A counter spread over `num_shards` documents in `{parent}/counterShards`.
+
+    Increments go to a random shard, so concurrent writers don't contend on a
+    single document. Reads sum every shard and are cached for a few seconds.
+    """
+
+    def __init__(self, parent_ref, field: str, num_shards: int | None = None):
+        self.parent_ref = parent_ref
+        self.field = field
+        self.num_shards = num_shards or settings.COUNTER_SHARDS
+
+    def _shards(self):
+        return self.parent_ref.collection("counterShards")
+
+    def increment(self, batch, amount: int = 1):
+        """Add an increment of a random shard to a write batch or transaction."""
+        from google.cloud.firestore import Increment
+
+        shard_ref = self._shards().document(str(random.randrange(self.num_shards)))
+        batch.set(shard_ref, {self.field: Increment(amount)}, merge=True)
+
+    @property
+    def cache_key(self) -> tuple[str, str]:
+        return self.parent_ref.path, self.field
+
+    def shard_refs(self) -> list:
+        return [self._shards().document(str(shard)) for shard in range(self.num_shards)]
+
+    def invalidate(self):
+        """Drop the cached value, so this process reads its own increments."""
+        _counter_cache.invalidate(self.cache_key)
+
+    async def get_value(self) -> int:
+        """Sum the counter's shards."""
+        value = _counter_cache.get(self.cache_key)
+        if value is not None:
+            return value
+
+        docs = await stream_query(self._shards().select([self.field]))
+        value = sum(doc.to_dict().get(self.field, 0) for doc in docs)
+        _counter_cache.put(self.cache_key, value)
+        return value
+
+
+async def get_counter_values(counters: list[ShardedCounter]) -> list[int]:
+    """
+    Sum several counters' shards, reading all the uncached ones in one round trip.
+
+    Shards are fetched by id, so this only sees shards below `num_shards`,
+    the same ones `increment` writes to.
+    """
+    values = [_counter_cache.get(counter.cache_key) for counter in counters]
+    missing = [counter for counter, value in zip(counters, values) if value is None]
+    if not missing:
+        return values
+
+    totals = {counter.cache_key: 0 for counter in missing}
+    # get_all doesn't keep the order of the references
+    shard_counters = {}
+    for counter in missing:
+        for ref in counter.shard_refs():
+            shard_counters[ref.path] = counter
+    for doc in await get_documents([ref for counter in missing for ref in counter.shard_refs()]):
+        if doc.exists:
+            counter = shard_counters[doc.reference.path]
+            totals[counter.cache_key] += doc.to_dict().get(counter.field, 0)
+
+    for key, value in totals.items():
+        _counter_cache.put(key, value)
+    return [totals[counter.cache_key] if value is None else value for counter, value in zip(counters, values)]
+
+
+# Identifies this process as the holder of a job lease
+_LEASE_HOLDER = f"{socket.gethostname()}-{os.getpid()}"
+
+
+def acquire_lease(db, name: str, seconds: float) -> bool:
+    """
+    Try to take the lease `jobLeases/{name}` for `seconds`.
+
+    Lets a periodic job run in one process only when several workers start
+    it. The lease is created, or taken over once expired, with a
+    precondition on the document, so two processes can't both win.
+    """
+    from google.api_core.exceptions import AlreadyExists, FailedPrecondition
+
+    lease_ref = db.collection("jobLeases").document(name)
+    now = datetime.now(timezone.utc)
+    lease = {"holder": _LEASE_HOLDER, "expiresAt": now + timedelta(seconds=seconds)}
+
+    snapshot = lease_ref.get()
+    try:
+        if not snapshot.exists:
+            lease_ref.create(lease)
+        elif snapshot.to_dict().get("expiresAt", now) <= now:
+            lease_ref.update(lease, option=db.write_option(last_update_time=snapshot.update_time))
+        else:
+            return False
+    except (AlreadyExists, FailedPrecondition):
+        return False
+    return True
+
+
 # Dependency for FastAPI
 def get_db():
     """FastAPI dependency for Firestore client."""
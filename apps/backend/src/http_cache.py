@@ -0,0 +1,53 @@
+import hashlib
+import json
+
+from fastapi import Request, Response, status
+
+from src.config import settings
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag of an encoded response body."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def content_etag(value) -> str:
+    """Strong ETag derived from the content of a JSON-serializable value."""
+    return body_etag(json.dumps(value, sort_keys=True, default=str, separators=(",", ":")).encode())
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names this ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/ prefixes added by proxies still match
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+
+def cache_control(max_age: int) -> str:
+    """
+    Cache-Control for responses that are the same for every user.
+
+    They stay private to the browser unless HTTP_CACHE_PUBLIC lets shared
+    caches (a CDN in front of the API) store them too.
+    """
+    max_age = max(int(max_age), 0)
+    if settings.HTTP_CACHE_PUBLIC:
+        return f"public, max-age={max_age}, s-maxage={max_age}"
+    return f"private, max-age={max_age}"
+
+
+def set_cache_headers(response: Response, etag: str, max_age: int):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control(max_age)
+
+
+def not_modified(etag: str, max_age: int, headers: dict | None = None) -> Response:
+    """A 304 carrying the headers the full response would have had."""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": cache_control(max_age), **(headers or {})}
+    )
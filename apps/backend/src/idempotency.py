@@ -0,0 +1,233 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+from src.auth.dependencies import bearer_scheme, get_firebase_user
+from src.cache import LRUCache, SingleFlight
+from src.config import settings
+from src.database import ChunkedBatch, acquire_lease, get_document, get_firestore_client, run_sync
+from src.metrics import registry
+
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Stored responses keyed by document id; Firestore is the source of truth
+_local_records = LRUCache(
+    max_size=settings.IDEMPOTENCY_CACHE_MAX_SIZE,
+    ttl_seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS
+)
+_idempotency_flight = SingleFlight()
+
+
+def _record_id(user_id: str, method: str, path: str, key: str) -> str:
+    """Idempotency keys are scoped to the user and the endpoint."""
+    return hashlib.sha256(f"{user_id}:{method}:{path}:{key}".encode()).hexdigest()
+
+
+def _to_response(record: dict, replayed: bool) -> Response:
+    headers = dict(record.get("headers", {}))
+    if replayed:
+        headers[REPLAYED_HEADER] = "true"
+    return Response(
+        content=record["body"],
+        status_code=record["statusCode"],
+        headers=headers,
+        media_type=record.get("mediaType")
+    )
+
+
+def _idempotency_ref(record_id: str):
+    return get_firestore_client().collection("idempotencyKeys").document(record_id)
+
+
+async def _reserve(record_id: str, user_id: str, path: str, request_hash: str) -> dict | None:
+    """
+    Reserve a key with a pending record before running its handler.
+
+    The record is created with a create-only write, so of two workers seeing
+    the same key only one gets it. Returns None once the key is reserved for
+    this request, or the record already stored for it (pending or complete).
+    Expired records, and reservations abandoned by a worker that died, are
+    taken over with a write conditioned on their update time.
+    """
+    from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+
+    ref = _idempotency_ref(record_id)
+    pending = {
+        "userId": user_id,
+        "path": path,
+        "requestHash": request_hash,
+        "pending": True,
+        "expiresAt": datetime.now(timezone.utc) + timedelta(seconds=settings.IDEMPOTENCY_PENDING_TTL_SECONDS)
+    }
+
+    while True:
+        try:
+            await run_sync(ref.create, pending)
+            return None
+        except AlreadyExists:
+            pass
+
+        doc = await get_document(ref)
+        if not doc.exists:
+            continue
+
+        record = doc.to_dict()
+        if record["expiresAt"] > datetime.now(timezone.utc):
+            return record
+
+        try:
+            await run_sync(ref.update, pending, option=get_firestore_client().write_option(last_update_time=doc.update_time))
+            return None
+        except (FailedPrecondition, NotFound):
+            continue
+
+
+async def _release(record_id: str):
+    """Drop a reservation whose handler failed, so the client can retry it."""
+    try:
+        await run_sync(_idempotency_ref(record_id).delete)
+    except Exception as e:
+        print(f"Error releasing idempotency key: {e}")
+
+
+async def _save_record(record_id: str, record: dict):
+    _local_records.put(record_id, record)
+    await run_sync(_idempotency_ref(record_id).set, record)
+
+
+async def _execute_once(handler: Callable, request: Request, user_id: str, record_id: str, request_hash: str) -> tuple[dict, bool]:
+    """
+    Run the handler unless a response is already stored for this key.
+
+    While another request (on this or another worker) holds the key, waits
+    up to IDEMPOTENCY_PENDING_WAIT_SECONDS for its response, then answers
+    409. Returns the stored response and whether it was a replay.
+    """
+    record = _local_records.get(record_id)
+    if record is not None:
+        return record, True
+
+    deadline = asyncio.get_running_loop().time() + settings.IDEMPOTENCY_PENDING_WAIT_SECONDS
+    while True:
+        record = await _reserve(record_id, user_id, request.url.path, request_hash)
+        if record is None:
+            break
+        if not record.get("pending"):
+            _local_records.put(record_id, record)
+            return record, True
+        if record["requestHash"] != request_hash:
+            return record, True
+        if asyncio.get_running_loop().time() >= deadline:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Una solicitud con esta clave de idempotencia todavia se esta procesando"
+            )
+        await asyncio.sleep(settings.IDEMPOTENCY_PENDING_POLL_SECONDS)
+
+    try:
+        response = await handler(request)
+    except HTTPException as exc:
+        response = JSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+    except BaseException:
+        await _release(record_id)
+        raise
+
+    record = {
+        "userId": user_id,
+        "path": request.url.path,
+        "requestHash": request_hash,
+        "statusCode": response.status_code,
+        "body": bytes(response.body),
+        "mediaType": response.media_type,
+        "headers": {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in ("content-length", "content-type")
+        },
+        "expiresAt": datetime.now(timezone.utc) + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+    }
+
+    # Server errors are not stored, so the client can retry them
+    if response.status_code < 500:
+        await _save_record(record_id, record)
+    else:
+        await _release(record_id)
+    return record, False
+
+
+class IdempotentRoute(APIRoute):
+    """
+    Route class that honours the `Idempotency-Key` header on mutating requests.
+
+    The first response for a (user, endpoint, key) is stored; retries with the
+    same key get that response back without running the endpoint again.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def idempotent_handler(request: Request) -> Response:
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key or request.method not in MUTATING_METHODS:
+                return await handler(request)
+
+            user = await get_firebase_user(await bearer_scheme(request))
+            record_id = _record_id(user.uid, request.method, request.url.path, key)
+            request_hash = hashlib.sha256(await request.body()).hexdigest()
+
+            executed = False
+
+            def execute():
+                nonlocal executed
+                executed = True
+                return _execute_once(handler, request, user.uid, record_id, request_hash)
+
+            # Concurrent retries with the same key share one execution; the
+            # ones that joined it get its response as a replay
+            record, replayed = await _idempotency_flight.do(record_id, execute)
+            replayed = replayed or not executed
+
+            if record["requestHash"] != request_hash:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="La clave de idempotencia ya se uso con otra solicitud"
+                )
+
+            return _to_response(record, replayed)
+
+        return idempotent_handler
+
+
+def _purge_expired_keys(db) -> int:
+    query = db.collection("idempotencyKeys").where(
+        "expiresAt", "<=", datetime.now(timezone.utc)
+    ).select(["__name__"])
+
+    batch = ChunkedBatch(db)
+    for doc in query.stream():
+        batch.delete(doc.reference)
+    batch.flush()
+    return batch.committed
+
+
+async def purge_expired_keys_forever():
+    """Delete expired idempotency records in bulk, periodically, in one worker at a time."""
+    while True:
+        try:
+            db = get_firestore_client()
+            if await run_sync(acquire_lease, db, "idempotencyPurge", settings.IDEMPOTENCY_PURGE_SECONDS / 2):
+                deleted = await run_sync(_purge_expired_keys, db)
+                registry.inc("idempotency_keys_purged_total", {}, deleted)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error purging idempotency keys: {e}")
+
+        await asyncio.sleep(settings.IDEMPOTENCY_PURGE_SECONDS)
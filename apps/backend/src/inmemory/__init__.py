@@ -0,0 +1,3 @@
+# In-memory Firebase stand-ins module
+from src.inmemory.auth import MemoryAuth
+from src.inmemory.firestore import MemoryFirestore
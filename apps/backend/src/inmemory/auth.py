@@ -0,0 +1,134 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from typing import NamedTuple
+
+from firebase_admin.auth import (
+    EmailIdentifier, ExpiredIdTokenError, InvalidIdTokenError, UidIdentifier, UserNotFoundError
+)
+
+
+def _encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+class MemoryUserRecord:
+    """The fields of `firebase_admin.auth.UserRecord` the app reads."""
+
+    def __init__(self, uid: str, email: str | None = None, display_name: str | None = None,
+                 email_verified: bool = False, disabled: bool = False):
+        self.uid = uid
+        self.email = email
+        self.display_name = display_name
+        self.email_verified = email_verified
+        self.disabled = disabled
+        self.custom_claims: dict | None = None
+
+
+class MemoryGetUsersResult(NamedTuple):
+    """The fields of `firebase_admin.auth.GetUsersResult`."""
+
+    users: list[MemoryUserRecord]
+    not_found: list
+
+
+class MemoryAuth:
+    """
+    In-memory stand-in for `firebase_admin.auth`.
+
+    ID tokens are HMAC-signed with a local test key instead of Google's keys:
+    mint them with `issue_id_token` and verify them with `verify_id_token`,
+    which raises the same errors as the real SDK. Custom claims set on a user
+    are embedded in tokens issued afterwards, as they are on token refresh.
+    """
+
+    def __init__(self, secret: str):
+        self._secret = secret.encode()
+        self._users: dict[str, MemoryUserRecord] = {}
+        self._lock = threading.Lock()
+
+    def _sign(self, message: str) -> str:
+        return _encode(hmac.new(self._secret, message.encode(), hashlib.sha256).digest())
+
+    def issue_id_token(self, uid: str, expires_in: int = 3600) -> str:
+        """Mint an ID token for a user, creating the user if needed."""
+        user = self._users.get(uid) or self.create_user(uid=uid)
+        now = int(time.time())
+        claims = {
+            **(user.custom_claims or {}),
+            "uid": uid,
+            "sub": uid,
+            "user_id": uid,
+            "email": user.email,
+            "email_verified": user.email_verified,
+            "name": user.display_name,
+            "iat": now,
+            "exp": now + expires_in,
+        }
+        message = f"{_encode(json.dumps({'alg': 'HS256', 'typ': 'JWT'}).encode())}.{_encode(json.dumps(claims).encode())}"
+        return f"{message}.{self._sign(message)}"
+
+    def verify_id_token(self, id_token: str, app=None, check_revoked: bool = False, clock_skew_seconds: int = 0) -> dict:
+        try:
+            header, payload, signature = id_token.split(".")
+        except ValueError:
+            raise InvalidIdTokenError("Token must have three segments")
+
+        if not hmac.compare_digest(signature, self._sign(f"{header}.{payload}")):
+            raise InvalidIdTokenError("Token signature is invalid")
+
+        claims = json.loads(_decode(payload))
+        if claims["exp"] + clock_skew_seconds < time.time():
+            raise ExpiredIdTokenError("Token expired", None)
+        return claims
+
+    def create_user(self, uid: str, email: str | None = None, display_name: str | None = None,
+                    email_verified: bool = False, disabled: bool = False, **kwargs) -> MemoryUserRecord:
+        user = MemoryUserRecord(uid, email, display_name, email_verified, disabled)
+        with self._lock:
+            self._users[uid] = user
+        return user
+
+    def get_user(self, uid: str, app=None) -> MemoryUserRecord:
+        user = self._users.get(uid)
+        if user is None:
+            raise UserNotFoundError(f"No user record found for the provided user ID: {uid}")
+        return user
+
+    def get_user_by_email(self, email: str, app=None) -> MemoryUserRecord:
+        for user in list(self._users.values()):
+            if user.email == email:
+                return user
+        raise UserNotFoundError(f"No user record found for the provided email: {email}")
+
+    def get_users(self, identifiers: list, app=None) -> MemoryGetUsersResult:
+        """Look up to 100 users by UidIdentifier or EmailIdentifier in one call."""
+        if len(identifiers) > 100:
+            raise ValueError("`identifiers` parameter must have <= 100 entries.")
+
+        by_email = {user.email: user for user in list(self._users.values()) if user.email}
+        users = {}
+        not_found = []
+        for identifier in identifiers:
+            if isinstance(identifier, UidIdentifier):
+                user = self._users.get(identifier.uid)
+            elif isinstance(identifier, EmailIdentifier):
+                user = by_email.get(identifier.email)
+            else:
+                raise ValueError(f"Unsupported identifier type: {type(identifier).__name__}")
+
+            if user is None:
+                not_found.append(identifier)
+            else:
+                users[user.uid] = user
+        return MemoryGetUsersResult(list(users.values()), not_found)
+
+    def set_custom_user_claims(self, uid: str, custom_claims: dict | None, app=None):
+        self.get_user(uid).custom_claims = dict(custom_claims) if custom_claims else None
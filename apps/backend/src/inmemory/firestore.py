@@ -0,0 +1,800 @@
+import random
+import string
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import cmp_to_key
+
+from google.api_core import exceptions
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+from google.cloud.firestore_v1 import _helpers, transforms
+from google.cloud.firestore_v1.base_client import BaseClient
+
+from src.metrics import record_firestore_call
+
+
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+_AUTO_ID_CHARS = string.ascii_letters + string.digits
+_INEQUALITY_OPS = {"<", "<=", ">", ">=", "!=", "not-in"}
+
+
+def _utc(value: datetime) -> datetime:
+    # Like the SDK, naive datetimes are taken to be UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _store_value(value):
+    """Convert a written value to what Firestore would hand back on read."""
+    if isinstance(value, datetime):
+        value = _utc(value)
+        return DatetimeWithNanoseconds(
+            value.year, value.month, value.day, value.hour, value.minute,
+            value.second, value.microsecond, tzinfo=timezone.utc
+        )
+    if isinstance(value, dict):
+        return {key: _store_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_store_value(item) for item in value]
+    return value
+
+
+def _copy_value(value):
+    if isinstance(value, dict):
+        return {key: _copy_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_value(item) for item in value]
+    return value
+
+
+def _sort_key(value):
+    """Key that orders values of mixed types the way Firestore does."""
+    if value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, _utc(value))
+    if isinstance(value, str):
+        return (4, value)
+    if isinstance(value, bytes):
+        return (5, value)
+    if isinstance(value, DocumentReference):
+        return (6, tuple(value.path.split("/")))
+    if isinstance(value, (list, tuple)):
+        return (8, tuple(_sort_key(item) for item in value))
+    if isinstance(value, dict):
+        return (9, tuple(sorted((key, _sort_key(item)) for key, item in value.items())))
+    return (7, value)
+
+
+_MISSING = object()
+
+
+def _get_field(data: dict, field_path: str):
+    value = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _matches(value, op: str, operand) -> bool:
+    if value is _MISSING:
+        return False
+
+    key = _sort_key(value)
+    if op == "==":
+        return key == _sort_key(operand)
+    if op == "!=":
+        return value is not None and key != _sort_key(operand)
+    if op == "in":
+        return key in {_sort_key(item) for item in operand}
+    if op == "not-in":
+        return value is not None and key not in {_sort_key(item) for item in operand}
+    if op == "array_contains":
+        return isinstance(value, list) and _sort_key(operand) in {_sort_key(item) for item in value}
+    if op == "array_contains_any":
+        return isinstance(value, list) and bool(
+            {_sort_key(item) for item in value} & {_sort_key(item) for item in operand}
+        )
+
+    # Range filters only match values of the same type
+    other = _sort_key(operand)
+    if key[0] != other[0]:
+        return False
+    if op == "<":
+        return key < other
+    if op == "<=":
+        return key <= other
+    if op == ">":
+        return key > other
+    if op == ">=":
+        return key >= other
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+def _transform(sentinel, current, now):
+    if sentinel is transforms.SERVER_TIMESTAMP:
+        return now
+
+    is_number = isinstance(current, (int, float)) and not isinstance(current, bool)
+    if isinstance(sentinel, transforms.Increment):
+        return current + sentinel.value if is_number else sentinel.value
+    if isinstance(sentinel, transforms.Maximum):
+        return max(current, sentinel.value) if is_number else sentinel.value
+    if isinstance(sentinel, transforms.Minimum):
+        return min(current, sentinel.value) if is_number else sentinel.value
+
+    items = list(current) if isinstance(current, list) else []
+    if isinstance(sentinel, transforms.ArrayUnion):
+        for value in sentinel.values:
+            if _sort_key(value) not in {_sort_key(item) for item in items}:
+                items.append(_store_value(value))
+        return items
+    if isinstance(sentinel, transforms.ArrayRemove):
+        removed = {_sort_key(value) for value in sentinel.values}
+        return [item for item in items if _sort_key(item) not in removed]
+
+    raise ValueError(f"Unsupported transform: {sentinel!r}")
+
+
+def _is_transform(value) -> bool:
+    return value is transforms.SERVER_TIMESTAMP or isinstance(value, (
+        transforms.Increment, transforms.Maximum, transforms.Minimum,
+        transforms.ArrayUnion, transforms.ArrayRemove
+    ))
+
+
+def _write_leaf(target: dict, key: str, value, now):
+    if value is transforms.DELETE_FIELD:
+        target.pop(key, None)
+    elif _is_transform(value):
+        target[key] = _transform(value, target.get(key), now)
+    else:
+        target[key] = _store_value(value)
+
+
+def _merge_into(target: dict, data: dict, now):
+    """Write `data` into `target`, merging nested maps field by field."""
+    for key, value in data.items():
+        if isinstance(value, dict):
+            if not isinstance(target.get(key), dict):
+                target[key] = {}
+            _merge_into(target[key], value, now)
+        else:
+            _write_leaf(target, key, value, now)
+
+
+def _update_into(target: dict, field_updates: dict, now):
+    """Apply `update()` semantics: keys are field paths, values replace fields."""
+    for field_path, value in field_updates.items():
+        *parents, leaf = field_path.split(".")
+        node = target
+        for part in parents:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            node = node[part]
+        if isinstance(value, dict):
+            node[leaf] = {}
+            _merge_into(node[leaf], value, now)
+        else:
+            _write_leaf(node, leaf, value, now)
+
+
+class _StoredDocument:
+    __slots__ = ("data", "create_time", "update_time")
+
+    def __init__(self, data: dict, create_time, update_time):
+        self.data = data
+        self.create_time = create_time
+        self.update_time = update_time
+
+
+class WriteResult:
+    def __init__(self, update_time):
+        self.update_time = update_time
+
+
+class AggregationResult:
+    def __init__(self, alias: str, value, read_time=None):
+        self.alias = alias
+        self.value = value
+        self.read_time = read_time
+
+
+class DocumentSnapshot:
+    """Point-in-time read of a document, mirroring the SDK's snapshot."""
+
+    def __init__(self, reference, data: dict | None, create_time=None, update_time=None, read_time=None):
+        self._reference = reference
+        self._data = data
+        self.create_time = create_time
+        self.update_time = update_time
+        self.read_time = read_time
+
+    @property
+    def id(self) -> str:
+        return self._reference.id
+
+    @property
+    def reference(self):
+        return self._reference
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> dict | None:
+        return _copy_value(self._data) if self._data is not None else None
+
+    def get(self, field_path: str):
+        if self._data is None:
+            return None
+        value = _get_field(self._data, field_path)
+        if value is _MISSING:
+            raise KeyError(f"'{field_path}' is not contained in the data")
+        return _copy_value(value)
+
+
+class Query:
+    """Immutable query over a collection, or over every collection with an id."""
+
+    ASCENDING = ASCENDING
+    DESCENDING = DESCENDING
+
+    def __init__(self, client, parent_path: str | None = None, collection_id: str | None = None,
+                 filters=(), orders=(), limit=None, offset=0, projection=None,
+                 start=None, end=None):
+        self._client = client
+        self._parent_path = parent_path
+        self._collection_id = collection_id
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._offset = offset
+        self._projection = projection
+        self._start = start
+        self._end = end
+
+    def _copy(self, **changes) -> "Query":
+        fields = {
+            "parent_path": self._parent_path,
+            "collection_id": self._collection_id,
+            "filters": self._filters,
+            "orders": self._orders,
+            "limit": self._limit,
+            "offset": self._offset,
+            "projection": self._projection,
+            "start": self._start,
+            "end": self._end,
+        }
+        fields.update(changes)
+        return Query(self._client, **fields)
+
+    def where(self, field_path: str | None = None, op_string: str | None = None, value=None, *, filter=None) -> "Query":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = ASCENDING) -> "Query":
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count: int) -> "Query":
+        return self._copy(limit=count)
+
+    def offset(self, num_to_skip: int) -> "Query":
+        return self._copy(offset=num_to_skip)
+
+    def select(self, field_paths) -> "Query":
+        return self._copy(projection=list(field_paths))
+
+    def start_at(self, document_fields_or_snapshot) -> "Query":
+        return self._copy(start=(document_fields_or_snapshot, True))
+
+    def start_after(self, document_fields_or_snapshot) -> "Query":
+        return self._copy(start=(document_fields_or_snapshot, False))
+
+    def end_before(self, document_fields_or_snapshot) -> "Query":
+        return self._copy(end=(document_fields_or_snapshot, False))
+
+    def end_at(self, document_fields_or_snapshot) -> "Query":
+        return self._copy(end=(document_fields_or_snapshot, True))
+
+    def count(self, alias: str | None = None) -> "AggregationQuery":
+        return AggregationQuery(self, alias or "field_1")
+
+    def get(self, transaction=None, **kwargs) -> list:
+        return self._client._run_query(self, transaction)
+
+    def stream(self, transaction=None, **kwargs):
+        return iter(self.get(transaction=transaction))
+
+    def _effective_orders(self) -> list[tuple[str, str]]:
+        orders = list(self._orders)
+        if not orders:
+            inequality = next((field for field, op, _ in self._filters if op in _INEQUALITY_OPS), None)
+            if inequality is not None:
+                orders.append((inequality, ASCENDING))
+        if not any(field == "__name__" for field, _ in orders):
+            orders.append(("__name__", orders[-1][1] if orders else ASCENDING))
+        return orders
+
+    def _cursor_values(self, cursor, orders: list[tuple[str, str]]) -> list:
+        if isinstance(cursor, DocumentSnapshot):
+            data = cursor._data or {}
+            return [
+                cursor.reference if field == "__name__" else _get_field(data, field)
+                for field, _ in orders
+            ]
+
+        values = []
+        for field, _ in orders:
+            if field not in cursor:
+                break
+            value = cursor[field]
+            if field == "__name__" and isinstance(value, str):
+                path = value if "/" in value else f"{self._parent_path}/{value}"
+                value = self._client.document(path)
+            values.append(value)
+        return values
+
+    @staticmethod
+    def _compare(values: list, cursor_values: list, orders: list[tuple[str, str]]) -> int:
+        for value, cursor_value, (_, direction) in zip(values, cursor_values, orders):
+            left, right = _sort_key(value), _sort_key(cursor_value)
+            if left != right:
+                result = -1 if left < right else 1
+                return -result if direction == DESCENDING else result
+        return 0
+
+    def _execute(self, candidates: list[tuple[str, _StoredDocument]]) -> list[tuple[str, _StoredDocument]]:
+        orders = self._effective_orders()
+
+        rows = []
+        for path, document in candidates:
+            if not all(_matches(_get_field(document.data, field), op, value) for field, op, value in self._filters):
+                continue
+            values = [
+                self._client.document(path) if field == "__name__" else _get_field(document.data, field)
+                for field, _ in orders
+            ]
+            # Documents missing an ordered field are left out, as in Firestore
+            if any(value is _MISSING for value in values):
+                continue
+            rows.append((values, path, document))
+
+        rows.sort(key=cmp_to_key(lambda a, b: self._compare(a[0], b[0], orders)))
+
+        if self._start is not None:
+            cursor_values = self._cursor_values(self._start[0], orders)
+            inclusive = self._start[1]
+            rows = [
+                row for row in rows
+                if (result := self._compare(row[0], cursor_values, orders)) > 0 or (inclusive and result == 0)
+            ]
+        if self._end is not None:
+            cursor_values = self._cursor_values(self._end[0], orders)
+            inclusive = self._end[1]
+            rows = [
+                row for row in rows
+                if (result := self._compare(row[0], cursor_values, orders)) < 0 or (inclusive and result == 0)
+            ]
+
+        rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        return [(path, document) for _, path, document in rows]
+
+
+class AggregationQuery:
+    def __init__(self, query: Query, alias: str):
+        self._query = query
+        self._alias = alias
+
+    def get(self, transaction=None, **kwargs) -> list:
+        return [[AggregationResult(self._alias, self._query._client._run_count(self._query, transaction))]]
+
+
+class CollectionReference(Query):
+    def __init__(self, client, path: str):
+        super().__init__(client, parent_path=path)
+        self._path = path
+
+    @property
+    def id(self) -> str:
+        return self._path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self):
+        if "/" not in self._path:
+            return None
+        return DocumentReference(self._client, self._path.rsplit("/", 1)[0])
+
+    def document(self, document_id: str | None = None) -> "DocumentReference":
+        if document_id is None:
+            document_id = "".join(random.choices(_AUTO_ID_CHARS, k=20))
+        return DocumentReference(self._client, f"{self._path}/{document_id}")
+
+    def add(self, document_data: dict, document_id: str | None = None):
+        ref = self.document(document_id)
+        result = ref.create(document_data)
+        return result.update_time, ref
+
+    def list_documents(self, page_size: int | None = None, **kwargs) -> list:
+        return self._client._list_documents(self._path)
+
+
+class DocumentReference:
+    def __init__(self, client, path: str):
+        self._client = client
+        self._path = path
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, DocumentReference) and other._path == self._path
+
+    def __hash__(self) -> int:
+        return hash(self._path)
+
+    def __repr__(self) -> str:
+        return f"<DocumentReference: {self._path}>"
+
+    @property
+    def id(self) -> str:
+        return self._path.rsplit("/", 1)[-1]
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def parent(self) -> CollectionReference:
+        return CollectionReference(self._client, self._path.rsplit("/", 1)[0])
+
+    def collection(self, collection_id: str) -> CollectionReference:
+        return CollectionReference(self._client, f"{self._path}/{collection_id}")
+
+    def collections(self, page_size: int | None = None, **kwargs) -> list:
+        return self._client._list_collections(self._path)
+
+    def get(self, field_paths=None, transaction=None, **kwargs) -> DocumentSnapshot:
+        return self._client._get_documents([self], field_paths, transaction)[0]
+
+    def create(self, document_data: dict) -> WriteResult:
+        batch = self._client.batch()
+        batch.create(self, document_data)
+        return batch.commit()[0]
+
+    def set(self, document_data: dict, merge: bool = False) -> WriteResult:
+        batch = self._client.batch()
+        batch.set(self, document_data, merge=merge)
+        return batch.commit()[0]
+
+    def update(self, field_updates: dict, option=None) -> WriteResult:
+        batch = self._client.batch()
+        batch.update(self, field_updates, option=option)
+        return batch.commit()[0]
+
+    def delete(self, option=None):
+        batch = self._client.batch()
+        batch.delete(self, option=option)
+        return batch.commit()[0].update_time
+
+
+class _WriteBuffer:
+    """Writes queued for one atomic commit."""
+
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def create(self, reference: DocumentReference, document_data: dict):
+        self._writes.append(("create", reference.path, document_data, None))
+
+    def set(self, reference: DocumentReference, document_data: dict, merge: bool = False):
+        self._writes.append(("merge" if merge else "set", reference.path, document_data, None))
+
+    def update(self, reference: DocumentReference, field_updates: dict, option=None):
+        self._writes.append(("update", reference.path, field_updates, option))
+
+    def delete(self, reference: DocumentReference, option=None):
+        self._writes.append(("delete", reference.path, None, option))
+
+
+class WriteBatch(_WriteBuffer):
+    def commit(self, **kwargs) -> list[WriteResult]:
+        writes, self._writes = self._writes, []
+        return self._client._commit(writes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+
+class Transaction(_WriteBuffer):
+    """
+    Optimistic transaction.
+
+    Works with `google.cloud.firestore.transactional`: the commit is aborted,
+    and the function retried, if a document read in the transaction changed.
+    """
+
+    def __init__(self, client, max_attempts: int = 5, read_only: bool = False):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+        self._read_versions: dict[str, object] = {}
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def in_progress(self) -> bool:
+        return self._id is not None
+
+    def _clean_up(self):
+        self._writes = []
+        self._read_versions = {}
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        if self.in_progress:
+            raise ValueError("Transaction already in progress")
+        self._id = self._client._begin_transaction()
+
+    def _rollback(self):
+        self._clean_up()
+
+    def _commit(self) -> list[WriteResult]:
+        if not self.in_progress:
+            raise ValueError("Transaction not in progress")
+        try:
+            return self._client._commit(self._writes, self._read_versions)
+        finally:
+            self._clean_up()
+
+    def _record_read(self, path: str, document: _StoredDocument | None):
+        if self._writes:
+            raise exceptions.InvalidArgument("Firestore transactions require all reads to be executed before all writes")
+        self._read_versions.setdefault(path, document.update_time if document else None)
+
+    def get(self, ref_or_query, **kwargs):
+        if isinstance(ref_or_query, DocumentReference):
+            return iter([ref_or_query.get(transaction=self)])
+        return ref_or_query.stream(transaction=self)
+
+    def get_all(self, references: list, **kwargs):
+        return self._client.get_all(references, transaction=self)
+
+
+class MemoryFirestore:
+    """
+    In-memory stand-in for the Firestore client.
+
+    Covers the part of the API the routers and scripts use: collections and
+    subcollections, collection groups, `where`/`order_by`/`limit`/`select`
+    with cursors, `count()`, batches, transactions, preconditions and the
+    `SERVER_TIMESTAMP`/`Increment`/`Array*` transforms.
+
+    Each round trip sleeps `latency_ms` plus up to `jitter_ms` and is
+    recorded in `src.metrics` the way the real client's RPCs are.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        # collection path -> {document id -> document}
+        self._collections: dict[str, dict[str, _StoredDocument]] = {}
+        # collection id -> collection paths, for collection-group queries
+        self._groups: dict[str, set[str]] = {}
+        self._lock = threading.RLock()
+        self._last_time = None
+        self._transaction_ids = 0
+
+    write_option = staticmethod(BaseClient.write_option)
+
+    # References
+
+    def collection(self, *collection_path: str) -> CollectionReference:
+        return CollectionReference(self, "/".join(collection_path))
+
+    def collection_group(self, collection_id: str) -> Query:
+        return Query(self, collection_id=collection_id)
+
+    def document(self, *document_path: str) -> DocumentReference:
+        return DocumentReference(self, "/".join(document_path))
+
+    def collections(self) -> list[CollectionReference]:
+        return self._list_collections(None)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def transaction(self, max_attempts: int = 5, read_only: bool = False) -> Transaction:
+        return Transaction(self, max_attempts=max_attempts, read_only=read_only)
+
+    def get_all(self, references: list, field_paths=None, transaction=None, **kwargs):
+        return iter(self._get_documents(list(references), field_paths, transaction))
+
+    def clear(self):
+        """Drop every document."""
+        with self._lock:
+            self._collections.clear()
+            self._groups.clear()
+
+    # Round trips
+
+    def _round_trip(self, started: float, **counts):
+        delay = (self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000
+        if delay > 0:
+            time.sleep(delay)
+        record_firestore_call(seconds=time.perf_counter() - started, **counts)
+
+    def _now(self):
+        # Update times must be unique, or last-update preconditions can't tell writes apart
+        now = datetime.now(timezone.utc)
+        if self._last_time is not None and now <= self._last_time:
+            now = self._last_time + timedelta(microseconds=1)
+        self._last_time = now
+        return _store_value(now)
+
+    def _lookup(self, path: str) -> _StoredDocument | None:
+        collection_path, _, document_id = path.rpartition("/")
+        return self._collections.get(collection_path, {}).get(document_id)
+
+    def _snapshot(self, path: str, document: _StoredDocument | None, field_paths=None, read_time=None) -> DocumentSnapshot:
+        reference = DocumentReference(self, path)
+        if document is None:
+            return DocumentSnapshot(reference, None, read_time=read_time)
+
+        data = document.data
+        if field_paths is not None:
+            data = {}
+            for field_path in field_paths:
+                value = _get_field(document.data, field_path)
+                if value is not _MISSING:
+                    _update_into(data, {field_path: value}, None)
+
+        return DocumentSnapshot(reference, _copy_value(data), document.create_time, document.update_time, read_time)
+
+    def _get_documents(self, references: list, field_paths=None, transaction=None) -> list[DocumentSnapshot]:
+        started = time.perf_counter()
+        with self._lock:
+            read_time = self._now()
+            snapshots = []
+            for reference in references:
+                document = self._lookup(reference.path)
+                if transaction is not None:
+                    transaction._record_read(reference.path, document)
+                snapshots.append(self._snapshot(reference.path, document, field_paths, read_time))
+
+        # Every requested document is billed, found or not
+        self._round_trip(started, reads=len(references))
+        return snapshots
+
+    def _candidates(self, query: Query) -> list[tuple[str, _StoredDocument]]:
+        if query._collection_id is not None:
+            paths = self._groups.get(query._collection_id, ())
+        else:
+            paths = (query._parent_path,)
+
+        return [
+            (f"{collection_path}/{document_id}", document)
+            for collection_path in paths
+            for document_id, document in self._collections.get(collection_path, {}).items()
+        ]
+
+    def _run_query(self, query: Query, transaction=None) -> list[DocumentSnapshot]:
+        started = time.perf_counter()
+        with self._lock:
+            read_time = self._now()
+            results = query._execute(self._candidates(query))
+            snapshots = []
+            for path, document in results:
+                if transaction is not None:
+                    transaction._record_read(path, document)
+                snapshots.append(self._snapshot(path, document, query._projection, read_time))
+
+        # Queries are billed at least one read, even when empty
+        self._round_trip(started, reads=max(len(snapshots), 1))
+        return snapshots
+
+    def _run_count(self, query: Query, transaction=None) -> int:
+        started = time.perf_counter()
+        with self._lock:
+            count = len(query._copy(projection=None)._execute(self._candidates(query)))
+
+        # Aggregations are billed one read per 1000 index entries
+        self._round_trip(started, reads=max((count + 999) // 1000, 1), aggregations=1)
+        return count
+
+    def _list_documents(self, collection_path: str) -> list[DocumentReference]:
+        with self._lock:
+            return [
+                DocumentReference(self, f"{collection_path}/{document_id}")
+                for document_id in self._collections.get(collection_path, {})
+            ]
+
+    def _list_collections(self, document_path: str | None) -> list[CollectionReference]:
+        prefix = f"{document_path}/" if document_path else ""
+        with self._lock:
+            return [
+                CollectionReference(self, path)
+                for path, documents in self._collections.items()
+                if documents and path.startswith(prefix) and "/" not in path[len(prefix):]
+            ]
+
+    def _begin_transaction(self) -> int:
+        started = time.perf_counter()
+        with self._lock:
+            self._transaction_ids += 1
+            transaction_id = self._transaction_ids
+        self._round_trip(started)
+        return transaction_id
+
+    @staticmethod
+    def _check_option(path: str, option, document: _StoredDocument | None):
+        if isinstance(option, _helpers.LastUpdateOption):
+            if document is None or document.update_time != option._last_update_time:
+                raise exceptions.FailedPrecondition(f"The document {path} was modified since the given update time")
+        elif isinstance(option, _helpers.ExistsOption):
+            if (document is not None) != option._exists:
+                error = exceptions.NotFound if option._exists else exceptions.AlreadyExists
+                raise error(f"Precondition failed for document {path}")
+
+    def _apply(self, kind: str, path: str, data: dict | None, option, current: _StoredDocument | None, now):
+        self._check_option(path, option, current)
+
+        if kind == "delete":
+            return None
+        if kind == "create" and current is not None:
+            raise exceptions.AlreadyExists(f"Document already exists: {path}")
+        if kind == "update" and current is None:
+            raise exceptions.NotFound(f"No document to update: {path}")
+
+        fields = _copy_value(current.data) if current is not None and kind in ("merge", "update") else {}
+        if kind == "update":
+            _update_into(fields, data, now)
+        else:
+            _merge_into(fields, data, now)
+
+        create_time = current.create_time if current is not None else now
+        return _StoredDocument(fields, create_time, now)
+
+    def _commit(self, writes: list, read_versions: dict | None = None) -> list[WriteResult]:
+        """Apply writes atomically: either all of them succeed or none does."""
+        started = time.perf_counter()
+        with self._lock:
+            for path, update_time in (read_versions or {}).items():
+                document = self._lookup(path)
+                if (document.update_time if document else None) != update_time:
+                    raise exceptions.Aborted(f"Transaction aborted: {path} changed since it was read")
+
+            now = self._now()
+            staged: dict[str, _StoredDocument | None] = {}
+            for kind, path, data, option in writes:
+                current = staged[path] if path in staged else self._lookup(path)
+                staged[path] = self._apply(kind, path, data, option, current, now)
+
+            for path, document in staged.items():
+                collection_path, _, document_id = path.rpartition("/")
+                if document is None:
+                    self._collections.get(collection_path, {}).pop(document_id, None)
+                    continue
+                self._collections.setdefault(collection_path, {})[document_id] = document
+                self._groups.setdefault(collection_path.rsplit("/", 1)[-1], set()).add(collection_path)
+
+        self._round_trip(started, writes=len(writes))
+        return [WriteResult(now) for _ in writes]
@@ -0,0 +1,153 @@
+import random
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from src.config import settings
+from src.database import ChunkedBatch
+
+
+@dataclass
+class SeededTournament:
+    """Ids of the synthetic data written by `seed_tournament`."""
+
+    tournament_id: str
+    player_ids: list[str] = field(default_factory=list)
+    admin_id: str = ""
+    moderator_id: str = ""
+    today_question_ids: list[str] = field(default_factory=list)
+    challenge_ids: list[str] = field(default_factory=list)
+
+
+def seed_tournament(
+    db,
+    auth,
+    tournament_id: str = "torneo-local",
+    players: int = 1000,
+    days: int = 7,
+    questions_per_day: int = 5,
+    challenges: int = 5,
+    pending_submissions: int = 200,
+    rng: random.Random | None = None
+) -> SeededTournament:
+    """
+    Write an active tournament with players, a week of questions up to today
+    and pending challenge submissions, shaped like production documents.
+    """
+    rng = rng or random.Random(0)
+    seeded = SeededTournament(tournament_id=tournament_id)
+    batch = ChunkedBatch(db)
+    today = date.today()
+
+    tournament_ref = db.collection("tournaments").document(tournament_id)
+    start = datetime.combine(today - timedelta(days=days - 1), datetime.min.time())
+    batch.set(tournament_ref, {
+        "name": "Torneo local",
+        "description": "Datos sinteticos para pruebas de carga",
+        "startDate": start,
+        "endDate": start + timedelta(weeks=15),
+        "totalWeeks": 15,
+        "status": "active",
+        "participantCount": 0,
+        "lateRegistrationAllowed": True,
+        "catchUpPercentage": 70,
+        "createdBy": "seed",
+        "createdAt": start,
+        "updatedAt": start
+    })
+
+    def add_user(uid: str, role: str, claims: dict | None = None):
+        auth.create_user(uid=uid, email=f"{uid}@example.com", display_name=uid.replace("-", " ").title(), email_verified=True)
+        if claims:
+            auth.set_custom_user_claims(uid, claims)
+        batch.set(db.collection("users").document(uid), {
+            "email": f"{uid}@example.com",
+            "displayName": uid.replace("-", " ").title(),
+            "photoURL": None,
+            "role": role,
+            "totalStars": 0,
+            "tournamentsPlayed": 1,
+            "currentStreak": 0
+        })
+
+    seeded.admin_id = "admin-local"
+    seeded.moderator_id = "moderador-local"
+    add_user(seeded.admin_id, "admin", {"admin": True})
+    add_user(seeded.moderator_id, "moderator", {"moderator": True})
+
+    question_number = 0
+    for day_offset in range(days):
+        day = today - timedelta(days=days - 1 - day_offset)
+        for number in range(1, questions_per_day + 1):
+            question_number += 1
+            question_id = f"{tournament_id}-q{question_number:04d}"
+            batch.set(db.collection("questions").document(question_id), {
+                "tournamentId": tournament_id,
+                "weekNumber": day_offset // 7 + 1,
+                "dayNumber": day_offset % 7 + 1,
+                "questionNumber": number,
+                "questionText": f"Pregunta {question_number}",
+                "bibleReference": "Juan 3:16",
+                "bibleVerseText": "Porque de tal manera amo Dios al mundo...",
+                "options": [{"id": option, "text": f"Opcion {option}"} for option in "ABCD"],
+                "correctAnswer": rng.choice("ABCD"),
+                "stars": 1,
+                "isExtraQuestion": number == questions_per_day,
+                "releaseDate": datetime.combine(day, datetime.min.time())
+            })
+            if day == today:
+                seeded.today_question_ids.append(question_id)
+
+    participants_ref = tournament_ref.collection("participants")
+    for index in range(players):
+        uid = f"jugador-{index:06d}"
+        add_user(uid, "player")
+        answered = rng.randint(0, (days - 1) * questions_per_day)
+        correct = rng.randint(0, answered)
+        batch.set(participants_ref.document(uid), {
+            "oderId": uid,
+            "displayName": uid.replace("-", " ").title(),
+            "joinedAt": start,
+            "updatedAt": start,
+            "totalStars": correct,
+            "totalAnswers": answered,
+            "correctAnswers": correct,
+            "statsBackfilled": True,
+            "weeklyStars": {},
+            "rank": 0,
+            "isCatchUp": False,
+            "catchUpStars": 0
+        })
+        seeded.player_ids.append(uid)
+
+    shards = tournament_ref.collection("counterShards")
+    for shard in range(settings.COUNTER_SHARDS):
+        count = players // settings.COUNTER_SHARDS + (1 if shard < players % settings.COUNTER_SHARDS else 0)
+        batch.set(shards.document(str(shard)), {"participantCount": count})
+
+    pending_per_challenge = [pending_submissions // max(challenges, 1)] * challenges
+    for index in range(pending_submissions % max(challenges, 1)):
+        pending_per_challenge[index] += 1
+
+    submitted_at = datetime.combine(today, datetime.min.time()) - timedelta(days=days)
+    for index, pending in enumerate(pending_per_challenge):
+        challenge_id = f"{tournament_id}-reto{index + 1}"
+        challenge_ref = db.collection("challenges").document(challenge_id)
+        batch.set(challenge_ref, {
+            "tournamentId": tournament_id,
+            "title": f"Reto {index + 1}",
+            "pendingCount": pending
+        })
+        for _ in range(pending):
+            uid = rng.choice(seeded.player_ids) if seeded.player_ids else seeded.admin_id
+            submitted_at += timedelta(seconds=rng.randint(1, 600))
+            batch.set(challenge_ref.collection("submissions").document(), {
+                "oderId": uid,
+                "oderName": uid.replace("-", " ").title(),
+                "videoURL": f"https://example.com/videos/{uid}.mp4",
+                "status": "pending",
+                "submittedAt": submitted_at
+            })
+        seeded.challenge_ids.append(challenge_id)
+
+    batch.flush()
+    return seeded
@@ -1,9 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
+import hmac
 
 from src.config import settings
-from src.database import initialize_firebase
+from src.pagination import NEXT_CURSOR_HEADER
+from src.idempotency import REPLAYED_HEADER, purge_expired_keys_forever
+from src.metrics import metrics_middleware, registry
+from src.compression import CompressionMiddleware
+from src.profiling import profiling_middleware
+from src.database import initialize_firebase, shutdown_executor
+from src.auth.token_cache import refresh_public_keys_forever
+from src.questions.daily import warm_daily_questions_forever
+from src.questions.invalidation import watch_questions_version_forever
+from src.scores.ranking import compute_rankings_forever
 
 # Import routers
 from src.auth.router import router as auth_router
@@ -18,10 +30,20 @@ async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     # Startup
     initialize_firebase()
+    background_tasks = [
+        asyncio.create_task(refresh_public_keys_forever()),
+        asyncio.create_task(warm_daily_questions_forever()),
+        asyncio.create_task(watch_questions_version_forever()),
+        asyncio.create_task(purge_expired_keys_forever()),
+        asyncio.create_task(compute_rankings_forever()),
+    ]
     print(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
     yield
     # Shutdown
     print("Shutting down...")
+    for task in background_tasks:
+        task.cancel()
+    shutdown_executor()
 
 
 app = FastAPI(
@@ -33,6 +55,24 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Opt-in sampling profiler; not installed at all when disabled
+if settings.PROFILING_ENABLED:
+    app.middleware("http")(profiling_middleware)
+
+# Per-request Firestore accounting and Server-Timing
+if settings.METRICS_ENABLED:
+    app.middleware("http")(metrics_middleware)
+
+# Compress large JSON responses; outside the metrics middleware so
+# Server-Timing covers the handler only
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -40,6 +80,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REPLAYED_HEADER],
 )
 
 
@@ -54,6 +95,25 @@ async def health_check():
     }
 
 
+# Prometheus metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics(authorization: str | None = Header(default=None)):
+    """
+    Per-route request and Firestore metrics in Prometheus format.
+
+    Scrapers authenticate with `Authorization: Bearer <METRICS_TOKEN>`.
+    Without a token configured the endpoint only exists in development.
+    """
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404)
+    if settings.METRICS_TOKEN:
+        if not hmac.compare_digest(authorization or "", f"Bearer {settings.METRICS_TOKEN}"):
+            raise HTTPException(status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    elif settings.ENVIRONMENT != "development":
+        raise HTTPException(status_code=404)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 # Include routers
 app.include_router(auth_router, prefix=f"{settings.API_PREFIX}/auth", tags=["auth"])
 app.include_router(tournaments_router, prefix=f"{settings.API_PREFIX}/tournaments", tags=["tournaments"])
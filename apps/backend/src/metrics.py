@@ -0,0 +1,167 @@
+import contextvars
+import json
+import threading
+import time
+from collections import defaultdict
+
+from fastapi import Request
+
+from src.config import settings
+
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    """Firestore operations performed while serving one request."""
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self.aggregations = 0
+        self.round_trips = 0
+        self.firestore_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, reads: int = 0, writes: int = 0, aggregations: int = 0, seconds: float = 0.0):
+        with self._lock:
+            self.reads += reads
+            self.writes += writes
+            self.aggregations += aggregations
+            self.round_trips += 1
+            self.firestore_seconds += seconds
+
+
+_current_stats: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar(
+    "firestore_request_stats", default=None
+)
+
+
+class MetricsRegistry:
+    """Per-route counters and latency histograms, rendered in Prometheus format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[tuple[str, tuple], float] = defaultdict(float)
+        self._histograms: dict[tuple[str, tuple], list] = {}
+
+    def inc(self, name: str, labels: dict, value: float = 1):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def observe(self, name: str, labels: dict, value: float):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.setdefault(key, [[0] * len(LATENCY_BUCKETS), 0, 0.0])
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    @staticmethod
+    def _labels(labels: tuple, extra: str = "") -> str:
+        parts = [f'{name}="{value}"' for name, value in labels]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{self._labels(labels)} {value:g}")
+
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), (buckets, count, total) in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                        le = f'le="{bound}"'
+                        lines.append(f"{name}_bucket{self._labels(labels, le)} {bucket_count}")
+                    le = 'le="+Inf"'
+                    lines.append(f"{name}_bucket{self._labels(labels, le)} {count}")
+                    lines.append(f"{name}_sum{self._labels(labels)} {total:g}")
+                    lines.append(f"{name}_count{self._labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def record_firestore_call(reads: int = 0, writes: int = 0, aggregations: int = 0, seconds: float = 0.0):
+    """
+    Record one Firestore round trip.
+
+    Calls made outside a request (background tasks) are counted under the
+    `background` route.
+    """
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.add(reads, writes, aggregations, seconds)
+        return
+
+    labels = {"route": "background"}
+    registry.inc("firestore_reads_total", labels, reads)
+    registry.inc("firestore_writes_total", labels, writes)
+    registry.inc("firestore_aggregations_total", labels, aggregations)
+    registry.inc("firestore_round_trips_total", labels)
+    registry.observe("firestore_round_trip_seconds", labels, seconds)
+
+
+def _server_timing(stats: RequestStats, total_seconds: float) -> str:
+    return ", ".join([
+        f"total;dur={total_seconds * 1000:.1f}",
+        f'firestore;dur={stats.firestore_seconds * 1000:.1f};desc="{stats.round_trips} round trips"',
+        f'fs-reads;desc="{stats.reads}"',
+        f'fs-writes;desc="{stats.writes}"',
+        f'fs-aggregations;desc="{stats.aggregations}"',
+    ])
+
+
+async def metrics_middleware(request: Request, call_next):
+    """Account Firestore costs and latency per request and per route."""
+    stats = RequestStats()
+    token = _current_stats.set(stats)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _current_stats.reset(token)
+
+    total_seconds = time.perf_counter() - started
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    labels = {"route": route, "method": request.method}
+
+    registry.inc("http_requests_total", {**labels, "status": str(response.status_code)})
+    registry.observe("http_request_duration_seconds", labels, total_seconds)
+    registry.inc("firestore_reads_total", labels, stats.reads)
+    registry.inc("firestore_writes_total", labels, stats.writes)
+    registry.inc("firestore_aggregations_total", labels, stats.aggregations)
+    registry.inc("firestore_round_trips_total", labels, stats.round_trips)
+    registry.observe("firestore_request_seconds", labels, stats.firestore_seconds)
+
+    response.headers["Server-Timing"] = _server_timing(stats, total_seconds)
+
+    if settings.REQUEST_LOG_ENABLED:
+        print(json.dumps({
+            "event": "request",
+            "method": request.method,
+            "route": route,
+            "status": response.status_code,
+            "duration_ms": round(total_seconds * 1000, 1),
+            "firestore_ms": round(stats.firestore_seconds * 1000, 1),
+            "firestore_round_trips": stats.round_trips,
+            "firestore_reads": stats.reads,
+            "firestore_writes": stats.writes,
+            "firestore_aggregations": stats.aggregations
+        }), flush=True)
+
+    return response
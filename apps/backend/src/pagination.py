@@ -0,0 +1,39 @@
+import base64
+import json
+
+from fastapi import HTTPException, Response, status
+
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: list) -> str:
+    """Encode the sort key of the last item on a page as an opaque token."""
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(token: str) -> list:
+    """
+    Decode a `start_after` token produced by `encode_cursor`.
+
+    Raises:
+        HTTPException: If the token is malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except Exception:
+        values = None
+
+    if not isinstance(values, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor invalido"
+        )
+    return values
+
+
+def set_next_cursor(response: Response, values: list | None):
+    """Expose the next page's cursor, if there is one."""
+    if values is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(values)
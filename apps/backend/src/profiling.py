@@ -0,0 +1,61 @@
+import asyncio
+import os
+import random
+import re
+import time
+
+from fastapi import HTTPException, Request
+
+from src.auth.dependencies import bearer_scheme, get_admin_user, get_firebase_user
+from src.config import settings
+
+
+# Header admins send to force profiling of a single request
+PROFILE_HEADER = "X-Profile"
+
+
+async def _is_forced_by_admin(request: Request) -> bool:
+    """Whether the request asks to be profiled and comes from an admin."""
+    if request.headers.get(PROFILE_HEADER) != "1":
+        return False
+
+    try:
+        await get_admin_user(await get_firebase_user(await bearer_scheme(request)))
+    except HTTPException:
+        return False
+    return True
+
+
+def _write_profile(profiler, request: Request):
+    from pyinstrument.renderers import SpeedscopeRenderer
+
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    path_slug = re.sub(r"[^A-Za-z0-9]+", "_", request.url.path).strip("_") or "root"
+    filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{path_slug}-{os.getpid()}.speedscope.json"
+
+    with open(os.path.join(settings.PROFILING_DIR, filename), "w") as f:
+        f.write(profiler.output(renderer=SpeedscopeRenderer()))
+
+
+async def profiling_middleware(request: Request, call_next):
+    """
+    Profile a sample of requests, plus any admin request with `X-Profile: 1`.
+
+    Profiles are written to PROFILING_DIR in speedscope format, which
+    speedscope.app and other flamegraph viewers open directly.
+    """
+    if random.random() >= settings.PROFILING_SAMPLE_RATE and not await _is_forced_by_admin(request):
+        return await call_next(request)
+
+    from pyinstrument import Profiler
+
+    profiler = Profiler(interval=settings.PROFILING_INTERVAL_SECONDS, async_mode="enabled")
+    profiler.start()
+    try:
+        return await call_next(request)
+    finally:
+        profiler.stop()
+        try:
+            await asyncio.to_thread(_write_profile, profiler, request)
+        except Exception as e:
+            print(f"Error writing profile: {e}")
@@ -0,0 +1,73 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import NamedTuple
+
+from src.cache import LRUCache, SingleFlight
+from src.config import settings
+from src.database import stream_query
+from src.http_cache import content_etag
+from src.questions.cache import question_cache
+from src.questions.daily import seconds_until_end_of
+
+
+class WeekQuestionSet(NamedTuple):
+    """A week's released questions as [(question_id, data), ...], with an ETag of their content."""
+
+    questions: list[tuple[str, dict]]
+    etag: str
+
+
+# (tournament_id, week, day) -> WeekQuestionSet. What has been released only
+# changes at midnight, so entries are kept until the day ends.
+week_questions_cache = LRUCache(
+    max_size=settings.DAILY_QUESTIONS_CACHE_MAX_SIZE,
+    ttl_seconds=24 * 60 * 60
+)
+_week_flight = SingleFlight()
+
+
+def _released_by(data: dict, release_end: datetime) -> bool:
+    release_date = data.get("releaseDate")
+    if release_date is None:
+        return False
+    # Firestore returns UTC timestamps; naive datetimes are stored as UTC too
+    if release_date.tzinfo is not None:
+        release_date = release_date.astimezone(timezone.utc).replace(tzinfo=None)
+    return release_date < release_end
+
+
+async def _load_week_questions(db, tournament_id: str, week: int, day: date) -> WeekQuestionSet:
+    """Query a week's questions released by the end of `day` and cache them."""
+    query = db.collection("questions").where("tournamentId", "==", tournament_id).where(
+        "weekNumber", "==", week
+    )
+    release_end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+
+    questions = []
+    for doc in await stream_query(query):
+        data = doc.to_dict()
+        if _released_by(data, release_end):
+            question_cache.put(doc.id, data)
+            questions.append((doc.id, data))
+
+    questions.sort(key=lambda question: (question[1].get("dayNumber", 1), question[1].get("questionNumber", 1)))
+    question_set = WeekQuestionSet(questions, content_etag([tournament_id, week, day, questions]))
+
+    ttl = seconds_until_end_of(day) if questions else settings.DAILY_QUESTIONS_EMPTY_TTL_SECONDS
+    week_questions_cache.put((tournament_id, week, day), question_set, ttl)
+    return question_set
+
+
+async def get_week_question_set(db, tournament_id: str, week: int, day: date | None = None) -> WeekQuestionSet:
+    """
+    Get the questions of a tournament week that are released by `day`.
+
+    Served from cache; concurrent misses share a single query.
+    """
+    day = day or date.today()
+    key = (tournament_id, week, day)
+
+    question_set = week_questions_cache.get(key)
+    if question_set is not None:
+        return question_set
+
+    return await _week_flight.do(key, lambda: _load_week_questions(db, tournament_id, week, day))
@@ -0,0 +1,48 @@
+from src.cache import LRUCache
+from src.config import settings
+from src.database import get_document, get_documents
+
+
+# Question documents keyed by id. Edits and imports reach other workers
+# through the questions version (src.questions.invalidation); the TTL is
+# only a backstop.
+question_cache = LRUCache(
+    max_size=settings.QUESTION_CACHE_MAX_SIZE,
+    ttl_seconds=settings.QUESTION_CACHE_TTL_SECONDS
+)
+
+
+async def get_question(db, question_id: str) -> dict | None:
+    """Get a question's data from the cache, loading it from Firestore on a miss."""
+    data = question_cache.get(question_id)
+    if data is not None:
+        return data
+
+    doc = await get_document(db.collection("questions").document(question_id))
+    if not doc.exists:
+        return None
+
+    data = doc.to_dict()
+    question_cache.put(question_id, data)
+    return data
+
+
+async def get_questions(db, question_ids: list[str]) -> dict[str, dict]:
+    """Get several questions' data, loading all cache misses in one round trip."""
+    questions = {}
+    missing = []
+    for question_id in set(question_ids):
+        data = question_cache.get(question_id)
+        if data is not None:
+            questions[question_id] = data
+        else:
+            missing.append(question_id)
+
+    docs = await get_documents([db.collection("questions").document(question_id) for question_id in missing])
+    for doc in docs:
+        if doc.exists:
+            data = doc.to_dict()
+            question_cache.put(doc.id, data)
+            questions[doc.id] = data
+
+    return questions
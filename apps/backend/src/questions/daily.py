@@ -0,0 +1,105 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+
+from src.cache import LRUCache, SingleFlight
+from src.config import settings
+from src.database import get_firestore_client, stream_query
+from src.http_cache import content_etag
+from src.questions.cache import question_cache
+
+
+class DailyQuestionSet(NamedTuple):
+    """A day's questions as [(question_id, data), ...], with an ETag of their content."""
+
+    questions: list[tuple[str, dict]]
+    etag: str
+
+
+# (tournament_id, day) -> DailyQuestionSet, kept until the day ends
+daily_questions_cache = LRUCache(
+    max_size=settings.DAILY_QUESTIONS_CACHE_MAX_SIZE,
+    ttl_seconds=24 * 60 * 60
+)
+_daily_flight = SingleFlight()
+
+
+def seconds_until_end_of(day: date) -> float:
+    end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+    return max((end - datetime.now()).total_seconds(), 0)
+
+
+async def _load_daily_questions(db, tournament_id: str, day: date) -> DailyQuestionSet:
+    """Query a day's questions and cache them until the day rolls over."""
+    start = datetime.combine(day, datetime.min.time())
+    end = datetime.combine(day, datetime.max.time())
+
+    query = db.collection("questions").where("tournamentId", "==", tournament_id).where(
+        "releaseDate", ">=", start
+    ).where("releaseDate", "<=", end).order_by("releaseDate").order_by("questionNumber")
+
+    questions = []
+    for doc in await stream_query(query):
+        data = doc.to_dict()
+        question_cache.put(doc.id, data)
+        questions.append((doc.id, data))
+
+    question_set = DailyQuestionSet(questions, content_etag([tournament_id, day, questions]))
+
+    # Don't pin an empty day: questions may still be imported
+    ttl = seconds_until_end_of(day) if questions else settings.DAILY_QUESTIONS_EMPTY_TTL_SECONDS
+    daily_questions_cache.put((tournament_id, day), question_set, ttl)
+    return question_set
+
+
+async def get_daily_question_set(db, tournament_id: str, day: date | None = None) -> DailyQuestionSet:
+    """
+    Get a day's questions for a tournament.
+
+    Served from the per-day cache; concurrent misses share a single query.
+    """
+    day = day or date.today()
+    key = (tournament_id, day)
+
+    question_set = daily_questions_cache.get(key)
+    if question_set is not None:
+        return question_set
+
+    return await _daily_flight.do(key, lambda: _load_daily_questions(db, tournament_id, day))
+
+
+async def warm_daily_questions(day: date):
+    """Load a day's questions for every upcoming or active tournament."""
+    db = get_firestore_client()
+    tournaments = await stream_query(
+        db.collection("tournaments").where("status", "in", ["upcoming", "active"])
+    )
+
+    await asyncio.gather(*[
+        _daily_flight.do(
+            (doc.id, day),
+            lambda tournament_id=doc.id: _load_daily_questions(db, tournament_id, day)
+        )
+        for doc in tournaments
+    ])
+
+
+async def warm_daily_questions_forever():
+    """Warm tomorrow's questions shortly before each midnight release."""
+    while True:
+        tomorrow = date.today() + timedelta(days=1)
+        release = datetime.combine(tomorrow, datetime.min.time())
+
+        delay = (release - datetime.now()).total_seconds() - settings.DAILY_QUESTIONS_WARMUP_SECONDS
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        try:
+            await warm_daily_questions(tomorrow)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error warming daily questions: {e}")
+
+        # Wait until after the release before scheduling the next warm-up
+        await asyncio.sleep((release - datetime.now()).total_seconds() + 1)
@@ -0,0 +1,286 @@
+import csv
+import io
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional
+
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+
+from src.database import BATCH_LIMIT
+
+
+class ImportOption(BaseModel):
+    id: str = Field(min_length=1)
+    text: str = Field(min_length=1)
+
+
+class QuestionImportRow(BaseModel):
+    """A question to import, with the fields of QuestionResponse plus its answer and release date."""
+
+    week_number: int = Field(ge=1)
+    day_number: int = Field(ge=1, le=7)
+    question_number: int = Field(ge=1)
+    question_text: str = Field(min_length=1)
+    bible_reference: str = ""
+    bible_verse_text: str = ""
+    options: List[ImportOption] = Field(min_length=2)
+    correct_answer: str
+    stars: Optional[int] = Field(default=None, ge=0)
+    is_extra_question: bool = False
+    youtube_short_id: Optional[str] = None
+    # Midnight of the question's day in the tournament when not given
+    release_date: Optional[datetime] = None
+
+    @field_validator("correct_answer")
+    @classmethod
+    def upper_answer(cls, value: str) -> str:
+        return value.strip().upper()
+
+    @field_validator("is_extra_question", mode="before")
+    @classmethod
+    def spanish_yes(cls, value):
+        if isinstance(value, str):
+            return value.strip().lower() in ("si", "sí", "yes", "true", "1", "x")
+        return value
+
+    @model_validator(mode="after")
+    def answer_is_an_option(self):
+        ids = [option.id for option in self.options]
+        if len(set(ids)) != len(ids):
+            raise ValueError("las opciones tienen ids repetidos")
+        if self.correct_answer not in ids:
+            raise ValueError(f"la respuesta correcta {self.correct_answer} no es una de las opciones")
+        return self
+
+    @property
+    def key(self) -> tuple[int, int, int]:
+        return self.week_number, self.day_number, self.question_number
+
+
+# Accepted column names -> QuestionImportRow field: the admin Excel template
+# headers, Firestore field names and the field names themselves
+COLUMN_ALIASES = {
+    "Semana": "week_number", "weekNumber": "week_number",
+    "Dia": "day_number", "dayNumber": "day_number",
+    "Numero": "question_number", "questionNumber": "question_number",
+    "Pregunta": "question_text", "questionText": "question_text",
+    "Referencia": "bible_reference", "bibleReference": "bible_reference",
+    "Versiculo": "bible_verse_text", "bibleVerseText": "bible_verse_text",
+    "Correcta": "correct_answer", "correctAnswer": "correct_answer",
+    "Estrellas": "stars",
+    "Extra": "is_extra_question", "isExtra": "is_extra_question", "isExtraQuestion": "is_extra_question",
+    "YouTubeShort": "youtube_short_id", "youtubeShortId": "youtube_short_id",
+    "FechaPublicacion": "release_date", "releaseDate": "release_date",
+}
+# OpcionA, optionA or option_a -> option A
+OPTION_COLUMN = re.compile(r"(?:Opcion|option)([A-Z])|option_([a-z])")
+
+
+def _normalize(raw: dict) -> dict:
+    """Map a raw row to QuestionImportRow fields, dropping empty cells."""
+    row = {}
+    options = {}
+    for column, value in raw.items():
+        if column is None or value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        column = column.strip()
+        if isinstance(value, str):
+            value = value.strip()
+
+        option = OPTION_COLUMN.fullmatch(column)
+        if option:
+            options[(option.group(1) or option.group(2)).upper()] = value
+        else:
+            row[COLUMN_ALIASES.get(column, column)] = value
+
+    if options and "options" not in row:
+        row["options"] = [{"id": option_id, "text": options[option_id]} for option_id in sorted(options)]
+    return row
+
+
+def read_question_rows(source: io.TextIOBase | str, format: str) -> Iterator[dict]:
+    """
+    Read raw question rows from CSV or JSON text.
+
+    CSV is read row by row. JSON is either a list of questions or an object
+    with a `questions` list. Malformed input raises ValueError.
+    """
+    if isinstance(source, str):
+        source = io.StringIO(source)
+
+    if format == "csv":
+        reader = csv.DictReader(source)
+        try:
+            yield from reader
+        except csv.Error as e:
+            raise ValueError(f"CSV invalido en la linea {reader.line_num}: {e}") from e
+        return
+
+    data = json.load(source)
+    if isinstance(data, dict):
+        data = data.get("questions", [])
+    if not isinstance(data, list):
+        raise ValueError("El JSON debe ser una lista de preguntas")
+    yield from data
+
+
+def validate_question_rows(
+    rows: Iterable[dict],
+    total_weeks: int,
+    first_row: int = 1
+) -> tuple[list[QuestionImportRow], list[str]]:
+    """
+    Validate raw rows, returning the valid questions and the errors by row.
+
+    Rows repeating the week, day and number of an earlier row are errors,
+    since only one of them could be imported. `first_row` numbers the rows
+    in errors (2 for a CSV, whose first line is the header).
+    """
+    questions = []
+    errors = []
+    seen = {}
+    for line, raw in enumerate(rows, start=first_row):
+        if not isinstance(raw, dict):
+            errors.append(f"Fila {line}: no es un objeto")
+            continue
+        try:
+            question = QuestionImportRow.model_validate(_normalize(raw))
+        except ValidationError as e:
+            details = []
+            for error in e.errors():
+                message = error["msg"].removeprefix("Value error, ")
+                field = ".".join(str(part) for part in error["loc"])
+                details.append(f"{field}: {message}" if field else message)
+            errors.append(f"Fila {line}: {'; '.join(details)}")
+            continue
+
+        if question.week_number > total_weeks:
+            errors.append(f"Fila {line}: la semana {question.week_number} no existe (el torneo tiene {total_weeks})")
+        elif question.key in seen:
+            errors.append(f"Fila {line}: repite la semana, dia y numero de la fila {seen[question.key]}")
+        else:
+            seen[question.key] = line
+            questions.append(question)
+    return questions, errors
+
+
+class QuestionImportResult(NamedTuple):
+    tournament_id: str
+    created: int
+    replaced: int
+    skipped: int
+    failed: int
+    question_ids: list[str]
+
+
+def question_id(tournament_id: str, question: QuestionImportRow) -> str:
+    """Imported questions get ids from their position, so repeating an import never duplicates them."""
+    return f"{tournament_id}-w{question.week_number:02d}-d{question.day_number}-q{question.question_number}"
+
+
+def _question_document(tournament_id: str, tournament_data: dict, question: QuestionImportRow) -> dict:
+    from google.cloud.firestore import SERVER_TIMESTAMP
+
+    release_date = question.release_date
+    if release_date is None:
+        start = tournament_data["startDate"]
+        if start.tzinfo is not None:
+            start = start.astimezone(timezone.utc)
+        day = start.date() + timedelta(days=(question.week_number - 1) * 7 + question.day_number - 1)
+        release_date = datetime.combine(day, datetime.min.time())
+
+    stars = question.stars
+    if stars is None:
+        stars = 3 if question.is_extra_question else 1
+
+    return {
+        "tournamentId": tournament_id,
+        "weekNumber": question.week_number,
+        "dayNumber": question.day_number,
+        "questionNumber": question.question_number,
+        "questionText": question.question_text,
+        "bibleReference": question.bible_reference,
+        "bibleVerseText": question.bible_verse_text,
+        "options": [{"id": option.id, "text": option.text} for option in question.options],
+        "correctAnswer": question.correct_answer,
+        "stars": stars,
+        "isExtraQuestion": question.is_extra_question,
+        "youtubeShortId": question.youtube_short_id,
+        "releaseDate": release_date,
+        "updatedAt": SERVER_TIMESTAMP
+    }
+
+
+def import_questions(
+    db,
+    tournament_id: str,
+    tournament_data: dict,
+    questions: list[QuestionImportRow],
+    replace: bool = False,
+    workers: int = 4,
+    on_batch: Callable[[int], None] | None = None
+) -> QuestionImportResult:
+    """
+    Write validated questions to a tournament in parallel batches of 500.
+
+    Questions already in the tournament (same week, day and number) are
+    skipped, or overwritten in place with `replace`. That also makes imports
+    resumable: running an interrupted import again only writes what is
+    missing. `on_batch` is called with the size of each committed batch.
+    """
+    from google.cloud.firestore import SERVER_TIMESTAMP
+
+    existing = {}
+    query = db.collection("questions").where("tournamentId", "==", tournament_id).select(
+        ["weekNumber", "dayNumber", "questionNumber"]
+    )
+    for doc in query.stream():
+        data = doc.to_dict()
+        existing[(data.get("weekNumber"), data.get("dayNumber"), data.get("questionNumber"))] = doc.id
+
+    # (document id, document, replaces an existing question)
+    writes = []
+    skipped = 0
+    for question in questions:
+        document = _question_document(tournament_id, tournament_data, question)
+        current_id = existing.get(question.key)
+        if current_id is None:
+            document["createdAt"] = SERVER_TIMESTAMP
+            writes.append((question_id(tournament_id, question), document, False))
+        elif replace:
+            writes.append((current_id, document, True))
+        else:
+            skipped += 1
+
+    def commit(chunk: list[tuple]) -> list[tuple]:
+        batch = db.batch()
+        for document_id, document, _ in chunk:
+            batch.set(db.collection("questions").document(document_id), document, merge=True)
+        batch.commit()
+        return chunk
+
+    chunks = [writes[start:start + BATCH_LIMIT] for start in range(0, len(writes), BATCH_LIMIT)]
+    written = []
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(pool.submit(commit, chunk), chunk) for chunk in chunks]
+        for future, chunk in futures:
+            try:
+                written.extend(future.result())
+                if on_batch:
+                    on_batch(len(chunk))
+            except Exception as e:
+                print(f"Error importing {len(chunk)} questions into {tournament_id}: {e}")
+                failed += len(chunk)
+
+    replaced = sum(1 for _, _, replacing in written if replacing)
+    return QuestionImportResult(
+        tournament_id,
+        len(written) - replaced,
+        replaced,
+        skipped,
+        failed,
+        [document_id for document_id, _, _ in written]
+    )
@@ -0,0 +1,70 @@
+import asyncio
+
+from src.config import settings
+from src.database import get_document, get_firestore_client, run_sync
+from src.questions.bundle import week_questions_cache
+from src.questions.cache import question_cache
+from src.questions.daily import daily_questions_cache
+
+
+# Bumped by every question edit or import, so each worker notices it and drops
+# its question caches instead of grading with old answers until they expire
+VERSION_COLLECTION = "cacheVersions"
+VERSION_DOCUMENT = "questions"
+
+# Last version this worker has seen; None until the first check
+_seen_version: int | None = None
+
+
+def clear_question_caches(question_ids: list[str] | None = None):
+    """Drop this worker's cached questions (all of them without ids) and question sets."""
+    if question_ids is None:
+        question_cache.clear()
+    else:
+        for question_id in question_ids:
+            question_cache.invalidate(question_id)
+    daily_questions_cache.clear()
+    week_questions_cache.clear()
+
+
+def bump_questions_version(db):
+    """Tell every worker that questions changed. Call after the change is committed."""
+    from google.cloud.firestore import SERVER_TIMESTAMP, Increment
+
+    db.collection(VERSION_COLLECTION).document(VERSION_DOCUMENT).set(
+        {"version": Increment(1), "updatedAt": SERVER_TIMESTAMP}, merge=True
+    )
+
+
+async def questions_changed(db, question_ids: list[str]):
+    """Invalidate the changed questions here and, through the version, on every other worker."""
+    clear_question_caches(question_ids)
+    await run_sync(bump_questions_version, db)
+
+
+async def check_questions_version(db) -> bool:
+    """Clear the question caches if another worker bumped the version; returns whether it did."""
+    global _seen_version
+
+    doc = await get_document(db.collection(VERSION_COLLECTION).document(VERSION_DOCUMENT))
+    version = doc.to_dict().get("version", 0) if doc.exists else 0
+
+    changed = _seen_version is not None and version != _seen_version
+    if changed:
+        clear_question_caches()
+    _seen_version = version
+    return changed
+
+
+async def watch_questions_version_forever():
+    """Poll the questions version, so edits reach this worker within QUESTION_CACHE_VERSION_POLL_SECONDS."""
+    db = get_firestore_client()
+    while True:
+        try:
+            await check_questions_version(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error checking the questions version: {e}")
+
+        await asyncio.sleep(settings.QUESTION_CACHE_VERSION_POLL_SECONDS)
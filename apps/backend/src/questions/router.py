@@ -1,12 +1,25 @@
-from fastapi import APIRouter, HTTPException, status
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Path, Request, status
 from typing import List, Optional
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, Field
+from datetime import date
 
 from src.auth.dependencies import CurrentUser, AdminUser
-from src.database import get_firestore_client
+from src.cache import LRUCache
+from src.config import settings
+from src.database import get_firestore_client, run_sync
+from src.questions.cache import get_question, get_questions
+from src.questions.daily import get_daily_question_set, seconds_until_end_of
+from src.questions.bundle import get_week_question_set
+from src.questions.importer import import_questions, read_question_rows, validate_question_rows
+from src.questions.invalidation import questions_changed
+from src.http_cache import etag_matches, not_modified, set_cache_headers
+from src.serialization import dumps, json_response
+from src.scores.leaderboard import record_stars
+from src.idempotency import IdempotentRoute
 
-router = APIRouter()
+router = APIRouter(route_class=IdempotentRoute)
 
 
 class QuestionOption(BaseModel):
@@ -29,6 +42,12 @@ class QuestionResponse(BaseModel):
     youtube_short_id: Optional[str] = None
 
 
+class QuestionBundleResponse(BaseModel):
+    tournament_id: str
+    week_number: int
+    questions: List[QuestionResponse]
+
+
 class AnswerRequest(BaseModel):
     question_id: str
     selected_answer: str
@@ -40,100 +59,428 @@ class AnswerResponse(BaseModel):
     stars_earned: int
 
 
+class BatchAnswerRequest(BaseModel):
+    answers: List[AnswerRequest] = Field(min_length=1, max_length=20)
+
+
+class BatchAnswerResult(BaseModel):
+    question_id: str
+    is_correct: Optional[bool] = None
+    correct_answer: Optional[str] = None
+    stars_earned: Optional[int] = None
+    error: Optional[str] = None
+
+
+class QuestionUpdateRequest(BaseModel):
+    question_text: Optional[str] = None
+    bible_reference: Optional[str] = None
+    bible_verse_text: Optional[str] = None
+    options: Optional[List[QuestionOption]] = None
+    correct_answer: Optional[str] = None
+    stars: Optional[int] = None
+    youtube_short_id: Optional[str] = None
+
+
+class QuestionImportResponse(BaseModel):
+    created: int
+    replaced: int
+    skipped: int
+    failed: int
+    valid_rows: int
+
+
+# Request field -> Firestore field for question updates
+QUESTION_FIELDS = {
+    "question_text": "questionText",
+    "bible_reference": "bibleReference",
+    "bible_verse_text": "bibleVerseText",
+    "options": "options",
+    "correct_answer": "correctAnswer",
+    "stars": "stars",
+    "youtube_short_id": "youtubeShortId",
+}
+
+
+def _question_payload(question_id: str, data: dict) -> dict:
+    """A QuestionResponse as plain JSON data, without building the model."""
+    return {
+        "id": question_id,
+        "tournament_id": data.get("tournamentId", ""),
+        "week_number": int(data.get("weekNumber", 1)),
+        "day_number": int(data.get("dayNumber", 1)),
+        "question_number": int(data.get("questionNumber", 1)),
+        "question_text": data.get("questionText", ""),
+        "bible_reference": data.get("bibleReference", ""),
+        "bible_verse_text": data.get("bibleVerseText", ""),
+        "options": [{"id": option["id"], "text": option["text"]} for option in data.get("options", [])],
+        "stars": int(data.get("stars", 1)),
+        "is_extra_question": data.get("isExtraQuestion", False),
+        "youtube_short_id": data.get("youtubeShortId")
+    }
+
+
+# Encoded daily question sets and week bundles keyed by their content ETag
+_question_bodies = LRUCache(max_size=settings.DAILY_QUESTIONS_CACHE_MAX_SIZE, ttl_seconds=24 * 60 * 60)
+
+
 @router.get("/daily/{tournament_id}", response_model=List[QuestionResponse])
-async def get_daily_questions(tournament_id: str, current_user: CurrentUser):
-    """Get today's questions for a tournament."""
-    from datetime import date
+async def get_daily_questions(tournament_id: str, current_user: CurrentUser, request: Request):
+    """
+    Get today's questions for a tournament.
 
+    Supports conditional requests: a matching If-None-Match gets a 304
+    straight from the per-day cache. Responses are cacheable until midnight
+    at most.
+    """
     db = get_firestore_client()
+    today = date.today()
 
-    today = datetime.combine(date.today(), datetime.min.time())
-    tomorrow = datetime.combine(date.today(), datetime.max.time())
-
-    questions_ref = db.collection("questions")
-    query = questions_ref.where("tournamentId", "==", tournament_id).where(
-        "releaseDate", ">=", today
-    ).where("releaseDate", "<=", tomorrow).order_by("releaseDate").order_by("questionNumber")
-
-    docs = query.stream()
-
-    questions = []
-    for doc in docs:
-        data = doc.to_dict()
-        questions.append(QuestionResponse(
-            id=doc.id,
-            tournament_id=data.get("tournamentId", ""),
-            week_number=data.get("weekNumber", 1),
-            day_number=data.get("dayNumber", 1),
-            question_number=data.get("questionNumber", 1),
-            question_text=data.get("questionText", ""),
-            bible_reference=data.get("bibleReference", ""),
-            bible_verse_text=data.get("bibleVerseText", ""),
-            options=[QuestionOption(**opt) for opt in data.get("options", [])],
-            stars=data.get("stars", 1),
-            is_extra_question=data.get("isExtraQuestion", False),
-            youtube_short_id=data.get("youtubeShortId")
-        ))
+    question_set = await get_daily_question_set(db, tournament_id, today)
+    max_age = min(settings.HTTP_CACHE_MAX_AGE_SECONDS, seconds_until_end_of(today))
+    if etag_matches(request, question_set.etag):
+        return not_modified(question_set.etag, max_age)
+
+    body = _question_bodies.get(question_set.etag)
+    if body is None:
+        body = dumps([_question_payload(question_id, data) for question_id, data in question_set.questions])
+        _question_bodies.put(question_set.etag, body)
+
+    response = json_response(body)
+    set_cache_headers(response, question_set.etag, max_age)
+    return response
+
+
+@router.get("/bundle/{tournament_id}/{week}", response_model=QuestionBundleResponse)
+async def get_question_bundle(
+    tournament_id: str,
+    current_user: CurrentUser,
+    request: Request,
+    week: int = Path(ge=1)
+):
+    """
+    Get every question of a tournament week released so far, in one response.
+
+    Lets clients prefetch a week instead of downloading each day on its own.
+    The bundle is the same for every player and only changes at midnight,
+    so it is served from cache and supports conditional requests.
+    """
+    db = get_firestore_client()
+    today = date.today()
+
+    question_set = await get_week_question_set(db, tournament_id, week, today)
+    max_age = min(settings.QUESTION_BUNDLE_MAX_AGE_SECONDS, seconds_until_end_of(today))
+    if etag_matches(request, question_set.etag):
+        return not_modified(question_set.etag, max_age)
+
+    body = _question_bodies.get(question_set.etag)
+    if body is None:
+        body = dumps({
+            "tournament_id": tournament_id,
+            "week_number": week,
+            "questions": [_question_payload(question_id, data) for question_id, data in question_set.questions]
+        })
+        _question_bodies.put(question_set.etag, body)
+
+    response = json_response(body)
+    set_cache_headers(response, question_set.etag, max_age)
+    return response
+
+
+def _participant_ref(db, tournament_id: str, user_id: str):
+    return db.collection("tournaments").document(tournament_id).collection("participants").document(user_id)
+
+
+def _build_answer(user_id: str, question_id: str, selected_answer: str, question_data: dict) -> dict:
+    """Grade an answer and build its Firestore document."""
+    from google.cloud.firestore import SERVER_TIMESTAMP
+
+    correct_answer = question_data.get("correctAnswer", "")
+    is_correct = selected_answer.upper() == correct_answer.upper()
+
+    return {
+        "oderId": user_id,
+        "questionId": question_id,
+        "tournamentId": question_data.get("tournamentId"),
+        "selectedAnswer": selected_answer.upper(),
+        "isCorrect": is_correct,
+        "starsEarned": question_data.get("stars", 1) if is_correct else 0,
+        "answeredAt": SERVER_TIMESTAMP
+    }
+
+
+def _participant_update(answers: list[dict]) -> dict:
+    """Participant stars and answer counters to increment for new answers."""
+    from google.cloud.firestore import SERVER_TIMESTAMP, Increment
+
+    stars = sum(answer["starsEarned"] for answer in answers)
+    correct = sum(1 for answer in answers if answer["isCorrect"])
+
+    update = {"totalAnswers": Increment(len(answers))}
+    if correct:
+        update["correctAnswers"] = Increment(correct)
+    if stars:
+        update["totalStars"] = Increment(stars)
+        # Picked up by other workers' leaderboard syncs
+        update["updatedAt"] = SERVER_TIMESTAMP
+    return update
+
+
+def _commit_answer(db, answer_ref, answer_data: dict, participant_ref):
+    """
+    Create the answer and update the participant's counters in one commit.
+
+    The answer is written with a create-only precondition, so a second answer
+    for the same question fails with AlreadyExists instead of overwriting.
+    Returns whether the participant was updated.
+    """
+    from google.api_core.exceptions import NotFound
+
+    batch = db.batch()
+    batch.create(answer_ref, answer_data)
+    if participant_ref is not None:
+        batch.update(participant_ref, _participant_update([answer_data]))
+
+    try:
+        batch.commit()
+    except NotFound:
+        # Not a participant: keep the answer, there is nobody to credit
+        answer_ref.create(answer_data)
+        return False
+
+    return participant_ref is not None
+
+
+def _commit_answers(db, user_id: str, answers: list[tuple]) -> tuple[list[dict], set[str]]:
+    """
+    Create several (ref, data) answers and update the participants in one commit.
+
+    If the batch fails because an answer already exists or the user is not a
+    participant, each answer is committed on its own instead. Returns the
+    answers credited to a participant and the ids of questions that turned
+    out to be already answered.
+    """
+    from google.api_core.exceptions import AlreadyExists, NotFound
+
+    by_tournament = {}
+    for _, answer_data in answers:
+        if answer_data["tournamentId"]:
+            by_tournament.setdefault(answer_data["tournamentId"], []).append(answer_data)
+
+    batch = db.batch()
+    for answer_ref, answer_data in answers:
+        batch.create(answer_ref, answer_data)
+    for tournament_id, tournament_answers in by_tournament.items():
+        batch.update(_participant_ref(db, tournament_id, user_id), _participant_update(tournament_answers))
+
+    try:
+        batch.commit()
+        return [answer_data for _, answer_data in answers if answer_data["tournamentId"]], set()
+    except (AlreadyExists, NotFound):
+        pass
 
-    return questions
+    credited = []
+    duplicates = set()
+    for answer_ref, answer_data in answers:
+        tournament_id = answer_data["tournamentId"]
+        participant_ref = _participant_ref(db, tournament_id, user_id) if tournament_id else None
+        try:
+            if _commit_answer(db, answer_ref, answer_data, participant_ref):
+                credited.append(answer_data)
+        except AlreadyExists:
+            duplicates.add(answer_data["questionId"])
+
+    return credited, duplicates
 
 
 @router.post("/answer", response_model=AnswerResponse)
 async def submit_answer(request: AnswerRequest, current_user: CurrentUser):
     """Submit an answer for a question."""
-    from google.cloud.firestore import SERVER_TIMESTAMP
+    from google.api_core.exceptions import AlreadyExists
 
     db = get_firestore_client()
 
     # Get the question
-    question_doc = db.collection("questions").document(request.question_id).get()
-    if not question_doc.exists:
+    question_data = await get_question(db, request.question_id)
+    if question_data is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pregunta no encontrada"
         )
 
-    question_data = question_doc.to_dict()
-    correct_answer = question_data.get("correctAnswer", "")
-    stars = question_data.get("stars", 1)
+    answer_data = _build_answer(current_user.uid, request.question_id, request.selected_answer, question_data)
+    tournament_id = answer_data["tournamentId"]
+    stars_earned = answer_data["starsEarned"]
 
-    # Check if already answered
     answer_id = f"{current_user.uid}_{request.question_id}"
-    existing_answer = db.collection("answers").document(answer_id).get()
-    if existing_answer.exists:
+    answer_ref = db.collection("answers").document(answer_id)
+
+    # Credit stars and answer counts in the same commit
+    participant_ref = None
+    if tournament_id:
+        participant_ref = _participant_ref(db, tournament_id, current_user.uid)
+
+    try:
+        credited = await run_sync(_commit_answer, db, answer_ref, answer_data, participant_ref)
+    except AlreadyExists:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ya respondiste esta pregunta"
         )
 
-    is_correct = request.selected_answer.upper() == correct_answer.upper()
-    stars_earned = stars if is_correct else 0
+    if credited:
+        record_stars(tournament_id, current_user.uid, stars_earned)
 
-    # Save the answer
-    answer_data = {
-        "oderId": current_user.uid,
-        "questionId": request.question_id,
-        "tournamentId": question_data.get("tournamentId"),
-        "selectedAnswer": request.selected_answer.upper(),
-        "isCorrect": is_correct,
-        "starsEarned": stars_earned,
-        "answeredAt": SERVER_TIMESTAMP
-    }
+    return AnswerResponse(
+        is_correct=answer_data["isCorrect"],
+        correct_answer=question_data.get("correctAnswer", ""),
+        stars_earned=stars_earned
+    )
 
-    db.collection("answers").document(answer_id).set(answer_data)
 
-    # Update user's total stars if correct
-    if is_correct:
-        tournament_id = question_data.get("tournamentId")
-        participant_ref = db.collection("tournaments").document(tournament_id).collection("participants").document(current_user.uid)
-        participant_doc = participant_ref.get()
+@router.post("/answers:batch", response_model=List[BatchAnswerResult])
+async def submit_answers_batch(request: BatchAnswerRequest, current_user: CurrentUser):
+    """
+    Submit several answers at once, e.g. a whole day's question set.
 
-        if participant_doc.exists:
-            current_stars = participant_doc.to_dict().get("totalStars", 0)
-            participant_ref.update({"totalStars": current_stars + stars_earned})
+    Each item is graded on its own and gets either its grade or the error the
+    single-answer endpoint would have returned for it.
+    """
+    db = get_firestore_client()
 
-    return AnswerResponse(
-        is_correct=is_correct,
-        correct_answer=correct_answer,
-        stars_earned=stars_earned
+    question_ids = [item.question_id for item in request.answers]
+    questions = await get_questions(db, question_ids)
+
+    results = []
+    new_answers = {}
+    for item in request.answers:
+        question_data = questions.get(item.question_id)
+        if question_data is None:
+            results.append(BatchAnswerResult(question_id=item.question_id, error="Pregunta no encontrada"))
+            continue
+
+        if item.question_id in new_answers:
+            results.append(BatchAnswerResult(question_id=item.question_id, error="Ya respondiste esta pregunta"))
+            continue
+
+        answer_data = _build_answer(current_user.uid, item.question_id, item.selected_answer, question_data)
+        new_answers[item.question_id] = answer_data
+        results.append(BatchAnswerResult(
+            question_id=item.question_id,
+            is_correct=answer_data["isCorrect"],
+            correct_answer=question_data.get("correctAnswer", ""),
+            stars_earned=answer_data["starsEarned"]
+        ))
+
+    if not new_answers:
+        return results
+
+    credited, duplicates = await run_sync(
+        _commit_answers,
+        db,
+        current_user.uid,
+        [
+            (db.collection("answers").document(f"{current_user.uid}_{question_id}"), answer_data)
+            for question_id, answer_data in new_answers.items()
+        ]
     )
+
+    for answer_data in credited:
+        record_stars(answer_data["tournamentId"], current_user.uid, answer_data["starsEarned"])
+
+    # Already answered questions are found by their create failing, as in submit_answer
+    if duplicates:
+        for index, result in enumerate(results):
+            if result.error is None and result.question_id in duplicates:
+                results[index] = BatchAnswerResult(question_id=result.question_id, error="Ya respondiste esta pregunta")
+
+    return results
+
+
+@router.post("/import/{tournament_id}", response_model=QuestionImportResponse)
+async def import_tournament_questions(
+    tournament_id: str,
+    request: Request,
+    admin_user: AdminUser,
+    replace: bool = False,
+    dry_run: bool = False
+):
+    """
+    Import a tournament's questions from a CSV or JSON body. Admin only.
+
+    The body is CSV when sent as text/csv, JSON otherwise. Every row is
+    validated first and nothing is written if any is invalid; the 422
+    lists the errors by row. Questions already in the tournament (same
+    week, day and number) are skipped, or overwritten with `replace`, so
+    an interrupted import can simply be sent again.
+    """
+    db = get_firestore_client()
+
+    tournament_doc = await run_sync(db.collection("tournaments").document(tournament_id).get)
+    if not tournament_doc.exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Torneo no encontrado"
+        )
+    tournament_data = tournament_doc.to_dict()
+
+    is_csv = request.headers.get("content-type", "").startswith("text/csv")
+    try:
+        rows = list(read_question_rows((await request.body()).decode("utf-8-sig"), "csv" if is_csv else "json"))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No se pudo leer el archivo: {e}"
+        )
+    if len(rows) > settings.QUESTION_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maximo {settings.QUESTION_IMPORT_MAX_ROWS} preguntas por importacion"
+        )
+
+    questions, errors = validate_question_rows(rows, int(tournament_data.get("totalWeeks", 15)), 2 if is_csv else 1)
+    if errors:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=errors)
+
+    if dry_run:
+        return QuestionImportResponse(created=0, replaced=0, skipped=0, failed=0, valid_rows=len(questions))
+
+    # On its own thread: batches are committed in parallel by a pool of their own
+    result = await asyncio.to_thread(import_questions, db, tournament_id, tournament_data, questions, replace)
+
+    if result.question_ids:
+        await questions_changed(db, result.question_ids)
+
+    return QuestionImportResponse(
+        created=result.created,
+        replaced=result.replaced,
+        skipped=result.skipped,
+        failed=result.failed,
+        valid_rows=len(questions)
+    )
+
+
+@router.put("/{question_id}")
+async def update_question(question_id: str, request: QuestionUpdateRequest, admin_user: AdminUser):
+    """Update a question. Admin only."""
+    from google.api_core.exceptions import NotFound
+    from google.cloud.firestore import SERVER_TIMESTAMP
+
+    db = get_firestore_client()
+
+    update_data = {
+        QUESTION_FIELDS[field]: value
+        for field, value in request.model_dump(exclude_unset=True).items()
+    }
+    update_data["updatedAt"] = SERVER_TIMESTAMP
+
+    try:
+        await run_sync(db.collection("questions").document(question_id).update, update_data)
+    except NotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pregunta no encontrada"
+        )
+
+    await questions_changed(db, [question_id])
+
+    return {"success": True, "message": "Pregunta actualizada"}
@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from src.database import BATCH_LIMIT, commit_if_unchanged
+
+
+class CatchUpResult(NamedTuple):
+    tournament_id: str
+    late_joiners: int
+    credited: int
+    skipped: int
+    new_reference_weeks: list[int]
+
+
+def week_start(tournament_data: dict, week: int) -> datetime:
+    """Start of a tournament week; week 1 starts at `startDate`."""
+    return tournament_data["startDate"] + timedelta(weeks=week - 1)
+
+
+def week_end(tournament_data: dict, week: int) -> datetime:
+    return week_start(tournament_data, week) + timedelta(weeks=1)
+
+
+def missed_weeks(tournament_data: dict, joined_at: datetime) -> list[int]:
+    """Weeks that were over before a participant joined."""
+    if tournament_data.get("startDate") is None or joined_at is None:
+        return []
+    return [
+        week for week in range(1, int(tournament_data.get("totalWeeks", 15)) + 1)
+        if week_end(tournament_data, week) <= joined_at
+    ]
+
+
+def catch_up_stars(tournament_data: dict, joined_at: datetime) -> int:
+    """
+    Stars credited to a participant for the weeks they missed.
+
+    `catchUpPercentage` of the average stars that on-time participants
+    earned in each missed week, from the precomputed `catchUpReference`.
+    Weeks without a reference yet count as 0; a later run tops them up.
+    """
+    references = tournament_data.get("catchUpReference") or {}
+    reference = sum(references.get(f"week{week}", 0) for week in missed_weeks(tournament_data, joined_at))
+    return int(round(reference * tournament_data.get("catchUpPercentage", 70) / 100))
+
+
+def compute_week_references(db, tournament_ref, tournament_data: dict) -> dict[str, float]:
+    """
+    Freeze the reference of every finished week that doesn't have one yet.
+
+    A week's reference is the average `weeklyStars` of the participants who
+    had joined before it started. It is computed once, when the ranking job
+    has counted every star of the week, from a single pass over the
+    participants. Returns the references added.
+    """
+    ranked_through = tournament_data.get("rankedThrough")
+    if tournament_data.get("startDate") is None or ranked_through is None:
+        return {}
+
+    known = tournament_data.get("catchUpReference") or {}
+    weeks = [
+        week for week in range(1, int(tournament_data.get("totalWeeks", 15)) + 1)
+        if f"week{week}" not in known and week_end(tournament_data, week) <= ranked_through
+    ]
+    if not weeks:
+        return {}
+
+    totals = dict.fromkeys(weeks, 0)
+    players = dict.fromkeys(weeks, 0)
+    participants = tournament_ref.collection("participants").select(["joinedAt", "weeklyStars"])
+    for doc in participants.stream():
+        data = doc.to_dict()
+        joined_at = data.get("joinedAt")
+        weekly_stars = data.get("weeklyStars") or {}
+        for week in weeks:
+            if joined_at is not None and joined_at <= week_start(tournament_data, week):
+                totals[week] += weekly_stars.get(f"week{week}", 0)
+                players[week] += 1
+
+    references = {
+        f"week{week}": round(totals[week] / players[week], 2) if players[week] else 0.0
+        for week in weeks
+    }
+    tournament_ref.update({f"catchUpReference.{week}": reference for week, reference in references.items()})
+    return references
+
+
+def _commit_credits(db, credits: list[tuple]) -> tuple[int, int]:
+    """
+    Commit (participant snapshot, catch-up stars) credits in one batch.
+
+    Each write is conditioned on the snapshot that was read, so a credit is
+    never applied twice; participants that changed meanwhile (they answered,
+    or another run credited them) are left for the next run.
+    Returns (credited, skipped).
+    """
+    from google.cloud.firestore import SERVER_TIMESTAMP, Increment
+
+    return commit_if_unchanged(db, [
+        (doc.reference, doc.update_time, {
+            "catchUpStars": stars,
+            "totalStars": Increment(stars - doc.to_dict().get("catchUpStars", 0)),
+            "updatedAt": SERVER_TIMESTAMP
+        })
+        for doc, stars in credits
+    ])
+
+
+def apply_catch_up(db, tournament_id: str) -> CatchUpResult | None:
+    """
+    Bring `catchUpStars` of every late joiner of a tournament up to date.
+
+    One streaming pass over the participants marked `isCatchUp`. The
+    difference between the stars owed and the stars already credited is
+    added to `totalStars` in the same write that records `catchUpStars`, so
+    running it again changes nothing. Returns None if the tournament
+    doesn't exist.
+    """
+    tournament_ref = db.collection("tournaments").document(tournament_id)
+    tournament_doc = tournament_ref.get()
+    if not tournament_doc.exists:
+        return None
+
+    tournament_data = tournament_doc.to_dict()
+    new_references = compute_week_references(db, tournament_ref, tournament_data)
+    if new_references:
+        tournament_data["catchUpReference"] = {**(tournament_data.get("catchUpReference") or {}), **new_references}
+
+    late_joiners = 0
+    credited = 0
+    skipped = 0
+    pending = []
+
+    participants = tournament_ref.collection("participants").where("isCatchUp", "==", True).select(["joinedAt", "catchUpStars"])
+    for doc in participants.stream():
+        late_joiners += 1
+        stars = catch_up_stars(tournament_data, doc.to_dict().get("joinedAt"))
+        if stars != doc.to_dict().get("catchUpStars", 0):
+            pending.append((doc, stars))
+
+        if len(pending) >= BATCH_LIMIT:
+            done, failed = _commit_credits(db, pending)
+            credited, skipped, pending = credited + done, skipped + failed, []
+
+    if pending:
+        done, failed = _commit_credits(db, pending)
+        credited, skipped = credited + done, skipped + failed
+
+    return CatchUpResult(
+        tournament_id,
+        late_joiners,
+        credited,
+        skipped,
+        sorted(int(week.removeprefix("week")) for week in new_references)
+    )
+
+
+def apply_active_catch_up(db) -> list[CatchUpResult]:
+    """Bring the late joiners of every active tournament up to date."""
+    tournaments = db.collection("tournaments").where("status", "==", "active").select(["__name__"]).stream()
+    results = []
+    for doc in tournaments:
+        result = apply_catch_up(db, doc.id)
+        if result is not None:
+            results.append(result)
+    return results
@@ -0,0 +1,182 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta, timezone
+
+from src.cache import SingleFlight
+from src.config import settings
+from src.database import get_document, stream_query
+from src.scores.live import leaderboard_hub
+
+
+class Leaderboard:
+    """
+    In-memory ranking of a tournament's participants.
+
+    Participants are kept in a list sorted by (-stars, user_id), so a page is
+    a slice and a user's rank is a binary search.
+    """
+
+    def __init__(self, tournament_id: str, synced_from: datetime):
+        self.tournament_id = tournament_id
+        self.loaded_at = time.monotonic()
+        # Wall-clock start of the last sync with Firestore
+        self.synced_from = synced_from
+        self._stars: dict[str, int] = {}
+        self._names: dict[str, str] = {}
+        self._order: list[tuple[int, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def is_stale(self) -> bool:
+        """Whether the board should be synced to pick up other workers' writes."""
+        return time.monotonic() - self.loaded_at > settings.LEADERBOARD_REFRESH_SECONDS
+
+    def mark_synced(self, synced_from: datetime):
+        self.synced_from = synced_from
+        self.loaded_at = time.monotonic()
+
+    def set_participant(self, user_id: str, display_name: str, stars: int) -> bool:
+        """Add a participant or replace their stars; returns whether anything changed."""
+        with self._lock:
+            if user_id in self._stars:
+                if self._stars[user_id] == stars and self._names[user_id] == display_name:
+                    return False
+                self._order.pop(bisect_left(self._order, (-self._stars[user_id], user_id)))
+            self._stars[user_id] = stars
+            self._names[user_id] = display_name
+            insort(self._order, (-stars, user_id))
+            return True
+
+    def add_stars(self, user_id: str, delta: int):
+        """Credit stars to an existing participant."""
+        with self._lock:
+            if user_id not in self._stars:
+                return
+            old_stars = self._stars[user_id]
+            self._order.pop(bisect_left(self._order, (-old_stars, user_id)))
+            self._stars[user_id] = old_stars + delta
+            insort(self._order, (-(old_stars + delta), user_id))
+
+    def page(self, limit: int, after: tuple[int, str] | None = None) -> list[tuple[int, str, str, int]]:
+        """
+        Return (rank, user_id, display_name, stars) for up to `limit` places.
+
+        `after` is the (stars, user_id) of the last entry of the previous page.
+        """
+        with self._lock:
+            start = bisect_right(self._order, (-after[0], after[1])) if after else 0
+            return [
+                (position, user_id, self._names[user_id], -neg_stars)
+                for position, (neg_stars, user_id) in enumerate(
+                    self._order[start:start + limit], start=start + 1
+                )
+            ]
+
+    def rank_of(self, user_id: str) -> tuple[int, int] | None:
+        """Return (rank, stars) for a participant; ties share the best rank."""
+        with self._lock:
+            stars = self._stars.get(user_id)
+            if stars is None:
+                return None
+            return bisect_left(self._order, (-stars, "")) + 1, stars
+
+    def entries(self, user_ids) -> list[tuple[int, str, str, int]]:
+        """Return (rank, user_id, display_name, stars) for the given participants, best rank first."""
+        with self._lock:
+            entries = [
+                (bisect_left(self._order, (-self._stars[user_id], "")) + 1, user_id, self._names[user_id], self._stars[user_id])
+                for user_id in user_ids
+                if user_id in self._stars
+            ]
+        entries.sort()
+        return entries
+
+
+_leaderboards: dict[str, Leaderboard] = {}
+_leaderboard_flight = SingleFlight()
+
+
+_PARTICIPANT_FIELDS = ["displayName", "totalStars"]
+
+
+async def _load_leaderboard(db, tournament_id: str) -> Leaderboard | None:
+    tournament_ref = db.collection("tournaments").document(tournament_id)
+    tournament_doc = await get_document(tournament_ref)
+    if not tournament_doc.exists:
+        return None
+
+    synced_from = datetime.now(timezone.utc)
+    docs = await stream_query(tournament_ref.collection("participants").select(_PARTICIPANT_FIELDS))
+
+    board = Leaderboard(tournament_id, synced_from)
+    for doc in docs:
+        data = doc.to_dict()
+        board.set_participant(doc.id, data.get("displayName", "Usuario"), int(data.get("totalStars", 0)))
+
+    _leaderboards[tournament_id] = board
+    return board
+
+
+async def _sync_leaderboard(db, board: Leaderboard) -> Leaderboard:
+    """
+    Apply the participants written since the board's last sync.
+
+    Every write that changes a participant's stars or name stamps
+    `updatedAt`, so this reads only what changed, including other workers'
+    writes. Syncs overlap by LEADERBOARD_SYNC_OVERLAP_SECONDS to allow for
+    clock skew; applying a participant twice is harmless.
+    """
+    synced_from = datetime.now(timezone.utc)
+    since = board.synced_from - timedelta(seconds=settings.LEADERBOARD_SYNC_OVERLAP_SECONDS)
+    docs = await stream_query(
+        db.collection("tournaments").document(board.tournament_id).collection("participants").where(
+            "updatedAt", ">", since
+        ).select(_PARTICIPANT_FIELDS)
+    )
+
+    changed = []
+    for doc in docs:
+        data = doc.to_dict()
+        if board.set_participant(doc.id, data.get("displayName", "Usuario"), int(data.get("totalStars", 0))):
+            changed.append(doc.id)
+    board.mark_synced(synced_from)
+
+    # Writes made by other workers show up here; pass them on to live clients
+    if changed:
+        leaderboard_hub.publish(board.tournament_id, changed)
+    return board
+
+
+async def get_tournament_leaderboard(db, tournament_id: str) -> Leaderboard | None:
+    """
+    Get the leaderboard for a tournament, or None if the tournament doesn't exist.
+
+    Boards are built once from `participants`, then synced every
+    LEADERBOARD_REFRESH_SECONDS with the participants changed since;
+    concurrent loads and syncs share one query.
+    """
+    board = _leaderboards.get(tournament_id)
+    if board is None:
+        return await _leaderboard_flight.do(tournament_id, lambda: _load_leaderboard(db, tournament_id))
+    if board.is_stale():
+        return await _leaderboard_flight.do(tournament_id, lambda: _sync_leaderboard(db, board))
+    return board
+
+
+def record_participant(tournament_id: str, user_id: str, display_name: str, stars: int = 0):
+    """Reflect a new participant in the loaded leaderboard, if any."""
+    board = _leaderboards.get(tournament_id)
+    if board is not None:
+        board.set_participant(user_id, display_name, stars)
+        leaderboard_hub.publish(tournament_id, [user_id])
+
+
+def record_stars(tournament_id: str, user_id: str, delta: int):
+    """Reflect stars credited by a write path in the loaded leaderboard, if any."""
+    board = _leaderboards.get(tournament_id)
+    if board is not None and delta:
+        board.add_stars(user_id, delta)
+        leaderboard_hub.publish(tournament_id, [user_id])
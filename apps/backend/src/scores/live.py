@@ -0,0 +1,89 @@
+import asyncio
+
+from src.serialization import dumps
+
+
+class LeaderboardSubscription:
+    """
+    One connected client's view of a tournament's leaderboard changes.
+
+    Only the ids of participants that changed are kept, so repeated updates
+    for the same player coalesce. A client that falls more than
+    `max_pending` players behind is sent a fresh snapshot instead, which
+    bounds the memory a slow client can hold.
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.resync = False
+        self._changed: set[str] = set()
+        self._wakeup = asyncio.Event()
+
+    def notify(self, user_ids):
+        if not self.resync:
+            self._changed.update(user_ids)
+            if len(self._changed) > self.max_pending:
+                self._changed.clear()
+                self.resync = True
+        self._wakeup.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for changes; returns False if `timeout` passed without any."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def take(self) -> tuple[set[str], bool]:
+        """Return and reset (changed user ids, whether a snapshot is needed)."""
+        changed, resync = self._changed, self.resync
+        self._changed = set()
+        self.resync = False
+        self._wakeup.clear()
+        return changed, resync
+
+
+class LeaderboardHub:
+    """
+    Fans out leaderboard changes to the clients streaming them.
+
+    Fed by the in-process write paths and by leaderboard syncs, so
+    connected clients cost no Firestore reads of their own. Must be used
+    from the event loop.
+    """
+
+    def __init__(self):
+        self._subscriptions: dict[str, set[LeaderboardSubscription]] = {}
+
+    def subscribe(self, tournament_id: str, max_pending: int) -> LeaderboardSubscription:
+        subscription = LeaderboardSubscription(max_pending)
+        self._subscriptions.setdefault(tournament_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, tournament_id: str, subscription: LeaderboardSubscription):
+        subscriptions = self._subscriptions.get(tournament_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[tournament_id]
+
+    def client_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def publish(self, tournament_id: str, user_ids):
+        """Tell every client of a tournament that these participants changed."""
+        for subscription in self._subscriptions.get(tournament_id, ()):
+            subscription.notify(user_ids)
+
+
+leaderboard_hub = LeaderboardHub()
+
+
+def format_event(event: str, data) -> bytes:
+    """Encode a Server-Sent Event with a JSON payload."""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+# Comment line that keeps proxies from closing an idle stream
+HEARTBEAT = b": keepalive\n\n"
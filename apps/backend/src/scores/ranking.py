@@ -0,0 +1,187 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from src.config import settings
+from src.database import ChunkedBatch, acquire_lease, get_firestore_client, run_sync
+from src.scores.catch_up import apply_active_catch_up
+
+
+class RankingResult(NamedTuple):
+    tournament_id: str
+    participants: int
+    answers: int
+    submissions: int
+    writes: int
+    full: bool
+
+
+def _weekly_fingerprint(weekly_stars: dict) -> int:
+    return hash(tuple(sorted(weekly_stars.items())))
+
+
+def _week_numbers(query) -> dict[str, int]:
+    """Document id -> weekNumber for the documents of a query that have one."""
+    weeks = {}
+    for doc in query.select(["weekNumber"]).stream():
+        week = (doc.to_dict() or {}).get("weekNumber")
+        if week is not None:
+            weeks[doc.id] = int(week)
+    return weeks
+
+
+def compute_tournament_rankings(db, tournament_id: str, full: bool = False) -> RankingResult | None:
+    """
+    Materialize `rank` and `weeklyStars` on every participant of a tournament.
+
+    Ranks are dense (tied players share a rank and the next one follows on)
+    and come from `totalStars`. Weekly stars are the stars earned from
+    answers and approved challenge submissions, per week of the question or
+    challenge.
+
+    Runs are incremental: only answers and reviews since the tournament's
+    `rankedThrough` are read and added to each participant. Participants
+    also record the point they were updated through, so repeating a run that
+    died halfway doesn't count anything twice. `full` recomputes weekly
+    stars from every answer instead.
+
+    Memory grows with participants times weeks, never with answers. Returns
+    None if the tournament doesn't exist.
+    """
+    from google.cloud.firestore import SERVER_TIMESTAMP, Increment
+
+    tournament_ref = db.collection("tournaments").document(tournament_id)
+    tournament_doc = tournament_ref.get()
+    if not tournament_doc.exists:
+        return None
+
+    since = None if full else tournament_doc.to_dict().get("rankedThrough")
+    # Leave recent commits out; their server timestamps may still be settling
+    through = datetime.now(timezone.utc) - timedelta(seconds=settings.RANKING_SETTLE_SECONDS)
+
+    question_weeks = _week_numbers(db.collection("questions").where("tournamentId", "==", tournament_id))
+    challenge_weeks = _week_numbers(db.collection("challenges").where("tournamentId", "==", tournament_id))
+
+    # user_id -> (totalStars, rank, fingerprint of weeklyStars in a full run)
+    participants_ref = tournament_ref.collection("participants")
+    participants = {}
+    # user_id -> rankedThrough, for participants an unfinished run already updated past `since`
+    ahead = {}
+
+    fields = ["totalStars", "rank", "rankedThrough"] + (["weeklyStars"] if full else [])
+    for doc in participants_ref.select(fields).stream():
+        data = doc.to_dict()
+        fingerprint = _weekly_fingerprint(data.get("weeklyStars") or {}) if full else None
+        participants[doc.id] = (int(data.get("totalStars", 0)), data.get("rank", 0), fingerprint)
+
+        ranked_through = data.get("rankedThrough")
+        if since is not None and ranked_through is not None and ranked_through > since:
+            ahead[doc.id] = ranked_through
+
+    # user_id -> {week: stars earned since `since`}
+    weekly = {}
+
+    def credit(user_id: str, week: int | None, stars, at):
+        if not stars or week is None or user_id not in participants:
+            return
+        if user_id in ahead and at is not None and at <= ahead[user_id]:
+            return
+        weeks = weekly.setdefault(user_id, {})
+        weeks[week] = weeks.get(week, 0) + int(stars)
+
+    answers = db.collection("answers").where("tournamentId", "==", tournament_id)
+    if since is not None:
+        answers = answers.where("answeredAt", ">", since)
+    answers = answers.where("answeredAt", "<=", through).select(["oderId", "questionId", "starsEarned", "answeredAt"])
+
+    answer_count = 0
+    for doc in answers.stream():
+        data = doc.to_dict()
+        answer_count += 1
+        credit(data.get("oderId"), question_weeks.get(data.get("questionId")), data.get("starsEarned"), data.get("answeredAt"))
+
+    submissions = db.collection_group("submissions").where("tournamentId", "==", tournament_id).where(
+        "status", "==", "approved"
+    )
+    if since is not None:
+        submissions = submissions.where("reviewedAt", ">", since)
+    submissions = submissions.where("reviewedAt", "<=", through).select(["oderId", "starsAwarded", "reviewedAt"])
+
+    submission_count = 0
+    for doc in submissions.stream():
+        challenge_id = doc.reference.parent.parent.id
+        if challenge_id not in challenge_weeks:
+            continue
+        data = doc.to_dict()
+        submission_count += 1
+        credit(data.get("oderId"), challenge_weeks[challenge_id], data.get("starsAwarded"), data.get("reviewedAt"))
+
+    star_values = sorted({stars for stars, _, _ in participants.values()}, reverse=True)
+    dense_ranks = {stars: rank for rank, stars in enumerate(star_values, start=1)}
+
+    # Only participants whose rank or weekly stars changed are written
+    batch = ChunkedBatch(db)
+    for user_id, (stars, rank, fingerprint) in participants.items():
+        update = {}
+        if dense_ranks[stars] != rank:
+            update["rank"] = dense_ranks[stars]
+
+        weeks = weekly.get(user_id, {})
+        if full:
+            weekly_stars = {f"week{week}": weeks[week] for week in sorted(weeks)}
+            if _weekly_fingerprint(weekly_stars) != fingerprint:
+                update["weeklyStars"] = weekly_stars
+                update["rankedThrough"] = through
+        elif weeks:
+            for week, week_stars in weeks.items():
+                update[f"weeklyStars.week{week}"] = Increment(week_stars)
+            update["rankedThrough"] = through
+
+        if update:
+            batch.update(participants_ref.document(user_id), update)
+    batch.flush()
+
+    tournament_ref.update({"rankedThrough": through, "rankedAt": SERVER_TIMESTAMP})
+
+    return RankingResult(tournament_id, len(participants), answer_count, submission_count, batch.committed, full)
+
+
+def compute_active_rankings(db, full: bool = False) -> list[RankingResult]:
+    """Compute the rankings of every active tournament."""
+    tournaments = db.collection("tournaments").where("status", "==", "active").select(["__name__"]).stream()
+    results = []
+    for doc in tournaments:
+        result = compute_tournament_rankings(db, doc.id, full)
+        if result is not None:
+            results.append(result)
+    return results
+
+
+async def compute_rankings_forever():
+    """
+    Refresh the rankings of active tournaments every RANKING_INTERVAL_SECONDS.
+
+    Late joiners' catch-up stars are brought up to date right after, since
+    they are based on the weekly stars the rankings just counted. Every
+    worker runs this loop; a lease lets only one of them compute each round.
+    """
+    if settings.RANKING_INTERVAL_SECONDS <= 0:
+        return
+
+    while True:
+        await asyncio.sleep(settings.RANKING_INTERVAL_SECONDS)
+
+        try:
+            db = get_firestore_client()
+            if await run_sync(acquire_lease, db, "ranking", settings.RANKING_INTERVAL_SECONDS / 2):
+                # On its own thread: a run can take minutes and must not hold a Firestore worker
+                results = await asyncio.to_thread(compute_active_rankings, db)
+                for result in results:
+                    print(f"Rankings of {result.tournament_id}: {result.participants} participants, {result.writes} writes")
+
+                for result in await asyncio.to_thread(apply_active_catch_up, db):
+                    print(f"Catch-up of {result.tournament_id}: {result.credited} of {result.late_joiners} late joiners credited")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error computing rankings: {e}")
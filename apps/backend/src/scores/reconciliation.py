@@ -0,0 +1,150 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from src.database import BATCH_LIMIT, commit_if_unchanged
+
+
+class StarDiff(NamedTuple):
+    """A participant whose `totalStars` doesn't match their answers, challenges and catch-up."""
+
+    user_id: str
+    recorded: int
+    expected: int
+    answer_stars: int
+    challenge_stars: int
+    catch_up_stars: int
+
+    @property
+    def difference(self) -> int:
+        return self.expected - self.recorded
+
+
+class ReconciliationResult(NamedTuple):
+    tournament_id: str
+    participants: int
+    answers: int
+    submissions: int
+    diffs: list[StarDiff]
+    corrected: int
+    skipped: int
+
+
+def _answer_partitions(db, tournament_id: str, until: datetime, partitions: int) -> list[tuple[datetime, datetime]]:
+    """Split the tournament's answers up to `until` into (after, through] ranges of answeredAt."""
+    answers = db.collection("answers").where("tournamentId", "==", tournament_id)
+    first = list(answers.order_by("answeredAt").limit(1).select(["answeredAt"]).stream())
+    if not first:
+        return []
+
+    start = first[0].to_dict()["answeredAt"] - timedelta(microseconds=1)
+    if start >= until:
+        return [(start, until)]
+
+    step = (until - start) / partitions
+    bounds = [start + step * index for index in range(partitions)] + [until]
+    return list(zip(bounds, bounds[1:]))
+
+
+def _sum_answers(db, tournament_id: str, after: datetime, through: datetime, read_times: dict) -> tuple[Counter, int]:
+    """
+    Stream one range of answers and sum starsEarned per participant.
+
+    Only answers committed before a participant's snapshot count, so the sum
+    compares with the `totalStars` that was read.
+    """
+    query = db.collection("answers").where("tournamentId", "==", tournament_id).where(
+        "answeredAt", ">", after
+    ).where("answeredAt", "<=", through).select(["oderId", "starsEarned", "answeredAt"])
+
+    stars = Counter()
+    count = 0
+    for doc in query.stream():
+        data = doc.to_dict()
+        count += 1
+        user_id = data.get("oderId")
+        read_time = read_times.get(user_id)
+        if read_time is not None and data.get("starsEarned") and data["answeredAt"] <= read_time:
+            stars[user_id] += int(data["starsEarned"])
+    return stars, count
+
+
+def reconcile_tournament(db, tournament_id: str, workers: int = 8, partitions: int | None = None,
+                         apply: bool = False) -> ReconciliationResult | None:
+    """
+    Compare every participant's `totalStars` with the stars they actually earned.
+
+    The expected total is the sum of their answers' starsEarned, plus
+    starsAwarded of their approved challenge submissions, plus catchUpStars.
+    Answers are aggregated per participant by `workers` threads, each
+    streaming a range of answeredAt, so memory grows with participants and
+    never with answers.
+
+    Participants are read first and each is compared only with what was
+    committed before its snapshot. With `apply`, differences are corrected
+    with an increment in batches, each conditioned on the participant not
+    having changed since it was read. Returns None if the tournament
+    doesn't exist.
+    """
+    from google.cloud.firestore import SERVER_TIMESTAMP, Increment
+
+    tournament_ref = db.collection("tournaments").document(tournament_id)
+    if not tournament_ref.get().exists:
+        return None
+
+    # user_id -> (totalStars, catchUpStars, update_time)
+    participants_ref = tournament_ref.collection("participants")
+    participants = {}
+    read_times = {}
+    for doc in participants_ref.select(["totalStars", "catchUpStars"]).stream():
+        data = doc.to_dict()
+        participants[doc.id] = (int(data.get("totalStars", 0)), int(data.get("catchUpStars", 0)), doc.update_time)
+        read_times[doc.id] = doc.read_time
+
+    answer_stars = Counter()
+    answer_count = 0
+    if read_times:
+        until = max(read_times.values())
+        ranges = _answer_partitions(db, tournament_id, until, partitions or workers * 4)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for stars, count in pool.map(lambda bounds: _sum_answers(db, tournament_id, *bounds, read_times), ranges):
+                answer_stars.update(stars)
+                answer_count += count
+
+    challenge_stars = Counter()
+    submission_count = 0
+    submissions = db.collection_group("submissions").where("tournamentId", "==", tournament_id).where(
+        "status", "==", "approved"
+    ).select(["oderId", "starsAwarded", "reviewedAt"])
+    for doc in submissions.stream():
+        data = doc.to_dict()
+        user_id = data.get("oderId")
+        read_time = read_times.get(user_id)
+        reviewed_at = data.get("reviewedAt")
+        if read_time is not None and (reviewed_at is None or reviewed_at <= read_time):
+            submission_count += 1
+            challenge_stars[user_id] += int(data.get("starsAwarded") or 0)
+
+    diffs = []
+    for user_id, (recorded, catch_up, _) in participants.items():
+        expected = answer_stars[user_id] + challenge_stars[user_id] + catch_up
+        if expected != recorded:
+            diffs.append(StarDiff(user_id, recorded, expected, answer_stars[user_id], challenge_stars[user_id], catch_up))
+    diffs.sort(key=lambda diff: (-abs(diff.difference), diff.user_id))
+
+    corrected = 0
+    skipped = 0
+    if apply:
+        for start in range(0, len(diffs), BATCH_LIMIT):
+            done, failed = commit_if_unchanged(db, [
+                (participants_ref.document(diff.user_id), participants[diff.user_id][2], {
+                    "totalStars": Increment(diff.difference),
+                    "updatedAt": SERVER_TIMESTAMP
+                })
+                for diff in diffs[start:start + BATCH_LIMIT]
+            ])
+            corrected += done
+            skipped += failed
+
+    return ReconciliationResult(tournament_id, len(participants), answer_count, submission_count, diffs, corrected, skipped)
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from typing import List
 from pydantic import BaseModel
+import asyncio
 
 from src.auth.dependencies import CurrentUser
-from src.database import get_firestore_client
+from src.config import settings
+from src.database import get_firestore_client, get_document, count_query
+from src.pagination import decode_cursor, set_next_cursor
+from src.scores.leaderboard import get_tournament_leaderboard
+from src.scores.live import HEARTBEAT, format_event, leaderboard_hub
+from src.serialization import json_response
 
 router = APIRouter()
 
@@ -24,75 +31,184 @@ class LeaderboardResponse(BaseModel):
 
 
 @router.get("/leaderboard/{tournament_id}", response_model=LeaderboardResponse)
-async def get_leaderboard(tournament_id: str, current_user: CurrentUser, limit: int = 100):
-    """Get the leaderboard for a tournament."""
+async def get_leaderboard(
+    tournament_id: str,
+    current_user: CurrentUser,
+    limit: int = Query(100, ge=1, le=500),
+    start_after: str | None = None
+):
+    """
+    Get the leaderboard for a tournament.
+
+    Pages are chained through the `X-Next-Cursor` response header, passed
+    back as `start_after`.
+    """
     db = get_firestore_client()
 
-    # Check if tournament exists
-    tournament_doc = db.collection("tournaments").document(tournament_id).get()
-    if not tournament_doc.exists:
+    after = None
+    if start_after:
+        try:
+            stars, user_id = decode_cursor(start_after)
+            after = (int(stars), str(user_id))
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor invalido"
+            )
+
+    board = await get_tournament_leaderboard(db, tournament_id)
+    if board is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Torneo no encontrado"
         )
 
-    # Get participants ordered by stars
-    participants_ref = db.collection("tournaments").document(tournament_id).collection("participants")
-    query = participants_ref.order_by("totalStars", direction="DESCENDING").limit(limit)
+    page = board.page(limit, after)
+    payload = _leaderboard_payload(tournament_id, board, page, current_user.uid)
 
-    docs = list(query.stream())
+    response = json_response(payload)
+    if len(page) == limit and page[-1][0] < len(board):
+        set_next_cursor(response, [page[-1][3], page[-1][1]])
+    return response
 
+
+def _leaderboard_payload(tournament_id: str, board, page: list[tuple[int, str, str, int]], user_id: str) -> dict:
+    """A LeaderboardResponse as plain JSON data, without building a model per row."""
     rankings = []
     user_rank = None
     user_stars = None
-    rank = 1
-
-    for doc in docs:
-        data = doc.to_dict()
-        rankings.append(RankEntry(
-            rank=rank,
-            user_id=doc.id,
-            display_name=data.get("displayName", "Usuario"),
-            total_stars=data.get("totalStars", 0)
-        ))
-
-        if doc.id == current_user.uid:
-            user_rank = rank
-            user_stars = data.get("totalStars", 0)
 
-        rank += 1
+    for rank, entry_user_id, display_name, total_stars in page:
+        rankings.append({
+            "rank": rank,
+            "user_id": entry_user_id,
+            "display_name": display_name,
+            "total_stars": total_stars
+        })
+
+        if entry_user_id == user_id:
+            user_rank = rank
+            user_stars = total_stars
 
     # If user not in top rankings, find their rank
     if user_rank is None:
-        user_doc = participants_ref.document(current_user.uid).get()
-        if user_doc.exists:
-            user_data = user_doc.to_dict()
-            user_stars = user_data.get("totalStars", 0)
-
-            # Count how many have more stars
-            higher_count = participants_ref.where("totalStars", ">", user_stars).count().get()
-            user_rank = higher_count[0][0].value + 1 if higher_count else None
-
-    # Get total participant count
-    total_count = participants_ref.count().get()
-    total_participants = total_count[0][0].value if total_count else 0
-
-    return LeaderboardResponse(
-        tournament_id=tournament_id,
-        rankings=rankings,
-        user_rank=user_rank,
-        user_stars=user_stars,
-        total_participants=total_participants
+        user_position = board.rank_of(user_id)
+        if user_position is not None:
+            user_rank, user_stars = user_position
+
+    return {
+        "tournament_id": tournament_id,
+        "rankings": rankings,
+        "user_rank": user_rank,
+        "user_stars": user_stars,
+        "total_participants": len(board)
+    }
+
+
+@router.get("/leaderboard/{tournament_id}/stream")
+async def stream_leaderboard(
+    tournament_id: str,
+    current_user: CurrentUser,
+    limit: int = Query(100, ge=1, le=500)
+):
+    """
+    Stream live leaderboard updates as Server-Sent Events.
+
+    The stream opens with a `snapshot` event shaped like GET
+    /leaderboard/{tournament_id} for the top `limit` places. Then, at most
+    once every LEADERBOARD_STREAM_INTERVAL_SECONDS, changes that reach those
+    places (which shift the ranks of everyone below them) send a new
+    `snapshot`. Changes below them send an `update` event listing the
+    participants whose stars changed, with their current rank. A client that
+    falls too far behind also gets a new `snapshot`. Idle streams get a
+    comment line every LEADERBOARD_STREAM_HEARTBEAT_SECONDS.
+    """
+    db = get_firestore_client()
+
+    board = await get_tournament_leaderboard(db, tournament_id)
+    if board is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Torneo no encontrado"
+        )
+
+    if leaderboard_hub.client_count() >= settings.LEADERBOARD_STREAM_MAX_CLIENTS:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiadas conexiones al ranking en vivo. Intenta de nuevo."
+        )
+
+    return StreamingResponse(
+        _leaderboard_events(db, tournament_id, current_user.uid, limit),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
+async def _leaderboard_events(db, tournament_id: str, user_id: str, limit: int):
+    subscription = leaderboard_hub.subscribe(tournament_id, settings.LEADERBOARD_STREAM_MAX_PENDING)
+    try:
+        board = await get_tournament_leaderboard(db, tournament_id)
+        page = board.page(limit)
+        yield format_event("snapshot", _leaderboard_payload(tournament_id, board, page, user_id))
+
+        while True:
+            woken = await subscription.wait(settings.LEADERBOARD_STREAM_HEARTBEAT_SECONDS)
+
+            # Reloads a stale board once per process; its diff wakes every client
+            board = await get_tournament_leaderboard(db, tournament_id)
+            if board is None:
+                return
+
+            changed, resync = subscription.take()
+            if changed and not resync:
+                resync = _changes_top(board, changed, page, limit)
+            if resync:
+                page = board.page(limit)
+                yield format_event("snapshot", _leaderboard_payload(tournament_id, board, page, user_id))
+            elif changed:
+                yield format_event("update", _leaderboard_update(tournament_id, board, changed, user_id))
+            elif not woken:
+                yield HEARTBEAT
+
+            # Coalesce bursts of answers into one update per interval
+            await asyncio.sleep(settings.LEADERBOARD_STREAM_INTERVAL_SECONDS)
+    finally:
+        leaderboard_hub.unsubscribe(tournament_id, subscription)
+
+
+def _changes_top(board, changed: set[str], page: list, limit: int) -> bool:
+    """Whether changes touch the top `limit` places last sent in `page`, so other ranks there moved."""
+    if not changed.isdisjoint(entry[1] for entry in page):
+        return True
+    return any(rank <= limit for rank, *_ in board.entries(changed))
+
+
+def _leaderboard_update(tournament_id: str, board, changed: set[str], user_id: str) -> dict:
+    """Changed participants with their current rank, plus the viewer's own position."""
+    entries = board.entries(changed)
+    user_position = board.rank_of(user_id)
+
+    return {
+        "tournament_id": tournament_id,
+        "changes": [
+            {"rank": rank, "user_id": entry_user_id, "display_name": display_name, "total_stars": total_stars}
+            for rank, entry_user_id, display_name, total_stars in entries
+        ],
+        "removed": sorted(changed.difference(entry[1] for entry in entries)),
+        "user_rank": user_position[0] if user_position else None,
+        "user_stars": user_position[1] if user_position else None,
+        "total_participants": len(board)
+    }
+
+
 @router.get("/user-stats/{tournament_id}")
 async def get_user_stats(tournament_id: str, current_user: CurrentUser):
     """Get the current user's stats for a tournament."""
     db = get_firestore_client()
 
     participant_ref = db.collection("tournaments").document(tournament_id).collection("participants").document(current_user.uid)
-    participant_doc = participant_ref.get()
+    participant_doc = await get_document(participant_ref)
 
     if not participant_doc.exists:
         raise HTTPException(
@@ -101,11 +217,20 @@ async def get_user_stats(tournament_id: str, current_user: CurrentUser):
         )
 
     data = participant_doc.to_dict()
-
-    # Count answers for this tournament
-    answers_ref = db.collection("answers")
-    total_answers = answers_ref.where("oderId", "==", current_user.uid).where("tournamentId", "==", tournament_id).count().get()
-    correct_answers = answers_ref.where("oderId", "==", current_user.uid).where("tournamentId", "==", tournament_id).where("isCorrect", "==", True).count().get()
+    total_answers = data.get("totalAnswers")
+    correct_answers = data.get("correctAnswers")
+
+    # The counters only hold every answer once they start at the right total:
+    # set on join and by scripts/backfill_answer_stats.py. Until then, answers
+    # made since deploying have created partial counters, so count instead.
+    if not data.get("statsBackfilled"):
+        answers_query = db.collection("answers").where("oderId", "==", current_user.uid).where(
+            "tournamentId", "==", tournament_id
+        )
+        total_answers, correct_answers = await asyncio.gather(
+            count_query(answers_query),
+            count_query(answers_query.where("isCorrect", "==", True))
+        )
 
     return {
         "user_id": current_user.uid,
@@ -115,6 +240,6 @@ async def get_user_stats(tournament_id: str, current_user: CurrentUser):
         "joined_at": data.get("joinedAt"),
         "is_catch_up": data.get("isCatchUp", False),
         "catch_up_stars": data.get("catchUpStars", 0),
-        "total_answers": total_answers[0][0].value if total_answers else 0,
-        "correct_answers": correct_answers[0][0].value if correct_answers else 0
+        "total_answers": total_answers,
+        "correct_answers": correct_answers
     }
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import orjson
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+_datetime_adapter = TypeAdapter(datetime)
+
+
+def json_datetime(value: datetime) -> str:
+    """Format a datetime exactly as a pydantic model field would in JSON."""
+    offset = value.utcoffset()
+    if offset is not None and offset.seconds % 60:
+        # pydantic rounds sub-minute offsets; leave those rare cases to it
+        return _datetime_adapter.dump_python(value, mode="json")
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+def dumps(content) -> bytes:
+    """
+    Encode plain JSON data with orjson.
+
+    For dicts, lists, strings, ints, bools and None the output is byte for
+    byte what FastAPI's JSONResponse renders.
+    """
+    return orjson.dumps(content)
+
+
+def json_response(content, headers: dict | None = None) -> Response:
+    """
+    Build a JSON response from plain dicts, or from an already encoded body.
+
+    Returning it from an endpoint skips the `response_model` validation and
+    serialization, so callers must build payloads shaped like the model.
+    """
+    body = content if isinstance(content, bytes) else dumps(content)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,22 @@
+from src.cache import LRUCache
+from src.config import settings
+
+
+# tournament_id -> (encoded TournamentResponse, etag). Participant counts move on
+# every join, so entries only live for a few seconds.
+tournament_cache = LRUCache(
+    max_size=settings.TOURNAMENT_CACHE_MAX_SIZE,
+    ttl_seconds=settings.TOURNAMENT_CACHE_TTL_SECONDS
+)
+
+# (limit, start_after) -> (encoded page, next_cursor, etag)
+tournament_list_cache = LRUCache(
+    max_size=settings.TOURNAMENT_CACHE_MAX_SIZE,
+    ttl_seconds=settings.TOURNAMENT_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_tournament(tournament_id: str):
+    """Drop a tournament and every cached list page that may include it."""
+    tournament_cache.invalidate(tournament_id)
+    tournament_list_cache.clear()
@@ -1,12 +1,20 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Request, status
 from typing import List
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, timezone
 
 from src.auth.dependencies import CurrentUser, AdminUser
-from src.database import get_firestore_client
+from src.config import settings
+from src.database import get_firestore_client, get_document, stream_query, run_sync, ShardedCounter, get_counter_values
+from src.http_cache import body_etag, etag_matches, not_modified, set_cache_headers
+from src.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from src.serialization import dumps, json_datetime, json_response
+from src.tournaments.cache import invalidate_tournament, tournament_cache, tournament_list_cache
+from src.scores.catch_up import catch_up_stars
+from src.scores.leaderboard import record_participant
+from src.idempotency import IdempotentRoute
 
-router = APIRouter()
+router = APIRouter(route_class=IdempotentRoute)
 
 
 class TournamentResponse(BaseModel):
@@ -22,6 +30,52 @@ class TournamentResponse(BaseModel):
     catch_up_percentage: int
 
 
+# Firestore fields needed to build a TournamentResponse
+TOURNAMENT_FIELDS = [
+    "name",
+    "description",
+    "startDate",
+    "endDate",
+    "totalWeeks",
+    "status",
+    "participantCount",
+    "lateRegistrationAllowed",
+    "catchUpPercentage",
+]
+
+
+def participant_counter(tournament_ref) -> ShardedCounter:
+    """Sharded counter of a tournament's participants."""
+    return ShardedCounter(tournament_ref, "participantCount")
+
+
+async def get_participant_count(tournament_ref, data: dict) -> int:
+    """
+    Get a tournament's participant count.
+
+    The `participantCount` field on the tournament document is no longer
+    written; it is kept as the base for tournaments created before the
+    counter was sharded.
+    """
+    return data.get("participantCount", 0) + await participant_counter(tournament_ref).get_value()
+
+
+def _tournament_payload(tournament_id: str, data: dict, participant_count: int) -> dict:
+    """A TournamentResponse as plain JSON data, without building the model."""
+    return {
+        "id": tournament_id,
+        "name": data.get("name", ""),
+        "description": data.get("description", ""),
+        "start_date": json_datetime(data.get("startDate") or datetime.now()),
+        "end_date": json_datetime(data.get("endDate") or datetime.now()),
+        "total_weeks": int(data.get("totalWeeks", 15)),
+        "status": data.get("status", "upcoming"),
+        "participant_count": int(participant_count),
+        "late_registration_allowed": data.get("lateRegistrationAllowed", True),
+        "catch_up_percentage": int(data.get("catchUpPercentage", 70))
+    }
+
+
 class CreateTournamentRequest(BaseModel):
     name: str
     description: str
@@ -32,56 +86,106 @@ class CreateTournamentRequest(BaseModel):
 
 
 @router.get("/", response_model=List[TournamentResponse])
-async def list_tournaments(current_user: CurrentUser):
-    """List all tournaments."""
+async def list_tournaments(
+    current_user: CurrentUser,
+    request: Request,
+    limit: int = Query(50, ge=1, le=100),
+    start_after: str | None = None
+):
+    """
+    List tournaments, newest first.
+
+    Pages are chained through the `X-Next-Cursor` response header, passed
+    back as `start_after`. Pages are cached for a few seconds and support
+    conditional requests through their ETag.
+    """
+    max_age = settings.HTTP_CACHE_MAX_AGE_SECONDS
+
+    cached = tournament_list_cache.get((limit, start_after))
+    if cached is None:
+        cached = await _load_tournament_page(limit, start_after)
+        tournament_list_cache.put((limit, start_after), cached)
+
+    body, next_cursor, etag = cached
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    if etag_matches(request, etag):
+        return not_modified(etag, max_age, headers)
+
+    response = json_response(body, headers)
+    set_cache_headers(response, etag, max_age)
+    return response
+
+
+async def _load_tournament_page(limit: int, start_after: str | None) -> tuple[bytes, str | None, str]:
+    """Query a page of tournaments and encode it once for the page cache."""
     db = get_firestore_client()
     tournaments_ref = db.collection("tournaments")
-    docs = tournaments_ref.order_by("startDate", direction="DESCENDING").stream()
-
-    tournaments = []
-    for doc in docs:
-        data = doc.to_dict()
-        tournaments.append(TournamentResponse(
-            id=doc.id,
-            name=data.get("name", ""),
-            description=data.get("description", ""),
-            start_date=data.get("startDate").datetime if data.get("startDate") else datetime.now(),
-            end_date=data.get("endDate").datetime if data.get("endDate") else datetime.now(),
-            total_weeks=data.get("totalWeeks", 15),
-            status=data.get("status", "upcoming"),
-            participant_count=data.get("participantCount", 0),
-            late_registration_allowed=data.get("lateRegistrationAllowed", True),
-            catch_up_percentage=data.get("catchUpPercentage", 70)
-        ))
-
-    return tournaments
+    query = tournaments_ref.select(TOURNAMENT_FIELDS).order_by(
+        "startDate", direction="DESCENDING"
+    ).order_by("__name__", direction="DESCENDING")
+
+    if start_after:
+        try:
+            start_date, doc_id = decode_cursor(start_after)
+            query = query.start_after({
+                "startDate": datetime.fromisoformat(start_date),
+                "__name__": str(doc_id)
+            })
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor invalido"
+            )
+
+    docs = await stream_query(query.limit(limit))
+    # The counter shards of the whole page are fetched in one round trip
+    shard_counts = await get_counter_values([participant_counter(doc.reference) for doc in docs])
+
+    body = dumps([
+        _tournament_payload(doc.id, doc.to_dict(), doc.to_dict().get("participantCount", 0) + shard_count)
+        for doc, shard_count in zip(docs, shard_counts)
+    ])
+
+    next_cursor = None
+    if len(docs) == limit:
+        last = docs[-1]
+        next_cursor = encode_cursor([last.get("startDate").isoformat(), last.id])
+
+    return body, next_cursor, body_etag(body)
 
 
 @router.get("/{tournament_id}", response_model=TournamentResponse)
-async def get_tournament(tournament_id: str, current_user: CurrentUser):
-    """Get a specific tournament."""
-    db = get_firestore_client()
-    doc = db.collection("tournaments").document(tournament_id).get()
+async def get_tournament(tournament_id: str, current_user: CurrentUser, request: Request):
+    """
+    Get a specific tournament.
 
-    if not doc.exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Torneo no encontrado"
-        )
+    Cached for a few seconds; supports conditional requests through its ETag.
+    """
+    max_age = settings.HTTP_CACHE_MAX_AGE_SECONDS
 
-    data = doc.to_dict()
-    return TournamentResponse(
-        id=doc.id,
-        name=data.get("name", ""),
-        description=data.get("description", ""),
-        start_date=data.get("startDate").datetime if data.get("startDate") else datetime.now(),
-        end_date=data.get("endDate").datetime if data.get("endDate") else datetime.now(),
-        total_weeks=data.get("totalWeeks", 15),
-        status=data.get("status", "upcoming"),
-        participant_count=data.get("participantCount", 0),
-        late_registration_allowed=data.get("lateRegistrationAllowed", True),
-        catch_up_percentage=data.get("catchUpPercentage", 70)
-    )
+    cached = tournament_cache.get(tournament_id)
+    if cached is None:
+        db = get_firestore_client()
+        doc = await run_sync(db.collection("tournaments").document(tournament_id).get, TOURNAMENT_FIELDS)
+
+        if not doc.exists:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Torneo no encontrado"
+            )
+
+        data = doc.to_dict()
+        body = dumps(_tournament_payload(doc.id, data, await get_participant_count(doc.reference, data)))
+        cached = (body, body_etag(body))
+        tournament_cache.put(tournament_id, cached)
+
+    body, etag = cached
+    if etag_matches(request, etag):
+        return not_modified(etag, max_age)
+
+    response = json_response(body)
+    set_cache_headers(response, etag, max_age)
+    return response
 
 
 @router.post("/", response_model=TournamentResponse)
@@ -112,7 +216,8 @@ async def create_tournament(
         "updatedAt": SERVER_TIMESTAMP
     }
 
-    doc_ref = db.collection("tournaments").add(tournament_data)
+    doc_ref = await run_sync(db.collection("tournaments").add, tournament_data)
+    tournament_list_cache.clear()
 
     return TournamentResponse(
         id=doc_ref[1].id,
@@ -131,12 +236,13 @@ async def create_tournament(
 @router.post("/{tournament_id}/join")
 async def join_tournament(tournament_id: str, current_user: CurrentUser):
     """Join a tournament as a participant."""
+    from google.api_core.exceptions import AlreadyExists
     from google.cloud.firestore import SERVER_TIMESTAMP
 
     db = get_firestore_client()
 
     # Check if tournament exists
-    tournament_doc = db.collection("tournaments").document(tournament_id).get()
+    tournament_doc = await get_document(db.collection("tournaments").document(tournament_id))
     if not tournament_doc.exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -152,31 +258,44 @@ async def join_tournament(tournament_id: str, current_user: CurrentUser):
             detail="Este torneo ya ha finalizado"
         )
 
-    # Check if already a participant
     participant_ref = db.collection("tournaments").document(tournament_id).collection("participants").document(current_user.uid)
-    if participant_ref.get().exists:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Ya estas inscrito en este torneo"
-        )
+
+    # Late joiners start with the catch-up stars of the weeks they missed
+    is_catch_up = tournament_data.get("status") == "active"
+    initial_stars = catch_up_stars(tournament_data, datetime.now(timezone.utc)) if is_catch_up else 0
 
     # Add participant
     participant_data = {
         "oderId": current_user.uid,
         "displayName": current_user.display_name or current_user.email.split("@")[0],
         "joinedAt": SERVER_TIMESTAMP,
-        "totalStars": 0,
+        "totalStars": initial_stars,
+        "totalAnswers": 0,
+        "correctAnswers": 0,
+        "statsBackfilled": True,
         "weeklyStars": {},
         "rank": 0,
-        "isCatchUp": tournament_data.get("status") == "active",
-        "catchUpStars": 0
+        "isCatchUp": is_catch_up,
+        "catchUpStars": initial_stars,
+        "updatedAt": SERVER_TIMESTAMP
     }
 
-    participant_ref.set(participant_data)
+    # Create the participant (failing if already joined) and count it in one commit
+    counter = participant_counter(tournament_doc.reference)
+    batch = db.batch()
+    batch.create(participant_ref, participant_data)
+    counter.increment(batch)
+
+    try:
+        await run_sync(batch.commit)
+    except AlreadyExists:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ya estas inscrito en este torneo"
+        )
 
-    # Update participant count
-    tournament_doc.reference.update({
-        "participantCount": tournament_data.get("participantCount", 0) + 1
-    })
+    record_participant(tournament_id, current_user.uid, participant_data["displayName"], initial_stars)
+    counter.invalidate()
+    invalidate_tournament(tournament_id)
 
     return {"success": True, "message": "Te has inscrito exitosamente"}
@@ -0,0 +1,79 @@
+import os
+import re
+
+# The in-memory Firebase stand-in, selected before the app reads its settings
+os.environ["FIREBASE_BACKEND"] = "memory"
+os.environ["ENVIRONMENT"] = "test"
+os.environ["METRICS_ENABLED"] = "true"
+os.environ["REQUEST_LOG_ENABLED"] = "false"
+os.environ["PROFILING_ENABLED"] = "false"
+os.environ["COMPRESSION_ENABLED"] = "false"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import database
+from src.auth.token_cache import token_cache
+from src.config import settings
+from src.idempotency import _local_records
+from src.inmemory.seed import seed_tournament
+from src.main import app
+from src.questions.bundle import week_questions_cache
+from src.questions.cache import question_cache
+from src.questions import invalidation
+from src.questions.daily import daily_questions_cache
+from src.questions.router import _question_bodies
+from src.scores.leaderboard import _leaderboards
+from src.tournaments.cache import tournament_cache, tournament_list_cache
+
+API = settings.API_PREFIX
+
+
+@pytest.fixture(autouse=True)
+def firebase():
+    """A fresh in-memory Firestore and Auth, and empty caches, for every test."""
+    database._firestore_client = None
+    database._memory_auth = None
+    for cache in (
+        token_cache, _local_records, question_cache, daily_questions_cache, week_questions_cache,
+        _question_bodies, tournament_cache, tournament_list_cache, database._counter_cache
+    ):
+        cache.clear()
+    _leaderboards.clear()
+    invalidation._seen_version = None
+    yield
+
+
+@pytest.fixture
+def db():
+    return database.get_firestore_client()
+
+
+@pytest.fixture
+def auth():
+    return database.get_auth()
+
+
+@pytest.fixture
+def client():
+    # Without the lifespan: no background tasks
+    return TestClient(app)
+
+
+@pytest.fixture
+def seeded(db, auth):
+    return seed_tournament(db, auth, "torneo-test", players=20, pending_submissions=5)
+
+
+def auth_headers(auth, uid: str, **headers) -> dict:
+    return {"Authorization": f"Bearer {auth.issue_id_token(uid)}", **headers}
+
+
+def firestore_ops(response) -> dict:
+    """Firestore reads, writes and round trips of a request, from its Server-Timing header."""
+    header = response.headers["Server-Timing"]
+    return {
+        "reads": int(re.search(r'fs-reads;desc="(\d+)"', header).group(1)),
+        "writes": int(re.search(r'fs-writes;desc="(\d+)"', header).group(1)),
+        "round_trips": int(re.search(r'desc="(\d+) round trips"', header).group(1)),
+    }
@@ -0,0 +1,133 @@
+import asyncio
+
+import httpx
+
+from src.main import app
+from tests.conftest import API, auth_headers
+
+
+def _pending_submission(db, seeded):
+    doc = next(db.collection_group("submissions").where("status", "==", "pending").stream())
+    return doc.reference.parent.parent.id, doc.id, doc.to_dict()["oderId"]
+
+
+def _stars(db, seeded, user_id: str) -> int:
+    return db.collection("tournaments").document(seeded.tournament_id).collection("participants").document(user_id).get().to_dict()["totalStars"]
+
+
+def _pending_count(db, challenge_id: str) -> int:
+    return db.collection("challenges").document(challenge_id).get().to_dict()["pendingCount"]
+
+
+async def _review_concurrently(auth, reviewers: list[str], body: dict) -> list[httpx.Response]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*[
+            client.post(f"{API}/challenges/review", json=body, headers=auth_headers(auth, reviewer))
+            for reviewer in reviewers
+        ])
+
+
+def test_two_moderators_approving_at_once_credit_stars_once(db, auth, seeded):
+    challenge_id, submission_id, user_id = _pending_submission(db, seeded)
+    stars, pending = _stars(db, seeded, user_id), _pending_count(db, challenge_id)
+    body = {"challenge_id": challenge_id, "submission_id": submission_id, "approved": True}
+
+    responses = asyncio.run(_review_concurrently(auth, [seeded.moderator_id, seeded.admin_id], body))
+
+    assert 200 in [response.status_code for response in responses]
+    assert {response.status_code for response in responses} <= {200, 409}
+    assert _stars(db, seeded, user_id) == stars + 5
+    assert _pending_count(db, challenge_id) == pending - 1
+
+
+def test_reviewing_a_reviewed_submission_again_credits_nothing(client, db, auth, seeded):
+    challenge_id, submission_id, user_id = _pending_submission(db, seeded)
+    stars, pending = _stars(db, seeded, user_id), _pending_count(db, challenge_id)
+    headers = auth_headers(auth, seeded.moderator_id)
+
+    for approved in (True, True, False, True):
+        response = client.post(f"{API}/challenges/review", headers=headers, json={
+            "challenge_id": challenge_id, "submission_id": submission_id, "approved": approved
+        })
+        assert response.status_code == 200
+
+    assert _stars(db, seeded, user_id) == stars + 5
+    assert _pending_count(db, challenge_id) == pending - 1
+
+
+def test_pending_summary_follows_submissions_and_reviews(client, db, auth, seeded):
+    challenge_id, _, _ = _pending_submission(db, seeded)
+    moderator = auth_headers(auth, seeded.moderator_id)
+
+    def summary() -> dict:
+        response = client.get(f"{API}/challenges/pending/summary", headers=moderator)
+        assert response.status_code == 200
+        return {entry["challenge_id"]: entry["pending_count"] for entry in response.json()}
+
+    pending = summary()[challenge_id]
+    auth.create_user("jugador-nuevo", email="nuevo@example.com")
+    created = client.post(
+        f"{API}/challenges/{challenge_id}/submissions",
+        headers=auth_headers(auth, "jugador-nuevo"),
+        json={"video_url": "https://example.com/video.mp4"}
+    )
+    assert created.status_code == 200
+    assert summary()[challenge_id] == pending + 1
+
+    client.post(f"{API}/challenges/review", headers=moderator, json={
+        "challenge_id": challenge_id, "submission_id": created.json()["submission_id"], "approved": False
+    })
+    assert summary()[challenge_id] == pending
+
+
+def _submit(client, auth, challenge_id: str, user_id: str = "jugador-nuevo"):
+    return client.post(
+        f"{API}/challenges/{challenge_id}/submissions",
+        headers=auth_headers(auth, user_id),
+        json={"video_url": "https://example.com/video.mp4"}
+    )
+
+
+def test_submitting_to_an_unknown_challenge_is_not_found(client, db, auth, seeded):
+    auth.create_user("jugador-nuevo", email="nuevo@example.com")
+
+    response = _submit(client, auth, "no-existe")
+
+    assert response.status_code == 404
+    assert not db.collection("challenges").document("no-existe").get().exists
+
+
+def test_first_submission_to_a_daily_challenge_creates_the_challenge(client, db, auth, seeded):
+    auth.create_user("jugador-nuevo", email="nuevo@example.com")
+    db.collection("dailyContent").document("dia-1").set({
+        "tournamentId": seeded.tournament_id, "weekNumber": 1, "dayNumber": 1
+    })
+
+    assert _submit(client, auth, "dia-1").status_code == 200
+
+    challenge = db.collection("challenges").document("dia-1").get().to_dict()
+    assert (challenge["tournamentId"], challenge["weekNumber"], challenge["pendingCount"]) == (seeded.tournament_id, 1, 1)
+
+
+def test_second_pending_submission_for_a_challenge_is_rejected(client, db, auth, seeded):
+    auth.create_user("jugador-nuevo", email="nuevo@example.com")
+    challenge_id = seeded.challenge_ids[0]
+    pending = _pending_count(db, challenge_id)
+
+    assert _submit(client, auth, challenge_id).status_code == 200
+    assert _submit(client, auth, challenge_id).status_code == 400
+    assert _pending_count(db, challenge_id) == pending + 1
+
+
+def test_reviewing_an_uncounted_submission_keeps_the_count_at_zero(client, db, auth, seeded):
+    challenge_id, submission_id, _ = _pending_submission(db, seeded)
+    # Pending since before pendingCount was kept
+    db.collection("challenges").document(challenge_id).update({"pendingCount": 0})
+
+    response = client.post(f"{API}/challenges/review", headers=auth_headers(auth, seeded.moderator_id), json={
+        "challenge_id": challenge_id, "submission_id": submission_id, "approved": False
+    })
+
+    assert response.status_code == 200
+    assert _pending_count(db, challenge_id) == 0
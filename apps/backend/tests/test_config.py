@@ -0,0 +1,16 @@
+from src.config import BACKEND_DIR, Settings
+
+
+def test_relative_credentials_path_is_taken_from_the_backend_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    settings = Settings(FIREBASE_CREDENTIALS_PATH="./firebase-credentials.json")
+
+    assert settings.firebase_credentials_path == str(BACKEND_DIR / "firebase-credentials.json")
+
+
+def test_absolute_credentials_path_is_kept(tmp_path):
+    cred_path = tmp_path / "credenciales.json"
+
+    assert Settings(FIREBASE_CREDENTIALS_PATH=str(cred_path)).firebase_credentials_path == str(cred_path)
+
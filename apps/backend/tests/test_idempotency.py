@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from src import idempotency
+from src.main import app
+from src.metrics import registry
+from tests.conftest import API, auth_headers
+
+BODY = json.dumps({"name": "Temporada", "description": "Torneo de prueba", "start_date": "2026-01-05T00:00:00Z"}).encode()
+
+
+class _NoFlight:
+    """Runs every call, like separate workers that share nothing but Firestore."""
+
+    async def do(self, key, func):
+        return await func()
+
+
+async def _post_concurrently(headers: dict, count: int) -> list[httpx.Response]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*[
+            client.post(f"{API}/tournaments/", content=BODY, headers={"Content-Type": "application/json", **headers}) for _ in range(count)
+        ])
+
+
+@pytest.mark.parametrize("separate_workers", [False, True])
+def test_concurrent_requests_with_the_same_key_create_one_tournament(db, auth, seeded, monkeypatch, separate_workers):
+    if separate_workers:
+        monkeypatch.setattr(idempotency, "_idempotency_flight", _NoFlight())
+    headers = auth_headers(auth, seeded.admin_id, **{"Idempotency-Key": "crear-temporada"})
+
+    first, second = asyncio.run(_post_concurrently(headers, 2))
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert sorted(response.headers.get("Idempotent-Replayed", "false") for response in (first, second)) == ["false", "true"]
+    created = [doc for doc in db.collection("tournaments").stream() if doc.id != seeded.tournament_id]
+    assert len(created) == 1
+
+
+def _hold_key(seeded, key: str, request_hash: str):
+    """Reserve a key as another worker still running the request would."""
+    record_id = idempotency._record_id(seeded.admin_id, "POST", f"{API}/tournaments/", key)
+    assert asyncio.run(idempotency._reserve(record_id, seeded.admin_id, f"{API}/tournaments/", request_hash)) is None
+
+
+def test_retry_while_the_first_request_is_still_running_gets_409(db, auth, seeded, monkeypatch):
+    monkeypatch.setattr(idempotency.settings, "IDEMPOTENCY_PENDING_WAIT_SECONDS", 0.0)
+    _hold_key(seeded, "en-curso", hashlib.sha256(BODY).hexdigest())
+
+    [response] = asyncio.run(_post_concurrently(auth_headers(auth, seeded.admin_id, **{"Idempotency-Key": "en-curso"}), 1))
+
+    assert response.status_code == 409
+    assert [doc.id for doc in db.collection("tournaments").stream()] == [seeded.tournament_id]
+
+
+def test_key_held_by_another_request_body_gets_422(db, auth, seeded):
+    _hold_key(seeded, "otra-solicitud", "otro-hash")
+
+    [response] = asyncio.run(_post_concurrently(auth_headers(auth, seeded.admin_id, **{"Idempotency-Key": "otra-solicitud"}), 1))
+
+    assert response.status_code == 422
+    assert [doc.id for doc in db.collection("tournaments").stream()] == [seeded.tournament_id]
+
+
+def test_failed_request_releases_the_key(db, auth, seeded, monkeypatch):
+    headers = auth_headers(auth, seeded.admin_id, **{"Idempotency-Key": "reintentar"})
+    collection = type(db.collection("tournaments"))
+
+    def unavailable(self, *args, **kwargs):
+        raise RuntimeError("Firestore no disponible")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(collection, "add", unavailable)
+        with pytest.raises(RuntimeError):
+            asyncio.run(_post_concurrently(headers, 1))
+
+    [response] = asyncio.run(_post_concurrently(headers, 1))
+    assert response.status_code == 200
+    assert "Idempotent-Replayed" not in response.headers
+
+
+def test_only_one_worker_purges_expired_keys(db, monkeypatch):
+    db.collection("idempotencyKeys").document("vencida").set({"expiresAt": datetime.now(timezone.utc) - timedelta(seconds=1)})
+    purges = []
+    purge = idempotency._purge_expired_keys
+
+    def counted_purge(db):
+        purges.append(db)
+        return purge(db)
+
+    monkeypatch.setattr(idempotency, "_purge_expired_keys", counted_purge)
+
+    async def run_workers():
+        workers = [asyncio.create_task(idempotency.purge_expired_keys_forever()) for _ in range(3)]
+        await asyncio.sleep(0.2)
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    asyncio.run(run_workers())
+
+    assert len(purges) == 1
+    assert not db.collection("idempotencyKeys").document("vencida").get().exists
+    assert "idempotency_keys_purged_total 1" in registry.render()
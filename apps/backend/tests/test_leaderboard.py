@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+from google.cloud.firestore import SERVER_TIMESTAMP
+
+from src.config import settings
+from src.scores.leaderboard import get_tournament_leaderboard, record_stars
+from src.scores.router import _leaderboard_events
+from tests.conftest import API, auth_headers, firestore_ops
+
+
+def test_warm_leaderboard_makes_no_reads(client, auth, seeded):
+    headers = auth_headers(auth, seeded.player_ids[0])
+
+    cold = client.get(f"{API}/scores/leaderboard/{seeded.tournament_id}", headers=headers)
+    warm = client.get(f"{API}/scores/leaderboard/{seeded.tournament_id}", headers=headers)
+
+    assert cold.status_code == warm.status_code == 200
+    assert firestore_ops(cold)["reads"] > len(seeded.player_ids)
+    assert firestore_ops(warm)["round_trips"] == 0
+    assert warm.json()["rankings"] == cold.json()["rankings"]
+
+
+def test_stale_leaderboard_reads_only_changed_participants(client, db, auth, seeded, monkeypatch):
+    headers = auth_headers(auth, seeded.player_ids[0])
+    client.get(f"{API}/scores/leaderboard/{seeded.tournament_id}", headers=headers)
+
+    # Another worker credits a participant directly in Firestore
+    user_id = seeded.player_ids[-1]
+    db.collection("tournaments").document(seeded.tournament_id).collection("participants").document(user_id).update(
+        {"totalStars": 1000, "updatedAt": SERVER_TIMESTAMP}
+    )
+    monkeypatch.setattr(settings, "LEADERBOARD_REFRESH_SECONDS", -1)
+
+    synced = client.get(f"{API}/scores/leaderboard/{seeded.tournament_id}", headers=headers)
+
+    assert synced.status_code == 200
+    assert firestore_ops(synced)["round_trips"] == 1
+    assert firestore_ops(synced)["reads"] < len(seeded.player_ids)
+    leader = synced.json()["rankings"][0]
+    assert (leader["user_id"], leader["total_stars"]) == (user_id, 1000)
+
+
+def _stream_events(db, seeded, limit: int, credits: list[tuple[str, int]]) -> list[tuple[str, dict]]:
+    """The events a stream of the top `limit` sends after its snapshot, one per credit."""
+
+    async def collect():
+        events = _leaderboard_events(db, seeded.tournament_id, seeded.player_ids[0], limit)
+        received = [await anext(events)]
+        for user_id, delta in credits:
+            record_stars(seeded.tournament_id, user_id, delta)
+            received.append(await anext(events))
+        await events.aclose()
+        return received
+
+    return [
+        (event.split(b"\n")[0].removeprefix(b"event: ").decode(), json.loads(event.split(b"\n")[1].removeprefix(b"data: ")))
+        for event in asyncio.run(collect())
+    ][1:]
+
+
+def test_stream_sends_a_snapshot_when_a_change_reaches_the_top(db, seeded, monkeypatch):
+    monkeypatch.setattr(settings, "LEADERBOARD_STREAM_INTERVAL_SECONDS", 0)
+    board = asyncio.run(get_tournament_leaderboard(db, seeded.tournament_id))
+    last = board.page(len(board))[-1][1]
+
+    [(event, payload)] = _stream_events(db, seeded, 5, [(last, 1000)])
+
+    # Everyone the leader passed moved down one place
+    assert event == "snapshot"
+    assert [entry["user_id"] for entry in payload["rankings"]] == [entry[1] for entry in board.page(5)]
+    assert payload["rankings"][0]["user_id"] == last
+
+
+def test_stream_sends_an_update_for_changes_below_the_top(db, seeded, monkeypatch):
+    monkeypatch.setattr(settings, "LEADERBOARD_STREAM_INTERVAL_SECONDS", 0)
+    board = asyncio.run(get_tournament_leaderboard(db, seeded.tournament_id))
+    last = board.page(len(board))[-1][1]
+
+    [(event, payload)] = _stream_events(db, seeded, 5, [(last, 1)])
+
+    assert event == "update"
+    assert [change["user_id"] for change in payload["changes"]] == [last]
+    assert payload["changes"][0]["rank"] > 5
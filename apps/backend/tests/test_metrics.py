@@ -0,0 +1,19 @@
+from src.config import settings
+
+
+def test_metrics_are_hidden_outside_development_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_require_the_configured_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "secreto")
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer otro"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer secreto"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
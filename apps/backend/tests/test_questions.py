@@ -0,0 +1,186 @@
+import asyncio
+
+import httpx
+
+from src.main import app
+from src.questions.invalidation import bump_questions_version, check_questions_version
+from tests.conftest import API, auth_headers, firestore_ops
+
+
+def test_warm_daily_questions_are_served_from_cache(client, auth, seeded):
+    headers = auth_headers(auth, seeded.player_ids[0])
+
+    cold = client.get(f"{API}/questions/daily/{seeded.tournament_id}", headers=headers)
+    warm = client.get(f"{API}/questions/daily/{seeded.tournament_id}", headers=headers)
+
+    assert cold.status_code == warm.status_code == 200
+    assert len(warm.json()) == len(seeded.today_question_ids)
+    assert warm.content == cold.content
+    assert firestore_ops(cold)["reads"] > 0
+    assert firestore_ops(warm) == {"reads": 0, "writes": 0, "round_trips": 0}
+
+
+def test_warm_week_bundle_is_served_from_cache(client, auth, seeded):
+    headers = auth_headers(auth, seeded.player_ids[0])
+
+    cold = client.get(f"{API}/questions/bundle/{seeded.tournament_id}/1", headers=headers)
+    warm = client.get(f"{API}/questions/bundle/{seeded.tournament_id}/1", headers=headers)
+
+    assert cold.status_code == warm.status_code == 200
+    assert len(warm.json()["questions"]) == len(seeded.today_question_ids) * 7
+    assert firestore_ops(cold)["reads"] > 0
+    assert firestore_ops(warm) == {"reads": 0, "writes": 0, "round_trips": 0}
+
+
+def test_revalidated_daily_questions_make_no_reads(client, auth, seeded):
+    headers = auth_headers(auth, seeded.player_ids[0])
+    etag = client.get(f"{API}/questions/daily/{seeded.tournament_id}", headers=headers).headers["ETag"]
+
+    response = client.get(f"{API}/questions/daily/{seeded.tournament_id}", headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert firestore_ops(response)["round_trips"] == 0
+
+
+def test_batch_answers_report_already_answered_questions(client, db, auth, seeded):
+    user_id = seeded.player_ids[0]
+    headers = auth_headers(auth, user_id)
+    first, second = seeded.today_question_ids[:2]
+    participant_ref = db.collection("tournaments").document(seeded.tournament_id).collection("participants").document(user_id)
+
+    assert client.post(f"{API}/questions/answer", headers=headers, json={"question_id": first, "selected_answer": "A"}).status_code == 200
+    answers = participant_ref.get().to_dict()["totalAnswers"]
+
+    response = client.post(f"{API}/questions/answers:batch", headers=headers, json={"answers": [
+        {"question_id": first, "selected_answer": "B"},
+        {"question_id": second, "selected_answer": "A"}
+    ]})
+
+    assert response.status_code == 200
+    results = {result["question_id"]: result for result in response.json()}
+    assert results[first]["error"] == "Ya respondiste esta pregunta"
+    assert results[second]["error"] is None and results[second]["is_correct"] is not None
+    assert participant_ref.get().to_dict()["totalAnswers"] == answers + 1
+
+
+def test_malformed_csv_import_is_a_bad_request(client, auth, seeded):
+    body = "Semana,Dia,Numero,Pregunta\n1,1,1,\"" + "x" * 200_000 + "\"\n"
+
+    response = client.post(
+        f"{API}/questions/import/{seeded.tournament_id}",
+        headers=auth_headers(auth, seeded.admin_id, **{"Content-Type": "text/csv"}),
+        content=body.encode()
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("No se pudo leer el archivo: CSV invalido")
+
+
+def _answer(client, auth, user_id, question_id, selected_answer):
+    return client.post(
+        f"{API}/questions/answer",
+        headers=auth_headers(auth, user_id),
+        json={"question_id": question_id, "selected_answer": selected_answer}
+    )
+
+
+def test_question_edit_on_another_worker_reaches_cached_questions(client, db, auth, seeded):
+    first, second = seeded.player_ids[:2]
+    question_id = seeded.today_question_ids[0]
+    question_ref = db.collection("questions").document(question_id)
+    old_answer = question_ref.get().to_dict()["correctAnswer"]
+    new_answer = next(option for option in "ABCD" if option != old_answer)
+
+    asyncio.run(check_questions_version(db))
+    assert _answer(client, auth, first, question_id, old_answer).json()["is_correct"] is True
+
+    # Another worker edits the question: only Firestore and the version change here
+    question_ref.update({"correctAnswer": new_answer})
+    bump_questions_version(db)
+
+    assert asyncio.run(check_questions_version(db)) is True
+    response = _answer(client, auth, second, question_id, new_answer)
+    assert response.json()["is_correct"] is True
+    assert response.json()["correct_answer"] == new_answer
+
+
+def test_question_update_bumps_the_questions_version(client, db, auth, seeded):
+    question_id = seeded.today_question_ids[0]
+    asyncio.run(check_questions_version(db))
+
+    response = client.put(
+        f"{API}/questions/{question_id}",
+        headers=auth_headers(auth, seeded.admin_id),
+        json={"stars": 3}
+    )
+
+    assert response.status_code == 200
+    assert asyncio.run(check_questions_version(db)) is True
+
+
+def test_question_edit_on_another_worker_reaches_cached_daily_questions(client, db, auth, seeded):
+    headers = auth_headers(auth, seeded.player_ids[0])
+    question_id = seeded.today_question_ids[0]
+    asyncio.run(check_questions_version(db))
+    client.get(f"{API}/questions/daily/{seeded.tournament_id}", headers=headers)
+
+    db.collection("questions").document(question_id).update({"questionText": "Texto corregido"})
+    bump_questions_version(db)
+    asyncio.run(check_questions_version(db))
+
+    questions = client.get(f"{API}/questions/daily/{seeded.tournament_id}", headers=headers).json()
+    assert next(q for q in questions if q["id"] == question_id)["question_text"] == "Texto corregido"
+
+
+def test_question_edit_on_another_worker_reaches_cached_week_bundle(client, db, auth, seeded):
+    headers = auth_headers(auth, seeded.player_ids[0])
+    question_id = seeded.today_question_ids[0]
+    asyncio.run(check_questions_version(db))
+    client.get(f"{API}/questions/bundle/{seeded.tournament_id}/1", headers=headers)
+
+    db.collection("questions").document(question_id).update({"questionText": "Texto corregido"})
+    bump_questions_version(db)
+    asyncio.run(check_questions_version(db))
+
+    bundle = client.get(f"{API}/questions/bundle/{seeded.tournament_id}/1", headers=headers).json()
+    assert next(q for q in bundle["questions"] if q["id"] == question_id)["question_text"] == "Texto corregido"
+
+
+def test_concurrent_answers_are_all_credited_once(db, auth, seeded):
+    user_id = seeded.player_ids[0]
+    headers = auth_headers(auth, user_id)
+    participant_ref = db.collection("tournaments").document(seeded.tournament_id).collection("participants").document(user_id)
+    before = participant_ref.get().to_dict()
+
+    question_ids = [f"{seeded.tournament_id}-q{number:04d}" for number in range(1, 21)]
+    correct_answers = {
+        question_id: db.collection("questions").document(question_id).get().to_dict()["correctAnswer"]
+        for question_id in question_ids
+    }
+    # Every other answer is wrong
+    selected = {
+        question_id: correct if index % 2 == 0 else next(option for option in "ABCD" if option != correct)
+        for index, (question_id, correct) in enumerate(correct_answers.items())
+    }
+    duplicate = question_ids[0]
+
+    async def answer_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            answers = [(question_id, answer) for question_id, answer in selected.items()]
+            answers.append((duplicate, selected[duplicate]))
+            return await asyncio.gather(*(
+                client.post(f"{API}/questions/answer", headers=headers, json={"question_id": question_id, "selected_answer": answer})
+                for question_id, answer in answers
+            ))
+
+    responses = asyncio.run(answer_all())
+
+    rejected = [response for response in responses if response.status_code == 400]
+    assert sum(response.status_code == 200 for response in responses) == len(question_ids)
+    assert [response.json()["detail"] for response in rejected] == ["Ya respondiste esta pregunta"]
+
+    after = participant_ref.get().to_dict()
+    assert after["totalAnswers"] == before["totalAnswers"] + len(question_ids)
+    assert after["correctAnswers"] == before["correctAnswers"] + len(question_ids) // 2
+    assert after["totalStars"] == before["totalStars"] + len(question_ids) // 2
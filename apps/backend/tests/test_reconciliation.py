@@ -0,0 +1,24 @@
+from src.inmemory.seed import seed_tournament
+from src.scores.reconciliation import reconcile_tournament
+from tests.conftest import API, auth_headers
+
+
+def _approve_first_pending(client, db, auth, seeded):
+    challenge_ref = db.collection("challenges").document(seeded.challenge_ids[0])
+    submission = next(challenge_ref.collection("submissions").where("status", "==", "pending").stream())
+    response = client.post(f"{API}/challenges/review", headers=auth_headers(auth, seeded.moderator_id), json={
+        "challenge_id": challenge_ref.id, "submission_id": submission.id, "approved": True
+    })
+    assert response.status_code == 200
+    return submission.reference
+
+
+def test_reconciliation_reads_only_the_tournaments_approved_submissions(client, db, auth, seeded):
+    other = seed_tournament(db, auth, "otro-torneo", players=5, pending_submissions=2)
+    submission_ref = _approve_first_pending(client, db, auth, seeded)
+    _approve_first_pending(client, db, auth, other)
+
+    assert submission_ref.get().to_dict()["tournamentId"] == seeded.tournament_id
+
+    result = reconcile_tournament(db, seeded.tournament_id, workers=2)
+    assert result.submissions == 1
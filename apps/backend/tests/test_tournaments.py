@@ -0,0 +1,29 @@
+from src.inmemory.seed import seed_tournament
+from tests.conftest import API, auth_headers, firestore_ops
+
+
+def test_tournament_list_reads_counters_in_one_round_trip(client, db, auth, seeded):
+    for index in range(4):
+        seed_tournament(db, auth, f"torneo-{index}", players=3, pending_submissions=0)
+
+    response = client.get(f"{API}/tournaments/", headers=auth_headers(auth, seeded.player_ids[0]))
+
+    assert response.status_code == 200
+    counts = {tournament["id"]: tournament["participant_count"] for tournament in response.json()}
+    assert counts[seeded.tournament_id] == len(seeded.player_ids)
+    assert counts["torneo-0"] == 3
+    # The page query and one get_all of every tournament's counter shards
+    assert firestore_ops(response)["round_trips"] == 2
+
+
+def test_participant_count_includes_a_join_right_away(client, auth, seeded):
+    url = f"{API}/tournaments/{seeded.tournament_id}"
+    before = client.get(url, headers=auth_headers(auth, seeded.player_ids[0])).json()["participant_count"]
+
+    auth.create_user("jugador-nuevo", email="nuevo@example.com")
+    headers = auth_headers(auth, "jugador-nuevo")
+    assert client.post(f"{url}/join", headers=headers).status_code == 200
+
+    assert client.get(url, headers=headers).json()["participant_count"] == before + 1
+    listed = {tournament["id"]: tournament for tournament in client.get(f"{API}/tournaments/", headers=headers).json()}
+    assert listed[seeded.tournament_id]["participant_count"] == before + 1
@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+
+from google.cloud.firestore import DELETE_FIELD
+
+from tests.conftest import API, auth_headers, firestore_ops
+
+
+def _answers(db, seeded, user_id: str) -> list[dict]:
+    query = db.collection("answers").where("oderId", "==", user_id).where("tournamentId", "==", seeded.tournament_id)
+    return [doc.to_dict() for doc in query.stream()]
+
+
+def test_stats_count_answers_of_participants_without_counters(client, db, auth, seeded):
+    user_id = seeded.player_ids[0]
+    participant_ref = db.collection("tournaments").document(seeded.tournament_id).collection("participants").document(user_id)
+    participant_ref.update({"totalAnswers": DELETE_FIELD, "correctAnswers": DELETE_FIELD, "statsBackfilled": DELETE_FIELD})
+
+    # An answer written straight to Firestore, bypassing the API's counters
+    question_id = seeded.today_question_ids[0]
+    db.collection("answers").document(f"{user_id}_{question_id}-directo").set({
+        "oderId": user_id,
+        "questionId": question_id,
+        "tournamentId": seeded.tournament_id,
+        "selectedAnswer": "A",
+        "isCorrect": True,
+        "starsEarned": 1,
+        "answeredAt": datetime.now(timezone.utc)
+    })
+    answers = _answers(db, seeded, user_id)
+
+    response = client.get(f"{API}/scores/user-stats/{seeded.tournament_id}", headers=auth_headers(auth, user_id))
+
+    assert response.status_code == 200
+    assert response.json()["total_answers"] == len(answers)
+    assert response.json()["correct_answers"] == sum(1 for answer in answers if answer["isCorrect"])
+
+
+def test_stats_of_participants_not_backfilled_include_answers_before_the_counters(client, db, auth, seeded):
+    user_id = seeded.player_ids[0]
+    participant_ref = db.collection("tournaments").document(seeded.tournament_id).collection("participants").document(user_id)
+    participant_ref.update({"totalAnswers": DELETE_FIELD, "correctAnswers": DELETE_FIELD, "statsBackfilled": DELETE_FIELD})
+
+    # A correct answer from before the counters existed
+    first, second = seeded.today_question_ids[:2]
+    db.collection("answers").document(f"{user_id}_{first}").set({
+        "oderId": user_id,
+        "questionId": first,
+        "tournamentId": seeded.tournament_id,
+        "selectedAnswer": "A",
+        "isCorrect": True,
+        "starsEarned": 1,
+        "answeredAt": datetime.now(timezone.utc)
+    })
+
+    # The first answer through the API is wrong: it creates totalAnswers=1 and no correctAnswers
+    correct_answer = db.collection("questions").document(second).get().to_dict()["correctAnswer"]
+    wrong_answer = next(option for option in "ABCD" if option != correct_answer)
+    headers = auth_headers(auth, user_id)
+    client.post(f"{API}/questions/answer", headers=headers, json={"question_id": second, "selected_answer": wrong_answer})
+
+    response = client.get(f"{API}/scores/user-stats/{seeded.tournament_id}", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["total_answers"] == 2
+    assert response.json()["correct_answers"] == 1
+
+
+def test_stats_read_only_the_participant_when_counters_exist(client, auth, seeded):
+    response = client.get(
+        f"{API}/scores/user-stats/{seeded.tournament_id}", headers=auth_headers(auth, seeded.player_ids[0])
+    )
+
+    assert response.status_code == 200
+    assert firestore_ops(response)["round_trips"] == 1
@@ -1,20 +1,18 @@
 import { Component, inject, OnInit, signal } from '@angular/core';
 import { RouterLink } from '@angular/router';
 import { DomSanitizer, SafeResourceUrl } from '@angular/platform-browser';
+import { HttpClient } from '@angular/common/http';
+import { firstValueFrom } from 'rxjs';
 import {
   Firestore,
-  collection,
   collectionGroup,
   query,
   where,
-  getDocs,
-  doc,
-  updateDoc,
-  Timestamp
+  getDocs
 } from '@angular/fire/firestore';
-import { AuthService } from '@core/services/auth.service';
 import { ChallengeSubmission } from '@shared/models';
 import { LoaderComponent } from '@shared/components/loader/loader.component';
+import { environment } from '@env/environment';
 
 @Component({
   selector: 'app-video-review',
@@ -186,7 +184,7 @@ import { LoaderComponent } from '@shared/components/loader/loader.component';
 })
 export class VideoReviewComponent implements OnInit {
   private firestore = inject(Firestore);
-  private authService = inject(AuthService);
+  private http = inject(HttpClient);
 
   loading = signal(true);
   processing = signal(false);
@@ -251,18 +249,7 @@ export class VideoReviewComponent implements OnInit {
     this.processing.set(true);
 
     try {
-      const submissionRef = doc(
-        this.firestore,
-        `challenges/${video.challengeId}/submissions/${video.id}`
-      );
-
-      await updateDoc(submissionRef, {
-        status: 'approved',
-        starsAwarded: 5,
-        reviewedBy: this.authService.userId(),
-        reviewedAt: Timestamp.now()
-      });
-
+      await this.reviewVideo(video, true);
       this.removeCurrentVideo();
     } catch (error) {
       console.error('Error approving video:', error);
@@ -278,18 +265,7 @@ export class VideoReviewComponent implements OnInit {
     this.processing.set(true);
 
     try {
-      const submissionRef = doc(
-        this.firestore,
-        `challenges/${video.challengeId}/submissions/${video.id}`
-      );
-
-      await updateDoc(submissionRef, {
-        status: 'rejected',
-        starsAwarded: 0,
-        reviewedBy: this.authService.userId(),
-        reviewedAt: Timestamp.now()
-      });
-
+      await this.reviewVideo(video, false);
       this.removeCurrentVideo();
     } catch (error) {
       console.error('Error rejecting video:', error);
@@ -298,6 +274,18 @@ export class VideoReviewComponent implements OnInit {
     }
   }
 
+  /**
+   * La API actualiza la entrega, la cuenta de pendientes del reto y las
+   * estrellas del participante en una sola escritura
+   */
+  private reviewVideo(video: ChallengeSubmission & { challengeId: string }, approved: boolean): Promise<unknown> {
+    return firstValueFrom(this.http.post(`${environment.apiUrl}/challenges/review`, {
+      submission_id: video.id,
+      challenge_id: video.challengeId,
+      approved
+    }));
+  }
+
   private removeCurrentVideo(): void {
     const index = this.currentIndex();
     const videos = this.pendingVideos();
@@ -1,15 +1,15 @@
 import { Component, inject, OnInit, signal, computed } from '@angular/core';
 import { ActivatedRoute, Router, RouterLink } from '@angular/router';
 import { DomSanitizer, SafeResourceUrl } from '@angular/platform-browser';
+import { HttpClient } from '@angular/common/http';
+import { firstValueFrom } from 'rxjs';
 import {
   Firestore,
   collection,
   query,
   where,
   getDocs,
-  doc,
   getDoc,
-  setDoc,
   orderBy,
   Timestamp
 } from '@angular/fire/firestore';
@@ -17,6 +17,7 @@ import { Storage, ref, uploadBytesResumable, getDownloadURL } from '@angular/fir
 import { AuthService } from '@core/services/auth.service';
 import { Question, DailyContent, Answer } from '@shared/models';
 import { LoaderComponent } from '@shared/components/loader/loader.component';
+import { environment } from '@env/environment';
 
 type GamePhase =
   | 'loading'
@@ -660,6 +661,7 @@ export class GameplayComponent implements OnInit {
   private router = inject(Router);
   private firestore = inject(Firestore);
   private storage = inject(Storage);
+  private http = inject(HttpClient);
   private sanitizer = inject(DomSanitizer);
   protected authService = inject(AuthService);
 
@@ -836,23 +838,19 @@ export class GameplayComponent implements OnInit {
     const selected = this.selectedAnswer();
     if (!question || !selected) return;
 
-    const isCorrect = selected === question.correctAnswer;
-    const starsEarned = isCorrect ? question.stars : 0;
+    let isCorrect = selected === question.correctAnswer;
+    let starsEarned = isCorrect ? question.stars : 0;
 
-    // Save answer to Firestore
-    const userId = this.authService.userId();
-    if (userId) {
-      const answerId = `${userId}_${question.id}`;
-      const answerRef = doc(this.firestore, 'answers', answerId);
-      await setDoc(answerRef, {
-        oderId: userId,
-        questionId: question.id,
-        tournamentId: this.tournamentId,
-        selectedAnswer: selected,
-        isCorrect,
-        starsEarned,
-        answeredAt: Timestamp.now()
-      });
+    // La API califica la respuesta y suma estrellas y contadores del participante
+    try {
+      const result = await firstValueFrom(this.http.post<{ is_correct: boolean; stars_earned: number }>(
+        `${environment.apiUrl}/questions/answer`,
+        { question_id: question.id, selected_answer: selected }
+      ));
+      isCorrect = result.is_correct;
+      starsEarned = result.stars_earned;
+    } catch (error) {
+      console.error('Error saving answer:', error);
     }
 
     // Update results
@@ -923,17 +921,20 @@ export class GameplayComponent implements OnInit {
       async () => {
         const downloadURL = await getDownloadURL(uploadTask.snapshot.ref);
 
-        // Save submission to Firestore
+        // La API guarda la entrega y lleva la cuenta de pendientes del reto
         const dailyContent = this.dailyContent();
         if (dailyContent) {
-          const submissionsRef = collection(this.firestore, `challenges/${dailyContent.id}/submissions`);
-          await setDoc(doc(submissionsRef), {
-            oderId: userId,
-            oderName: this.authService.userDisplayName(),
-            videoURL: downloadURL,
-            status: 'pending',
-            submittedAt: Timestamp.now()
-          });
+          try {
+            await firstValueFrom(this.http.post(
+              `${environment.apiUrl}/challenges/${dailyContent.id}/submissions`,
+              { video_url: downloadURL }
+            ));
+          } catch (error) {
+            console.error('Submission error:', error);
+            alert('Error al enviar el video. Intenta de nuevo.');
+            this.uploadProgress.set(0);
+            return;
+          }
         }
 
         this.challengeSubmitted.set(true);